@@ -1,29 +1,63 @@
-import numpy as np
-import soundfile as sf
-from scipy.signal import resample
-from pathlib import Path
-import time
-from mir_eval.separation import bss_eval_sources
-from pesq import pesq
-import pandas as pd
-from openpyxl import load_workbook
 import os
+import sys
 import warnings
+from pathlib import Path
+from filtros_adaptativos.varredura import run_settings
 warnings.filterwarnings("ignore", category=FutureWarning)
 
 # Caminhos das pastas
 corrupted_dir = Path("data/corrupted_dataset/")
-lms_output_dir = Path("data/result_lms/")
-nlms_output_dir = Path("data/result_nlms/")
-klms_output_dir = Path("data/result_klms/")
-nklms_output_dir = Path("data/result_nklms/")
 
 # === Escolher apenas UM arquivo limpo ===
 clean_path = Path("data/audio_limpo.wav")
 
-tempo_execucao = []
-metrics = []
+output_db = Path("resultados_final.db")
 output_result = Path("resultados_final.xlsx")
+# Gera a planilha a partir do banco de métricas ao final da varredura
+exportar_excel = True
+# Reaproveita saídas e métricas já calculadas (mesma entrada, parâmetros e código)
+usar_cache = True
+# Pasta de um acervo (acervo.py) para as saídas filtradas, em vez de um WAV por
+# job em data/result_*; None mantém os WAVs. Ex.: acervo = Path("data/acervo")
+acervo = None
+
+# Processos usados na varredura (1 = execução serial no processo atual). O padrão
+# é limitado para não ocupar uma máquina compartilhada (cada processo de filtro
+# também alimenta o pool de métricas); aumente com --workers ou aqui
+workers = min(4, os.cpu_count() or 1)
+# Fila de jobs (fila.py) em um banco SQLite de uma pasta compartilhada: as
+# tarefas da varredura são executadas por trabalhadores desta e de outras
+# máquinas ("python -m filtros_adaptativos.fila <fila>"), e workers passa a
+# ser o número de trabalhadores locais. None executa tudo aqui. Ex.:
+# fila = Path("/compartilhado/fila.db")
+fila = None
+# Métricas (ver metricas.metrics_by_name) e processos dedicados a elas, em paralelo
+# com os filtros. Para triagem rápida de grades grandes: metricas = ["segsnr"]
+metricas = ["snr", "sdr", "pesq"]
+metric_workers = 1
+# Precisão da leitura, dos filtros e das saídas: "float64" ou "float32" (metade da memória)
+precisao = "float64"
+# Gera os corrompidos em memória (ruidos.generate) em vez de ler corrupted_dir;
+# com salvar_corrompidos os WAVs gerados também são gravados em corrupted_dir
+gerar_corrompidos = False
+salvar_corrompidos = False
+semente_corrompidos = 0
+# Tempo por etapa, contadores dos filtros e pico de memória do processo em cada linha, e
+# um trace (perfil_dir/trace.json) para chrome://tracing ou ui.perfetto.dev
+perfil = False
+perfil_dir = Path("perfil")
+# Interrompe filtros cujo erro ou pesos passam deste valor (None: sem verificação)
+limite_divergencia = 1e4
+# Curvas de aprendizado (MSE por janela, norma dos pesos, energia dos coeficientes)
+# a cada 'curvas' amostras, gravadas no banco, com a amostra de convergência na
+# planilha (None: sem registro). Ex.: curvas = 256
+curvas = None
+# Busca adaptativa (busca.py): None varre a grade inteira; "halving" ou "hyperband"
+# triam as configurações no início dos sinais (segsnr) e só completam as melhores
+busca = None
+amostras_triagem = 16000
+# Colunas extras da planilha: nome da coluna → parâmetro do job
+colunas = {"Sigma": "sigma", "Bloco": "block_size"}
 
 mus_lms = [ 0.6 ]
 orders_lms = [ 128 ]
@@ -31,6 +65,14 @@ orders_lms = [ 128 ]
 mus_nlms = [ 0.4 ]
 orders_nlms = [ 256 ]
 
+mus_fdaf = [ 0.4 ]
+orders_fdaf = [ 1024 ]
+blocks_fdaf = [ 1024 ]
+
+mus_pbfdaf = [ 0.4 ]
+orders_pbfdaf = [ 1024 ]
+blocks_pbfdaf = [ 128 ]
+
 mus_klms = [ 0.6 ]
 sigmas_klms = [ 5 ]
 dict_sizes = [ 8 ]
@@ -39,276 +81,24 @@ mus_nklms = [ 0.4 ]
 sigmas_nklms = [ 20 ]
 dict_sizes_nklms = [ 8 ]
 
-def snr(reference, signal, type):
-    if np.isnan(signal).any() or np.isinf(signal).any():
-                print(f"⚠️ {type} - Valores inválidos detectados — pulando este resultado.")
-
-    noise = reference - signal
-    return 10 * np.log10((np.sum(reference**2) + 1e-10) / (np.sum(noise**2) + 1e-10))
-
-def salvar_metricas_excel(metrics, arquivo_excel="resultados.xlsx", nome_planilha="Métricas"):
-    """
-    Salva 'metrics' (lista de dicts) no arquivo Excel, fazendo append sem sobrescrever.
-    """
-    df = pd.DataFrame(metrics)
-
-    # Se o arquivo já existe, abra com openpyxl para descobrir a última linha usada na planilha
-    if os.path.exists(arquivo_excel):
-        wb = load_workbook(arquivo_excel)
-        if nome_planilha in wb.sheetnames:
-            startrow = wb[nome_planilha].max_row  # número de linhas já existentes
-        else:
-            startrow = 0
-
-        # Agora abra o ExcelWriter em modo append — não precisamos (e não devemos) setar writer.book
-        with pd.ExcelWriter(arquivo_excel, engine="openpyxl", mode="a", if_sheet_exists="overlay") as writer:
-            # header só se estiver criando a planilha (startrow == 0)
-            df.to_excel(writer,
-                        sheet_name=nome_planilha,
-                        index=False,
-                        header=(startrow == 0),
-                        startrow=startrow)
-    else:
-        # arquivo não existe: cria um novo
-        with pd.ExcelWriter(arquivo_excel, engine="openpyxl", mode="w") as writer:
-            df.to_excel(writer, sheet_name=nome_planilha, index=False, header=True)
-
-def metric (filter, type, file, mu, filter_order, sigma, snr, sdr, pesq, time):
-    metrics.append({
-            "Filtro": filter,
-            "Tipo": type,
-            "Arquivo": file,
-            "Taxa de adaptacao": mu,
-            "Ordem do filtro": filter_order,
-            "Sigma": sigma,
-            "snr (dB)": snr,
-            "sdr (dB_)": sdr,
-            "pesq": pesq,
-            "Tempo (s)": time
-        })
-
-# Funções LMS
-def lms_filter(x, d, mu, filter_order):
-    N = len(x)
-    w = np.zeros(filter_order)
-    y = np.zeros(N)
-    e = np.zeros(N)
-    for n in range(filter_order, N):
-        x_n = x[n-filter_order:n][::-1]
-        y[n] = np.dot(w, x_n)
-        e[n] = d[n] - y[n]
-        w += mu * e[n] * x_n
-    return y
-
-# Função NLMS
-def nlms_filter(x, d, mu=0.05, filter_order=512, epsilon=1e-8):
-    N = len(x)
-    w = np.zeros(filter_order)
-    y = np.zeros(N)
-    e = np.zeros(N)
-    for n in range(filter_order, N):
-        x_n = x[n-filter_order:n][::-1]
-        norm = np.dot(x_n, x_n) + epsilon
-        y[n] = np.dot(w, x_n)
-        e[n] = d[n] - y[n]
-        w += 2 * (mu / norm) * e[n] * x_n
-    return y
-
-# Funções de kernel
-def gaussian_kernel(x, y, sigma=1.4):
-    return np.exp(-np.linalg.norm(x - y) ** 2 / (2 * sigma ** 2))
-
-def laplacian_kernel(x, y, sigma=1.4):
-    return np.exp(-np.linalg.norm(x - y) / sigma)
-
-def polynomial_kernel(x, y, sigma=None, degree=2, const=5):
-    return (np.dot(x, y) + const) ** degree
-
-# Filtro KLMS com limitação de dicionário
-def klms_filter(x, d, mu=0.10, kernel_func=gaussian_kernel, sigma=1.4, max_dict_size=16):
-    filter_order = max_dict_size
-    N = len(x)
-    y = np.zeros(N)
-    alpha = []
-    dictionary = []
-
-    if kernel_func == polynomial_kernel:
-        mu = 0.01  # Ajuste específico para kernel polinomial
-
-    for n in range(filter_order, N):
-        x_n = x[n - filter_order:n][::-1]
-        if len(dictionary) == 0:
-            y[n] = 0
-        else:
-            y[n] = sum(a * kernel_func(x_n, c, sigma) for a, c in zip(alpha, dictionary))
-
-        e = d[n] - y[n]
-        #print("KMLS:", e)
-        alpha.append(mu * e)
-        dictionary.append(x_n)
-
-        if len(dictionary) > max_dict_size:
-            dictionary.pop(0)
-            alpha.pop(0)
-
-    return y
-
-# Filtro NKLMS com limitação de dicionário
-def nklms_filter(x, d, mu=0.6, kernel_func=gaussian_kernel, sigma=20, epsilon=1e-8, max_dict_size=16):
-    filter_order = max_dict_size
-    N = len(x)
-    y = np.zeros(N)
-    alpha = []
-    dictionary = []
-
-    if kernel_func == polynomial_kernel:
-        mu = 0.6  # Ajuste específico para kernel polinomial
-
-    for n in range(filter_order, N):
-        x_n = x[n - filter_order:n][::-1]
-        if len(dictionary) == 0:
-            y[n] = 0
-        else:
-            y[n] = sum(a * kernel_func(x_n, c, sigma) for a, c in zip(alpha, dictionary))
-
-        e = d[n] - y[n]
-        #print("NKMLS:", e)
-        alpha.append(mu * e / (epsilon + kernel_func(x_n, x_n, sigma)))
-        dictionary.append(x_n)
-
-        if len(dictionary) > max_dict_size:
-            dictionary.pop(0)
-            alpha.pop(0)
-
-    return y
-
 # Lista de kernels a aplicar
 kernels = [
-    ("gaussian", gaussian_kernel),
-    ("laplacian", laplacian_kernel)
-    ("polynomial", polynomial_kernel)
+    "gaussian",
+    "laplacian",
+    "polynomial",
 ]
 
-# Escolher 1 áudio limpo fixo
-clean, sr = sf.read(clean_path)
-if len(clean.shape) > 1:
-    clean = clean[:, 0]  # converter para mono
-
-# === Percorrer todos os corrompidos (já existentes) ===
-for corrupted_path in corrupted_dir.rglob("*.wav"):
-
-    corrupted, sr_corrupted = sf.read(corrupted_path)
-    if len(corrupted.shape) > 1:
-        corrupted = corrupted[:, 0]
-    
-
-    min_len = min(len(clean), len(corrupted))
-    clean_proc = clean[:min_len]
-    corrupted_proc = corrupted[:min_len]
-
-    relative_path = corrupted_path.relative_to(corrupted_dir)
-    
-    # ================== LMS ==================
-    
-    for mu in mus_lms:
-        for order in orders_lms:
-            start = time.time()
-            y_lms = lms_filter(corrupted_proc, clean_proc, mu, order)
-            tempo = time.time() - start              
-
-            try:
-                metric("lms", "", corrupted_path, mu, order, "",
-                    snr(clean_proc, y_lms, "LMS"),
-                    bss_eval_sources(np.expand_dims(clean_proc,0), np.expand_dims(y_lms,0))[0][0],
-                    pesq(sr_corrupted, clean_proc, y_lms, 'wb'),
-                    tempo)
-            except:
-                continue
-
-            lms_out = lms_output_dir / f"mu{mu}_ord{order}" / relative_path
-            lms_out.parent.mkdir(parents=True, exist_ok=True)
-            sf.write(str(lms_out), y_lms, sr)
-
-            salvar_metricas_excel(metrics, output_result)
-            metrics.clear()
-
-    # ================== NLMS ==================
-    for mu in mus_nlms:
-        for order in orders_nlms:
-            start = time.time()
-            y_nlms = nlms_filter(corrupted_proc, clean_proc, mu=mu, filter_order=order)
-            tempo = time.time() - start
-
-
-            try:
-                metric("nlms", "", corrupted_path, mu, order, "",
-                    snr(clean_proc, y_nlms, "NLMS"),
-                    bss_eval_sources(np.expand_dims(clean_proc,0), np.expand_dims(y_nlms,0))[0][0],
-                    pesq(sr_corrupted, clean_proc, y_nlms, 'wb'),
-                    tempo)
-            except:
-                continue
-
-            nlms_out = nlms_output_dir / f"mu{mu}_ord{order}" / relative_path
-            nlms_out.parent.mkdir(parents=True, exist_ok=True)
-            sf.write(str(nlms_out), y_nlms, sr)
-
-            salvar_metricas_excel(metrics, output_result)
-            metrics.clear()
-    # ================== KLMS / NKLMS ==================
-    
-    for kernel_name, kernel_func in kernels:
-        for mu in mus_klms:
-            for sigma in sigmas_klms:
-                for dict_size in dict_sizes:
-                    start = time.time()
-                    y_klms = klms_filter(corrupted_proc, clean_proc,
-                                         mu=mu, kernel_func=kernel_func,
-                                         sigma=sigma, max_dict_size=dict_size)
-                    tempo = time.time() - start
-                    
-
-                    try:
-                        metric("klms", kernel_name, corrupted_path, mu, dict_size, sigma,
-                            snr(clean_proc, y_klms, "KLMS-"+kernel_name),
-                            bss_eval_sources(np.expand_dims(clean_proc,0), np.expand_dims(y_klms,0))[0][0],
-                            pesq(sr_corrupted, clean_proc, y_klms, 'wb'),
-                            tempo)
-                    except:
-                        continue
-
-                    klms_out = klms_output_dir / kernel_name / f"mu{mu}_sig{sigma}_dict{dict_size}" / relative_path
-                    klms_out.parent.mkdir(parents=True, exist_ok=True)
-                    sf.write(str(klms_out), y_klms, sr)
-
-                    salvar_metricas_excel(metrics, output_result)
-                    metrics.clear()
-
-        for mu in mus_nklms:
-            for sigma in sigmas_nklms:
-                for dict_size in dict_sizes_nklms:
-                    start = time.time()
-                    y_nklms = nklms_filter(corrupted_proc, clean_proc,
-                                           mu=mu, kernel_func=kernel_func,
-                                           sigma=sigma, max_dict_size=dict_size)
-                    tempo = time.time() - start
-
-                    try:
-                        metric("nklms", kernel_name, corrupted_path, mu, dict_size, sigma,
-                            snr(clean_proc, y_nklms, "NKLMS-"+kernel_name),
-                            bss_eval_sources(np.expand_dims(clean_proc,0), np.expand_dims(y_nklms,0))[0][0],
-                            pesq(sr_corrupted, clean_proc, y_nklms, 'wb'),
-                            tempo)
-                    except:
-                        continue
-
-                    nklms_out = nklms_output_dir / kernel_name / f"mu{mu}_sig{sigma}_dict{dict_size}" / relative_path
-                    nklms_out.parent.mkdir(parents=True, exist_ok=True)
-                    sf.write(str(nklms_out), y_nklms, sr)
-
-                    salvar_metricas_excel(metrics, output_result)
-                    metrics.clear()
-
-    #print(f"Processado: {relative_path}")
-
+# Filtros e grades de parâmetros, na ordem em que aparecem na planilha
+specs = [
+    ("lms", "", {"mu": mus_lms, "filter_order": orders_lms}),
+    ("nlms", "", {"mu": mus_nlms, "filter_order": orders_nlms}),
+    ("fdaf", "", {"mu": mus_fdaf, "filter_order": orders_fdaf, "block_size": blocks_fdaf}),
+    ("pbfdaf", "", {"mu": mus_pbfdaf, "filter_order": orders_pbfdaf, "block_size": blocks_pbfdaf}),
+]
+for kernel_name in kernels:
+    specs.append(("klms", kernel_name, {"mu": mus_klms, "sigma": sigmas_klms, "max_dict_size": dict_sizes}))
+    specs.append(("nklms", kernel_name, {"mu": mus_nklms, "sigma": sigmas_nklms, "max_dict_size": dict_sizes_nklms}))
 
+if __name__ == "__main__":
+    # Também pela linha de comando: python -m filtros_adaptativos filtros [opções]
+    run_settings(sys.modules[__name__])
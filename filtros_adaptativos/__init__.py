@@ -0,0 +1,40 @@
+import importlib
+
+# Pacote com os filtros, kernels, métricas e a varredura. Os nomes abaixo são
+# definidos nos módulos do pacote (lineares.py, motor_kernel.py, ...) e só são
+# importados no primeiro acesso: importar o pacote para usar um filtro não
+# carrega scipy, pandas, mir_eval nem pesq.
+#
+#   import filtros_adaptativos as fa
+#   y = fa.nlms_filter(x, d, mu=0.4, filter_order=256)
+
+_exports = {
+    "lineares": ("LMS", "NLMS", "lms_filter", "nlms_filter", "fdaf_filter", "pbfdaf_filter"),
+    "motor_kernel": ("KLMS", "NKLMS", "kernel_filter", "klms_filter", "nklms_filter", "approximation_report"),
+    "caracteristicas": ("FeatureKLMS", "feature_filter"),
+    "kernels": ("gaussian_kernel", "laplacian_kernel", "polynomial_kernel", "kernels_by_name"),
+    "lote": ("param_grid", "lms_filter_batch", "nlms_filter_batch", "kernel_filter_batch"),
+    "tempo_real": ("wav_blocks", "stream_filter", "process_wav"),
+    "estado": ("get_state", "set_state", "save_state", "load_state", "warm_start"),
+    "metricas": ("snr", "segmental_snr", "fast_sdr", "evaluate", "metrics_by_name", "MetricsStore", "export_excel"),
+    "varredura": ("expand_jobs", "run_sweep", "run_settings"),
+    "busca": ("successive_halving", "hyperband"),
+    "divergencia": ("DivergenceError",),
+    "precisao": ("read_signal", "memory_estimate"),
+    "acervo": ("OutputArchive",),
+    "fila": ("JobQueue", "run_queue", "work"),
+}
+_modules = {name: module for module, names in _exports.items() for name in names}
+
+__all__ = sorted(_modules)
+
+def __getattr__(name):
+    module = _modules.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
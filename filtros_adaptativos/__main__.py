@@ -0,0 +1,60 @@
+import argparse
+import importlib
+import os
+import sys
+
+# Linha de comando da varredura:
+#   python -m filtros_adaptativos filtros --workers 4 --metricas segsnr --busca halving
+#   filtros-adaptativos filtro_poly --precisao float32   (após pip install -e .)
+#   python -m filtros_adaptativos filtro_poly --fila /compartilhado/fila.db --workers 2
+# O primeiro argumento é o módulo de configurações (filtros ou filtro_poly), que
+# fica na pasta do projeto, fora do pacote; as opções sobrescrevem as
+# configurações de mesmo nome antes de run_settings.
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="filtros_adaptativos",
+                                     description="Varredura dos filtros adaptativos sobre os áudios corrompidos")
+    parser.add_argument("config", nargs="?", default="filtros",
+                        help="módulo com as configurações e a grade 'specs' (filtros, filtro_poly)")
+    parser.add_argument("--workers", type=int, help="processos dos filtros (1 = serial)")
+    parser.add_argument("--metricas", nargs="+", help="métricas de metricas.metrics_by_name")
+    parser.add_argument("--metric-workers", type=int, help="processos das métricas (0 = no mesmo processo)")
+    parser.add_argument("--precisao", choices=("float32", "float64"))
+    parser.add_argument("--busca", choices=("halving", "hyperband"), help="busca adaptativa (busca.py)")
+    parser.add_argument("--amostras-triagem", type=int, help="amostras da primeira rodada da busca")
+    parser.add_argument("--limite-divergencia", type=float, help="limite do erro/pesos (divergencia.py)")
+    parser.add_argument("--curvas", type=int, help="registra curvas de aprendizado a cada N amostras")
+    parser.add_argument("--gerar-corrompidos", action="store_true", help="gera os corrompidos em memória")
+    parser.add_argument("--salvar-corrompidos", action="store_true", help="grava os corrompidos gerados")
+    parser.add_argument("--semente-corrompidos", type=int)
+    parser.add_argument("--perfil", action="store_true", help="tempos por etapa e trace")
+    parser.add_argument("--sem-cache", action="store_true", help="recalcula todos os jobs")
+    parser.add_argument("--acervo", help="pasta do acervo das saídas (acervo.py), em vez dos WAVs")
+    parser.add_argument("--fila", help="banco da fila de jobs (fila.py); --workers vira o número de "
+                                       "trabalhadores locais")
+    parser.add_argument("--sem-excel", action="store_true", help="não gera a planilha ao final")
+    args = parser.parse_args(argv)
+
+    # O script instalado não põe a pasta atual no sys.path, onde ficam as configurações
+    if os.getcwd() not in sys.path:
+        sys.path.insert(0, os.getcwd())
+    settings = importlib.import_module(args.config)
+    for name in ("workers", "metricas", "metric_workers", "precisao", "busca", "amostras_triagem",
+                 "limite_divergencia", "semente_corrompidos", "acervo", "curvas", "fila"):
+        value = getattr(args, name)
+        if value is not None:
+            setattr(settings, name, value)
+    for name in ("gerar_corrompidos", "salvar_corrompidos", "perfil"):
+        if getattr(args, name):
+            setattr(settings, name, True)
+    if args.sem_cache:
+        settings.usar_cache = False
+    if args.sem_excel:
+        settings.exportar_excel = False
+
+    from .varredura import run_settings
+    run_settings(settings)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+from fnmatch import fnmatch
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+# Acervo das saídas filtradas: em vez de um WAV por job em data/result_*, as
+# saídas são acrescentadas em poucos arquivos grandes de float32 cru
+# (segmento_NNNN.f32, até segment_bytes cada) e um índice SQLite
+# (indice.db) guarda, para cada chave, o segmento, a posição, o formato, a
+# taxa de amostragem, o sha256 dos dados e o job que gerou a saída. A chave é
+# o caminho que o WAV teria (varredura.output_path), então arquivo e
+# parâmetros já estão nela e export_wav recria a mesma árvore de pastas.
+#
+# A leitura (get) devolve um np.memmap sobre o trecho do segmento, sem cópia:
+# fatiar uma saída só lê do disco as páginas usadas. Vários processos podem
+# acrescentar ao mesmo tempo: cada append escreve no fim do segmento dentro
+# de uma transação BEGIN IMMEDIATE do índice, que serializa os escritores.
+# Regravar uma chave aponta o índice para os dados novos; os antigos ficam
+# como espaço morto no segmento.
+
+dtype = np.dtype("<f4")
+reference_prefix = "acervo:"
+
+class OutputArchive:
+    """
+    Acervo de saídas na pasta 'directory' (criada se não existe). Os sinais
+    são gravados em float32, (N,) ou (C, N), com a taxa de amostragem.
+    """
+    def __init__(self, directory, segment_bytes=1 << 30, timeout=60):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self.conn = sqlite3.connect(str(self.directory / "indice.db"), timeout=timeout)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS saidas (
+            key TEXT PRIMARY KEY, segment INTEGER, offset INTEGER, nbytes INTEGER,
+            shape TEXT, sr INTEGER, sha256 TEXT, job TEXT, created REAL)""")
+
+    def _segment_path(self, segment):
+        return self.directory / f"segmento_{segment:04d}.f32"
+
+    def append(self, key, signal, sr, job=None):
+        """Acrescenta o sinal ao último segmento (ou a um novo, se não couber) e o indexa por key."""
+        data = np.ascontiguousarray(signal, dtype=dtype)
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            last = self.conn.execute("SELECT MAX(segment) FROM saidas").fetchone()[0] or 0
+            # Fim dos dados indexados: o que vier depois é de um append interrompido
+            size = self.conn.execute("SELECT MAX(offset + nbytes) FROM saidas WHERE segment = ?",
+                                     (last,)).fetchone()[0] or 0
+            if size and size + data.nbytes > self.segment_bytes:
+                last += 1
+                size = 0
+            with open(self._segment_path(last), "ab") as f:
+                f.truncate(size)
+                f.write(data.data)
+            meta = json.dumps(job, default=str, sort_keys=True) if job is not None else None
+            self.conn.execute("INSERT OR REPLACE INTO saidas VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                              (str(key), last, size, data.nbytes, json.dumps(data.shape), int(sr),
+                               hashlib.sha256(data.data).hexdigest(), meta, time.time()))
+
+    def _entry(self, key):
+        entry = self.conn.execute("SELECT segment, offset, shape, sr, sha256 FROM saidas WHERE key = ?",
+                                  (str(key),)).fetchone()
+        if entry is None:
+            raise KeyError(key)
+        return entry
+
+    def get(self, key):
+        """(sinal, taxa de amostragem) da chave; o sinal é um memmap somente leitura, sem cópia."""
+        segment, offset, shape, sr, _ = self._entry(key)
+        shape = tuple(json.loads(shape))
+        if not np.prod(shape):
+            return np.zeros(shape, dtype), sr  # mmap não aceita trecho vazio
+        return np.memmap(self._segment_path(segment), dtype=dtype, mode="r", offset=offset, shape=shape), sr
+
+    def sha256(self, key):
+        """sha256 dos dados gravados da chave, ou None se a chave não existe ou os dados não conferem."""
+        try:
+            _, _, _, _, expected = self._entry(key)
+            signal, _ = self.get(key)
+        except (KeyError, FileNotFoundError, ValueError):
+            return None
+        digest = hashlib.sha256(np.ascontiguousarray(signal).data).hexdigest()
+        return digest if digest == expected else None
+
+    def job(self, key):
+        """Job (filtro, kernel, arquivo, parâmetros) gravado com a chave, ou None."""
+        row = self.conn.execute("SELECT job FROM saidas WHERE key = ?", (str(key),)).fetchone()
+        return json.loads(row[0]) if row is not None and row[0] is not None else None
+
+    def keys(self, pattern="*"):
+        """Chaves que casam com o padrão (fnmatch, ex.: "data/result_klms/gaussian/*"), em ordem."""
+        return [key for key, in self.conn.execute("SELECT key FROM saidas ORDER BY key")
+                if fnmatch(key, pattern)]
+
+    def __contains__(self, key):
+        return self.conn.execute("SELECT 1 FROM saidas WHERE key = ?", (str(key),)).fetchone() is not None
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM saidas").fetchone()[0]
+
+    def export_wav(self, key, path=None, subtype=None):
+        """Grava a saída da chave como WAV em path (padrão: o próprio caminho da chave). Retorna o caminho."""
+        import soundfile as sf
+        signal, sr = self.get(key)
+        path = Path(path if path is not None else key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        sf.write(str(path), np.asarray(signal).T, sr, subtype=subtype)
+        return path
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+@lru_cache(maxsize=None)
+def _open(directory, pid):
+    # Uma conexão por processo: conexões SQLite não podem ser usadas depois de um fork
+    return OutputArchive(directory)
+
+def open_archive(directory):
+    """Acervo da pasta, aberto uma vez por processo (usado pelos processos da varredura)."""
+    return _open(str(directory), os.getpid())
+
+def reference(directory, key):
+    """Texto que identifica uma saída no acervo (guardado no cache no lugar do caminho do WAV)."""
+    return f"{reference_prefix}{directory}::{key}"
+
+def is_reference(output):
+    return str(output).startswith(reference_prefix)
+
+def reference_sha256(output):
+    """sha256 da saída referenciada por reference(), ou None se ela não está (íntegra) no acervo."""
+    directory, key = str(output)[len(reference_prefix):].split("::", 1)
+    if not (Path(directory) / "indice.db").exists():
+        return None
+    return open_archive(directory).sha256(key)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lista e exporta para WAV as saídas de um acervo")
+    parser.add_argument("acervo", help="pasta do acervo (ex.: data/acervo)")
+    parser.add_argument("padrao", nargs="?", default="*", help="padrão das chaves (fnmatch)")
+    parser.add_argument("--destino", help="pasta onde recriar os WAVs (sem ela, só lista as chaves)")
+    parser.add_argument("--subtype", help="subtipo do WAV (ex.: PCM_16, FLOAT); padrão do soundfile")
+    args = parser.parse_args(argv)
+
+    with OutputArchive(args.acervo) as archive:
+        keys = archive.keys(args.padrao)
+        for key in keys:
+            if args.destino is None:
+                signal, sr = archive.get(key)
+                print(f"{key}\t{signal.shape}\t{sr} Hz")
+            else:
+                archive.export_wav(key, Path(args.destino) / key.lstrip("/"), args.subtype)
+    if args.destino is not None:
+        print(f"{len(keys)} saídas exportadas para {args.destino}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
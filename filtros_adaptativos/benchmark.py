@@ -0,0 +1,236 @@
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from . import convergencia
+from .kernels import kernels_by_name
+from .lineares import lms_filter, nlms_filter, fdaf_filter, pbfdaf_filter
+from .motor_kernel import kernel_filter, klms_filter, nklms_filter
+
+# Benchmark de desempenho dos filtros em sinais sintéticos: amostras por
+# segundo, fator de tempo real (RTF) a 16 kHz, pico de memória e curvas de
+# escala por ordem, tamanho de dicionário e duração do sinal. Os resultados
+# são gravados em JSON e podem ser comparados com uma execução de referência.
+# Com --kapa, compara também o modo KAPA (projection=K) com o KLMS/NKLMS de uma
+# amostra por vez em uma tarefa não linear com dicionário longo: vazão, amostra
+# de convergência, amostras até o NMSE do K = 1 e NMSE final
+# (convergencia.convergence) de cada K.
+#
+#   python -m filtros_adaptativos.benchmark --output bench.json
+#   python -m filtros_adaptativos.benchmark --quick --baseline bench.json --threshold 0.2
+#   python -m filtros_adaptativos.benchmark --quick --kapa --only kapa
+
+sample_rate = 16000
+
+def synthetic_signals(n_samples, seed=0):
+    """Entrada ruidosa x e referência d = x filtrado por um FIR com decaimento + ruído."""
+    rng = np.random.default_rng(seed)
+    x = rng.standard_normal(n_samples) * 0.1
+    h = rng.standard_normal(64) * np.exp(-np.arange(64) / 16)
+    d = np.convolve(x, h)[:n_samples] + 0.01 * rng.standard_normal(n_samples)
+    return x, d
+
+def nonlinear_signals(n_samples, seed=0):
+    """
+    Entrada uniforme x e referência d = g(x[n-1], x[n-2]) + ruído, com g suave e
+    não linear: com um dicionário longo, o KLMS leva milhares de amostras para aprendê-la.
+    """
+    rng = np.random.default_rng(seed)
+    x = rng.uniform(-1, 1, n_samples)
+    d = np.zeros(n_samples)
+    d[2:] = (np.sin(2 * x[1:-1]) * np.cos(x[:-2]) + 0.3 * x[1:-1] ** 2
+             + 0.01 * rng.standard_normal(n_samples - 2))
+    return x, d
+
+def benchmark_cases(quick=False):
+    """Lista de (nome, função, parâmetros) cobrindo filtros, kernels, ordens e dicionários."""
+    orders = [64, 256] if quick else [64, 256, 1024]
+    block_orders = [256, 1024] if quick else [256, 1024, 4096]
+    dict_sizes = [8, 32] if quick else [8, 32, 128]
+    n_features = [256] if quick else [64, 256, 1024]
+    projections = [4] if quick else [2, 4, 8]
+
+    cases = []
+    for order in orders:
+        cases.append((f"lms[order={order}]", lms_filter, {"mu": 0.001, "filter_order": order}))
+        cases.append((f"nlms[order={order}]", nlms_filter, {"mu": 0.4, "filter_order": order}))
+    for order in block_orders:
+        cases.append((f"fdaf[order={order}]", fdaf_filter, {"mu": 0.4, "filter_order": order}))
+        cases.append((f"pbfdaf[order={order},block=128]", pbfdaf_filter,
+                      {"mu": 0.4, "filter_order": order, "block_size": 128}))
+    for kernel_name, kernel_func in kernels_by_name.items():
+        for dict_size in dict_sizes:
+            cases.append((f"klms-{kernel_name}[dict={dict_size}]", klms_filter,
+                          {"mu": 0.6, "kernel_func": kernel_func, "sigma": 5, "max_dict_size": dict_size}))
+            cases.append((f"nklms-{kernel_name}[dict={dict_size}]", nklms_filter,
+                          {"mu": 0.4, "kernel_func": kernel_func, "sigma": 20, "max_dict_size": dict_size}))
+    for kernel_name, kernel_func in kernels_by_name.items():
+        for K in projections:
+            cases.append((f"klms-{kernel_name}-kapa[dict=32,K={K}]", klms_filter,
+                          {"mu": 0.1, "kernel_func": kernel_func, "sigma": 5, "max_dict_size": 32,
+                           "projection": K}))
+            cases.append((f"nklms-{kernel_name}-kapa[dict=32,K={K}]", nklms_filter,
+                          {"mu": 0.4, "kernel_func": kernel_func, "sigma": 20, "max_dict_size": 32,
+                           "projection": K}))
+    for kernel_name in ("gaussian", "laplacian"):
+        for D in n_features:
+            cases.append((f"nklms-{kernel_name}-rff[D={D}]", nklms_filter,
+                          {"mu": 0.4, "kernel_func": kernels_by_name[kernel_name], "sigma": 20,
+                           "max_dict_size": 16, "features": "rff", "n_features": D}))
+    return cases
+
+def run_case(func, params, x, d, repeat=3, memory=True):
+    """Melhor tempo de 'repeat' execuções e, opcionalmente, o pico de memória (MB) de uma execução extra."""
+    seconds = min(_timed(func, params, x, d) for _ in range(repeat))
+    peak_mb = None
+    if memory:
+        tracemalloc.start()
+        func(x, d, **params)
+        peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    return seconds, peak_mb
+
+def _timed(func, params, x, d):
+    start = time.perf_counter()
+    func(x, d, **params)
+    return time.perf_counter() - start
+
+def run_benchmark(lengths, quick=False, repeat=3, memory=True, only=None):
+    results = []
+    for n_samples in lengths:
+        x, d = synthetic_signals(n_samples)
+        for name, func, params in benchmark_cases(quick):
+            if only and only not in name:
+                continue
+            seconds, peak_mb = run_case(func, params, x, d, repeat, memory)
+            results.append({
+                "case": name,
+                "n_samples": n_samples,
+                "seconds": seconds,
+                "samples_per_sec": n_samples / seconds,
+                "rtf": seconds / (n_samples / sample_rate),
+                "peak_mem_mb": peak_mb,
+            })
+            print(f"{name:<36} N={n_samples:<8} {n_samples / seconds:>12.0f} amostras/s  "
+                  f"RTF={results[-1]['rtf']:.3f}" + (f"  pico={peak_mb:.1f} MB" if peak_mb is not None else ""))
+    return results
+
+def projection_comparison(n_samples, quick=False, only=None):
+    """
+    KAPA (projection=K) contra K = 1 com os kernels gaussiano e laplaciano, com e
+    sem normalização, em nonlinear_signals com um dicionário longo (a tarefa
+    leva milhares de amostras para convergir): vazão, amostra de convergência,
+    amostras até 1 dB do NMSE final do filtro de uma amostra por vez
+    (samples_to_target) e NMSE final (dB), com o ganho de NMSE em relação a K = 1.
+    """
+    x, d = nonlinear_signals(n_samples)
+    projections = [1, 4] if quick else [1, 2, 4, 8]
+    dict_size = 1024 if quick else 2048
+    previous = convergencia.interval() or None
+    convergencia.configure(256)
+    reference_power = convergencia.windowed_power(d)
+    results = []
+    try:
+        for kernel_name in ("gaussian", "laplacian"):
+            for normalized in (False, True):
+                single = None
+                for K in projections:
+                    name = f"{'nklms' if normalized else 'klms'}-{kernel_name}-kapa[dict={dict_size},K={K}]"
+                    if only and only not in name:
+                        continue
+                    params = {"mu": 0.1, "kernel_func": kernels_by_name[kernel_name], "kernel_params": {"sigma": 1.0},
+                              "max_dict_size": dict_size, "filter_order": 2, "normalized": normalized,
+                              "projection": K}
+                    start = time.perf_counter()
+                    y = kernel_filter(x, d, **params)
+                    seconds = time.perf_counter() - start
+                    convergencia.take()  # curvas do próprio filtro não entram na comparação
+                    mse = convergencia.windowed_power(d - y)
+                    sample, final_db = convergencia.convergence(mse, reference_power)
+                    if K == 1:
+                        single = final_db
+                    # Amostras até 1 dB do NMSE final do filtro de uma amostra por vez
+                    to_target = (convergencia.convergence(mse, reference_power, target_db=single + 1)[0]
+                                 if final_db is not None and single is not None else None)
+                    results.append({
+                        "case": name,
+                        "n_samples": n_samples,
+                        "samples_per_sec": n_samples / seconds,
+                        "convergence_sample": sample,
+                        "samples_to_target": to_target,
+                        "final_nmse_db": final_db,
+                        "nmse_gain_db": None if final_db is None or single is None else single - final_db,
+                    })
+                    quality = (f"conv={str(sample):<6} alvo={str(to_target):<6} NMSE={final_db:6.2f} dB"
+                               if final_db is not None else "divergiu")
+                    if K > 1 and results[-1]["nmse_gain_db"] is not None:
+                        quality += f"  ganho={results[-1]['nmse_gain_db']:+.2f} dB"
+                    print(f"{name:<40} N={n_samples:<8} {n_samples / seconds:>10.0f} amostras/s  {quality}")
+    finally:
+        convergencia.configure(previous)
+    return results
+
+def compare(results, baseline, threshold):
+    """
+    Casos (nome, N) cuja vazão caiu mais que 'threshold' (fração) em relação à
+    referência. Retorna uma lista de (caso, N, vazão de referência, vazão atual).
+    """
+    reference = {(r["case"], r["n_samples"]): r["samples_per_sec"] for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        ref = reference.get((r["case"], r["n_samples"]))
+        if ref is not None and r["samples_per_sec"] < (1 - threshold) * ref:
+            regressions.append((r["case"], r["n_samples"], ref, r["samples_per_sec"]))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de vazão dos filtros adaptativos")
+    parser.add_argument("--lengths", type=int, nargs="+", help="durações dos sinais em amostras")
+    parser.add_argument("--quick", action="store_true", help="grade reduzida e sinais curtos")
+    parser.add_argument("--repeat", type=int, default=3, help="execuções por caso (vale a melhor)")
+    parser.add_argument("--no-memory", action="store_true", help="não medir o pico de memória")
+    parser.add_argument("--only", help="executa só os casos cujo nome contém este texto")
+    parser.add_argument("--kapa", action="store_true",
+                        help="compara o KAPA com o KLMS/NKLMS de uma amostra por vez (convergência e NMSE)")
+    parser.add_argument("--output", help="arquivo JSON de saída")
+    parser.add_argument("--baseline", help="JSON de uma execução anterior para comparação")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="queda de vazão tolerada em relação à referência (fração)")
+    args = parser.parse_args(argv)
+
+    lengths = args.lengths or ([4000] if args.quick else [16000, 64000])
+    results = run_benchmark(lengths, args.quick, args.repeat, not args.no_memory, args.only)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "sample_rate": sample_rate,
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    if args.kapa:
+        report["kapa"] = projection_comparison(8000 if args.quick else 16000, args.quick, args.only)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for case, n_samples, ref, current in regressions:
+            print(f"⚠️ Regressão: {case} N={n_samples}: {ref:.0f} → {current:.0f} amostras/s")
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
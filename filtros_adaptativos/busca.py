@@ -0,0 +1,112 @@
+import math
+from collections import defaultdict
+
+import numpy as np
+import soundfile as sf
+
+from .metricas import default_metrics, metrics_by_name
+from .varredura import run_sweep
+
+# Busca adaptativa de hiperparâmetros sobre os jobs de expand_jobs. Uma
+# configuração é (filtro, kernel, parâmetros), e seus jobs são a configuração
+# aplicada a cada arquivo.
+#
+# successive_halving filtra todas as configurações só no início de cada sinal
+# (min_samples amostras) e as ordena pela média da métrica de triagem nos
+# arquivos. A melhor fração 1/eta segue para a próxima rodada, com um trecho
+# eta vezes maior, até o sinal inteiro. Só as finalistas rodam completas, com
+# todas as métricas, gravando saídas, cache e linhas como run_sweep.
+#
+# hyperband repete a halving em brackets que trocam número de configurações
+# por trecho inicial: o primeiro sorteia muitas configurações e começa em
+# min_samples; o último avalia poucas, direto no sinal inteiro.
+#
+# Configurações que divergem (NaN/inf, ou interrompidas por
+# divergencia.configure) recebem nota -inf e saem na primeira rodada em que
+# aparecem.
+
+def config_key(job):
+    """Identifica a configuração de um job (o mesmo filtro e parâmetros em outro arquivo dá a mesma chave)."""
+    return job["filtro"], job["kernel"], tuple(sorted(job["params"].items()))
+
+def _group(jobs):
+    groups = defaultdict(list)
+    for job in jobs:
+        groups[config_key(job)].append(job)
+    return groups
+
+def _longest(jobs, clean_path, signals=None):
+    # Maior número de amostras processadas entre os arquivos dos jobs
+    def length(path):
+        if signals is not None and str(path) in signals:
+            return np.shape(signals[str(path)][0])[-1]
+        return sf.info(str(path)).frames
+    clean = length(clean_path)
+    return max(min(length(job["arquivo"]), clean) for job in jobs)
+
+def _scores(jobs, rows, metric):
+    # Média da métrica de cada configuração nos arquivos; falha ou divergência vale -inf
+    column = metrics_by_name[metric][0]
+    values = defaultdict(list)
+    for job, row in zip(jobs, rows):
+        value = row.get(column)
+        values[config_key(job)].append(value if value is not None and np.isfinite(value) else -np.inf)
+    return {key: float(np.mean(v)) for key, v in values.items()}
+
+def successive_halving(jobs, clean_path, corrupted_dir, min_samples=16000, eta=3, metric="segsnr",
+                       finalists=1, metrics=default_metrics, **sweep_args):
+    """
+    Successive halving sobre as configurações dos jobs.
+
+    As rodadas de triagem usam só a métrica 'metric' (de metricas.metrics_by_name)
+    e não gravam nada (nem chamam on_rows). sweep_args vai para run_sweep
+    (workers, cache, columns, on_rows, signals, ...). Retorna (linhas das
+    finalistas no sinal inteiro, histórico), com uma entrada de histórico por
+    rodada: amostras, número de configurações e nota de cada configuração.
+    """
+    groups = _group(jobs)
+    keys = list(groups)
+    longest = _longest(jobs, clean_path, sweep_args.get("signals"))
+    screen_args = {k: v for k, v in sweep_args.items() if k != "on_rows"}
+    budget = int(min_samples)
+    history = []
+
+    while len(keys) > finalists and budget < longest:
+        rung = [job for key in keys for job in groups[key]]
+        print(f"Triagem: {len(keys)} configurações em {budget} amostras")
+        rows = run_sweep(rung, clean_path, corrupted_dir, metrics=(metric,), max_samples=budget, **screen_args)
+        scores = _scores(rung, rows, metric)
+        history.append({"amostras": budget, "configuracoes": len(keys), "notas": scores})
+        ranked = sorted(keys, key=lambda key: scores[key], reverse=True)
+        keys = [key for key in ranked[:max(finalists, len(keys) // eta)] if scores[key] > -np.inf]
+        budget *= eta
+
+    final = [job for key in keys for job in groups[key]]
+    return run_sweep(final, clean_path, corrupted_dir, metrics=metrics, **sweep_args), history
+
+def hyperband(jobs, clean_path, corrupted_dir, min_samples=16000, eta=3, metric="segsnr", seed=0,
+              metrics=default_metrics, **sweep_args):
+    """
+    Hyperband: brackets de successive_halving com configurações sorteadas (seed)
+    entre as dos jobs. O bracket s começa em longest/eta^s amostras com
+    ceil((s_max+1)/(s+1)·eta^s) configurações. Retorna (linhas das vencedoras
+    de cada bracket, histórico de cada bracket).
+    """
+    groups = _group(jobs)
+    keys = list(groups)
+    longest = _longest(jobs, clean_path, sweep_args.get("signals"))
+    s_max = max(int(math.floor(math.log(longest / min_samples, eta) + 1e-9)), 0)
+    rng = np.random.default_rng(seed)
+
+    rows = []
+    history = []
+    for s in range(s_max, -1, -1):
+        n = math.ceil((s_max + 1) / (s + 1) * eta ** s)
+        pick = np.sort(rng.choice(len(keys), size=min(n, len(keys)), replace=False))
+        bracket = [job for i in pick for job in groups[keys[i]]]
+        bracket_rows, bracket_history = successive_halving(
+            bracket, clean_path, corrupted_dir, min_samples=longest // eta ** s, eta=eta, metric=metric,
+            finalists=1, metrics=metrics, **sweep_args)
+        rows.extend(bracket_rows)
+        history.append(bracket_history)
+    return rows, history
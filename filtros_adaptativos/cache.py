@@ -0,0 +1,171 @@
+import ast
+import hashlib
+import json
+import sqlite3
+import time
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from . import acervo
+
+# Cache de resultados endereçado por conteúdo: a chave de um job é o hash do
+# conteúdo do WAV corrompido e da referência limpa (ou dos sinais em memória),
+# do filtro, kernel, todos os hiperparâmetros, das métricas e da precisão
+# escolhidas e da versão do código dos filtros/métricas. Um job cuja chave já
+# está no cache e cuja saída em data/result_* continua íntegra não é
+# recalculado; a linha de métricas guardada é reaproveitada.
+
+# Módulos de onde parte a versão do código: a varredura (filtros, métricas,
+# alinhamento e corte dos sinais, ajustes de mu, geração dos corrompidos em
+# memória) e o processamento em fluxo. code_modules acrescenta todo módulo do
+# pacote que eles importam, direta ou indiretamente, então um módulo novo
+# usado pelos filtros ou métricas entra no hash sem ser listado aqui.
+code_roots = ("varredura.py", "tempo_real.py")
+
+def _package_imports(path):
+    # Módulos do pacote importados por path (from . import x, from .x import y), inclusive dentro de funções
+    names = set()
+    for node in ast.walk(ast.parse(path.read_bytes())):
+        if isinstance(node, ast.ImportFrom) and node.level == 1:
+            if node.module:
+                names.add(node.module.split(".")[0] + ".py")
+            else:
+                names.update(alias.name + ".py" for alias in node.names)
+    return {name for name in names if (path.parent / name).exists()}
+
+def code_modules():
+    """Arquivos do pacote cujo código define as saídas e as métricas guardadas no cache, em ordem."""
+    package = Path(__file__).parent
+    found, todo = set(), list(code_roots)
+    while todo:
+        name = todo.pop()
+        if name not in found:
+            found.add(name)
+            todo.extend(_package_imports(package / name))
+    return sorted(found)
+
+@lru_cache(maxsize=None)
+def code_version():
+    digest = hashlib.sha256()
+    for name in code_modules():
+        digest.update(name.encode())
+        digest.update((Path(__file__).parent / name).read_bytes())
+    return digest.hexdigest()[:16]
+
+@lru_cache(maxsize=1024)
+def _file_hash(path, mtime_ns, size):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def file_hash(path):
+    """sha256 do conteúdo do arquivo (memorizado enquanto mtime e tamanho não mudam)."""
+    stat = Path(path).stat()
+    return _file_hash(str(path), stat.st_mtime_ns, stat.st_size)
+
+def output_hash(output):
+    """sha256 da saída de um job (WAV ou referência do acervo.py), ou None se ela sumiu."""
+    if acervo.is_reference(output):
+        return acervo.reference_sha256(output)
+    return file_hash(output) if Path(output).exists() else None
+
+def array_hash(array):
+    """sha256 do conteúdo, do formato e do tipo de um sinal em memória."""
+    array = np.ascontiguousarray(array)
+    digest = hashlib.sha256(f"{array.dtype.str}{array.shape}".encode())
+    digest.update(array.data)
+    return digest.hexdigest()
+
+def _json_value(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+class ResultCache:
+    """
+    Índice do cache na tabela 'cache' do banco SQLite 'path' (pode ser o mesmo
+    banco das métricas). Cada entrada guarda o caminho (ou a referência no
+    acervo) e o sha256 da saída, a linha de métricas e a versão do código que
+    a gerou.
+    """
+    def __init__(self, path, timeout=60):
+        self.conn = sqlite3.connect(str(path), timeout=timeout)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS cache (
+            key TEXT PRIMARY KEY, output TEXT, output_sha256 TEXT,
+            code_version TEXT, row TEXT, created REAL)""")
+
+    def key(self, job, clean_path, corrupted_dir, metrics=None, precision=None,
+            input_hash=None, clean_hash=None, archive=None, curves=None):
+        # input_hash/clean_hash (array_hash) substituem o hash dos arquivos para sinais em memória;
+        # archive (pasta do acervo) separa as entradas com saída no acervo das com saída em WAV;
+        # curves (passo das curvas de aprendizado) separa as linhas com colunas de convergência
+        payload = {
+            "input": input_hash or file_hash(job["arquivo"]),
+            "arquivo": str(Path(job["arquivo"]).relative_to(corrupted_dir)),
+            "clean": clean_hash or file_hash(clean_path),
+            "filtro": job["filtro"],
+            "kernel": job["kernel"],
+            "params": sorted((k, _json_value(v)) for k, v in job["params"].items()),
+            "code": code_version(),
+        }
+        if metrics is not None:
+            # A linha guardada só tem as colunas das métricas calculadas
+            payload["metrics"] = list(metrics)
+        if precision is not None:
+            payload["precision"] = precision
+        if archive is not None:
+            payload["archive"] = str(archive)
+        if curves is not None:
+            payload["curves"] = curves
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    def get(self, key):
+        """Linha de métricas do job, ou None se não há entrada válida para a chave."""
+        entry = self.conn.execute("SELECT output, output_sha256, row FROM cache WHERE key = ?",
+                                  (key,)).fetchone()
+        if entry is None:
+            return None
+        output, output_sha256, row = entry
+        current = output_hash(output)
+        if current is None or current != output_sha256:
+            return None
+        return json.loads(row)
+
+    def put(self, key, output, row):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?, ?)",
+                              (key, str(output), output_hash(output), code_version(),
+                               json.dumps(row, default=_json_value), time.time()))
+
+    def evict(self, max_age_days=None):
+        """
+        Remove entradas inválidas: geradas por outra versão do código, cuja saída
+        sumiu ou foi alterada, ou (com max_age_days) mais antigas que o limite.
+        Retorna o número de entradas removidas.
+        """
+        stale = []
+        oldest = time.time() - max_age_days * 86400 if max_age_days is not None else None
+        for key, output, output_sha256, version, created in self.conn.execute(
+                "SELECT key, output, output_sha256, code_version, created FROM cache"):
+            if (version != code_version()
+                    or (oldest is not None and created < oldest)
+                    or output_sha256 is None
+                    or output_hash(output) != output_sha256):
+                stale.append((key,))
+        with self.conn:
+            self.conn.executemany("DELETE FROM cache WHERE key = ?", stale)
+        return len(stale)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
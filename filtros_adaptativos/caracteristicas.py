@@ -0,0 +1,230 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from .kernels import gaussian_kernel, laplacian_kernel, gram_kernels
+from .multicanal import row_mask
+from .precisao import adopt_precision
+from . import divergencia
+from . import convergencia
+
+# KLMS/NKLMS em um espaço de características de dimensão fixa D: cada janela
+# x_n é levada a z(x_n) ∈ R^D com z(x)·z(c) ≈ kernel(x, c) e o filtro vira um
+# (N)LMS linear sobre z. O custo por amostra é um produto matriz-vetor O(D·L),
+# calculado em bloco para várias amostras (e vários arquivos) de uma vez, sem
+# gerenciamento de dicionário. Dois mapas:
+#   "rff"      Random Fourier Features (kernels invariantes a deslocamento):
+#              z(x) = sqrt(2/D)·cos(Ωx + b), com as linhas de Ω amostradas da
+#              densidade espectral do kernel — normal para o gaussiano e Cauchy
+#              multivariada para o laplaciano (norma L2)
+#   "nystrom"  base de Nyström: D janelas do início do sinal viram centros e
+#              z(x) = Λ^(-1/2)·Uᵀ·k(C, x), com K_CC = U·Λ·Uᵀ (qualquer kernel de
+#              kernels.gram_kernels). Até existirem 'warmup' janelas o filtro é
+#              o KLMS exato, com todas as janelas vistas como centros; a base é
+#              montada com elas e os pesos partem da projeção desse filtro
+#              (w = Σ α_i z(x_i)). Assim a base só depende do passado, e o
+#              resultado é o mesmo com o sinal inteiro ou bloco a bloco
+# O gerador aleatório é semeado (seed), então o mapa é reprodutível.
+
+def random_fourier_features(kernel_func, sigma, filter_order, n_features=256, seed=0):
+    """Frequências Ω (D, L) e fases b (D,) das RFF do kernel gaussiano ou laplaciano."""
+    rng = np.random.default_rng(seed)
+    omega = rng.standard_normal((n_features, filter_order)) / sigma
+    if kernel_func == laplacian_kernel:
+        # Cauchy multivariada = normal dividida pela raiz de uma qui-quadrado com 1 grau
+        omega /= np.sqrt(rng.chisquare(1, size=(n_features, 1)))
+    elif kernel_func != gaussian_kernel:
+        raise ValueError(f"Kernel {kernel_func.__name__} não tem Random Fourier Features")
+    phase = rng.uniform(0, 2 * np.pi, n_features)
+    return omega, phase
+
+def nystrom_basis(windows, kernel_func, kernel_params, n_features=256, seed=0, rtol=1e-10):
+    """
+    Centros C (D, L) escolhidos ao acaso entre as janelas e a projeção T (D, D')
+    tal que z(x) = k(x, C) @ T. Autovalores de K_CC abaixo de rtol·máximo são
+    descartados (janelas repetidas, silêncio), então D' ≤ D.
+    """
+    if kernel_func not in gram_kernels:
+        raise ValueError(f"Kernel {kernel_func.__name__} não suporta a base de Nyström")
+    rng = np.random.default_rng(seed)
+    pick = rng.choice(len(windows), size=min(n_features, len(windows)), replace=False)
+    centers = np.array(windows[np.sort(pick)])
+    energy = np.sum(centers * centers, axis=1)
+    gram = gram_kernels[kernel_func](energy[:, None], energy[None, :], centers @ centers.T, **kernel_params)
+    eigval, eigvec = np.linalg.eigh(gram)
+    keep = eigval > rtol * eigval.max()
+    return centers, eigvec[:, keep] / np.sqrt(eigval[keep])
+
+class FeatureKLMS:
+    """
+    KLMS (ou NKLMS, com normalized=True) no espaço de características.
+
+    x e d podem ser (N,) ou (R, N): com R linhas, R sinais independentes (ex.:
+    arquivos de mesmo tamanho) são filtrados juntos, cada um com seus pesos, e
+    mu pode ser um escalar ou um vetor (R,); lengths (R,) marca o trecho válido
+    de linhas de tamanhos diferentes. Como nos outros filtros com estado,
+    process() pode ser chamado bloco a bloco, com blocos de qualquer tamanho. A
+    base de Nyström é montada com as primeiras 'warmup' janelas (primeira
+    linha), acumuladas entre as chamadas; até lá o filtro é o KLMS exato.
+    Pesos de uma linha (ex.: de um warm start) valem para todas as R linhas.
+    """
+    config_names = ("mu", "kernel_func", "kernel_params", "filter_order", "n_features", "features",
+                    "normalized", "epsilon", "seed", "warmup", "block_size")
+    state_names = ("w", "history", "n", "dtype", "centers", "projection", "center_energy",
+                   "warmup_windows", "warmup_alpha", "warmup_energy", "warmup_count")
+    learned_names = ("w", "centers", "projection", "center_energy")
+
+    def __init__(self, mu=0.10, kernel_func=gaussian_kernel, kernel_params=None, filter_order=16,
+                 n_features=256, features="rff", normalized=False, epsilon=1e-8, seed=0,
+                 warmup=4096, block_size=1024):
+        if features not in ("rff", "nystrom"):
+            raise ValueError(f"Mapa de características desconhecido: {features}")
+        self.mu = mu
+        self.kernel_func = kernel_func
+        self.kernel_params = kernel_params if kernel_params is not None else {}
+        self.filter_order = filter_order
+        self.n_features = n_features
+        self.features = features
+        self.normalized = normalized
+        self.epsilon = epsilon
+        self.seed = seed
+        self.warmup = warmup
+        self.block_size = block_size
+        if features == "rff":
+            self.omega, self.phase = random_fourier_features(kernel_func, self.kernel_params.get("sigma", 1.4),
+                                                             filter_order, n_features, seed)
+        else:
+            self.centers = None
+            # Janelas, coeficientes e energias do KLMS exato de antes da base (R, warmup, ...)
+            self.warmup_windows = None
+            self.warmup_alpha = None
+            self.warmup_energy = None
+            self.warmup_count = 0
+        self.w = None        # pesos (R, D)
+        self.history = None  # últimas filter_order amostras de cada linha (R, L)
+        self.n = 0           # amostras já processadas
+        self.dtype = np.dtype(np.float64)
+
+    def transform(self, windows):
+        """Características z das janelas (..., L) → (..., D)."""
+        if self.features == "rff":
+            return np.sqrt(2 / self.n_features) * np.cos(windows @ self.omega.T + self.phase)
+        xx = np.sum(windows * windows, axis=-1)[..., None]
+        k = gram_kernels[self.kernel_func](xx, self.center_energy, windows @ self.centers.T, **self.kernel_params)
+        return k @ self.projection
+
+    def process(self, x, d, lengths=None):
+        x, d = adopt_precision(self, x, d)
+        single = x.ndim == 1
+        X = np.atleast_2d(x)
+        Dm = np.atleast_2d(d)
+        R, N = X.shape
+        L = self.filter_order
+        if self.history is None:
+            self.history = np.zeros((R, L), dtype=self.dtype)
+        buf = np.concatenate([self.history, X], axis=1)
+        windows = sliding_window_view(buf, L, axis=1)  # windows[:, i] = x[i-L:i]
+        start = max(L - self.n, 0)
+        mu = np.asarray(self.mu, dtype=self.dtype)
+        mask = row_mask(lengths, X.shape)
+        y = np.zeros((R, N), dtype=self.dtype)
+        every = divergencia.interval()
+        rec = convergencia.interval()
+        norms = convergencia.allocate((R,), N)
+
+        if self.features == "nystrom" and self.centers is None:
+            start = self._process_warmup(windows, Dm, y, mu, mask, start)
+        if self.w is None and self.features == "rff":
+            self.w = np.zeros((R, self.n_features), dtype=self.dtype)
+        elif self.w is not None and len(self.w) != R:
+            if self.n or len(self.w) != 1:
+                raise ValueError(f"Filtro com {len(self.w)} linhas recebeu um sinal de {R} linhas")
+            self.w = np.tile(self.w, (R, 1))
+
+        w = self.w  # None enquanto a base de Nyström não existe (start == N)
+        for b0 in range(start, N, self.block_size):
+            b1 = min(b0 + self.block_size, N)
+            Z = self.transform(windows[:, b0:b1])  # (R, B, D)
+            if self.normalized:
+                power = self.epsilon + np.sum(Z * Z, axis=-1)
+            for j in range(b1 - b0):
+                z = Z[:, j]
+                y_n = np.sum(w * z, axis=1)
+                e = Dm[:, b0 + j] - y_n
+                if mask is not None:
+                    e *= mask[:, b0 + j]
+                step = mu * e / power[:, j] if self.normalized else mu * e
+                w += step[:, None] * z
+                y[:, b0 + j] = y_n
+                if every and (b0 + j) % every == 0:
+                    divergencia.check(self.n + b0 + j, e, w)
+                if rec and (b0 + j) % rec == rec - 1:
+                    norms[:, (b0 + j) // rec] = np.linalg.norm(w, axis=1)
+
+        if norms is not None:
+            if w is not None:
+                norms[:, -1] = np.linalg.norm(w, axis=1)
+            convergencia.store("norma dos pesos", norms[0] if single else norms)
+        self.history = buf[:, buf.shape[1] - L:].copy()
+        self.n += N
+        if mask is not None:
+            y *= mask
+        return y[0] if single else y
+
+    def _process_warmup(self, windows, Dm, y, mu, mask, start):
+        """
+        KLMS exato (todas as janelas como centros) até juntar 'warmup' janelas;
+        então monta a base de Nyström com elas e projeta o filtro nela (self.w).
+        Preenche y e retorna a primeira amostra a filtrar no espaço de
+        características (len(y) se a base ainda não existe).
+        """
+        R, N = y.shape
+        gram_func = gram_kernels[self.kernel_func]
+        kernel_params = self.kernel_params
+        if self.warmup_windows is None:
+            self.warmup_windows = np.zeros((R, self.warmup, self.filter_order), dtype=self.dtype)
+            self.warmup_alpha = np.zeros((R, self.warmup), dtype=self.dtype)
+            self.warmup_energy = np.zeros((R, self.warmup), dtype=self.dtype)
+        elif len(self.warmup_windows) != R:
+            raise ValueError(f"Filtro com {len(self.warmup_windows)} linhas recebeu um sinal de {R} linhas")
+        centers = self.warmup_windows
+        alpha = self.warmup_alpha
+        energy = self.warmup_energy
+        every = divergencia.interval()
+
+        for i in range(start, N):
+            m = self.warmup_count
+            x_n = windows[:, i]
+            xx = np.sum(x_n * x_n, axis=1)
+            y_n = np.zeros(R, dtype=self.dtype)
+            if m:
+                k = gram_func(xx[:, None], energy[:, :m], np.einsum("rml,rl->rm", centers[:, :m], x_n),
+                              **kernel_params)
+                y_n = np.sum(alpha[:, :m] * k, axis=1)
+            e = Dm[:, i] - y_n
+            if mask is not None:
+                e *= mask[:, i]
+            if self.normalized:
+                alpha[:, m] = mu * e / (self.epsilon + gram_func(xx, xx, xx, **kernel_params))
+            else:
+                alpha[:, m] = mu * e
+            centers[:, m] = x_n
+            energy[:, m] = xx
+            y[:, i] = y_n
+            self.warmup_count = m + 1
+            if every and i % every == 0:
+                divergencia.check(self.n + i, e, alpha)
+
+            if self.warmup_count == self.warmup:
+                self.centers, projection = nystrom_basis(centers[0], self.kernel_func, kernel_params,
+                                                         self.n_features, self.seed)
+                self.center_energy = np.sum(self.centers * self.centers, axis=1)
+                self.projection = projection.astype(self.dtype)
+                self.w = np.einsum("rm,rmd->rd", alpha, self.transform(centers))
+                self.warmup_windows = self.warmup_alpha = self.warmup_energy = None
+                return i + 1
+        return N
+
+def feature_filter(x, d, mu, kernel_func, kernel_params, filter_order=16, n_features=256,
+                   features="rff", normalized=False, epsilon=1e-8, seed=0, lengths=None):
+    """Sinal (N,) ou lote (R, N) filtrado de uma vez pelo FeatureKLMS."""
+    return FeatureKLMS(mu, kernel_func, kernel_params, filter_order, n_features, features,
+                       normalized, epsilon, seed).process(x, d, lengths)
@@ -0,0 +1,109 @@
+import numpy as np
+
+# Curvas de aprendizado (opcionais). Com configure(every), os filtros registram
+# a cada 'every' amostras, em arrays pré-alocados no início de cada chamada:
+#   "norma dos pesos"           LMS, NLMS, FDAF, PBFDAF e modo de características
+#   "energia dos coeficientes"  Σα² do dicionário do KLMS/NKLMS
+# O ponto k é o estado ao fim da janela [k·every, (k+1)·every) da chamada.
+# Cada filtro guarda suas curvas em 'curves' ao terminar; a varredura as
+# recolhe com take() logo após cada filtro e acrescenta as curvas da saída
+# ("mse" e "potência da referência", médias de e² e d² em cada janela), iguais
+# para todos os filtros. O custo nos laços é um teste por amostra e uma norma
+# a cada 'every' amostras. Sem configure (o padrão) nada é registrado.
+
+every = None
+curves = {}
+
+# Chave das curvas nas linhas da varredura (gravadas à parte por metricas.MetricsStore)
+row_key = "curvas"
+
+def configure(new_every=256):
+    """Liga (new_every amostras por ponto) ou desliga (new_every=None) o registro das curvas."""
+    global every
+    every = int(new_every) if new_every else None
+    curves.clear()
+
+def config():
+    """Argumentos de configure() do processo atual (initargs dos pools de processos)."""
+    return (every,)
+
+def interval():
+    """Amostras por ponto das curvas, ou 0 com o registro desligado."""
+    return every or 0
+
+def allocate(lead, n):
+    """Curva (*lead, ceil(n/every)) preenchida com NaN para uma chamada de n amostras (None desligado)."""
+    if not every or n <= 0:
+        return None
+    return np.full(tuple(lead) + (-(-n // every),), np.nan)
+
+def store(name, curve, last=None):
+    """
+    Guarda a curva do filtro que acabou de rodar. last é o valor ao fim da
+    chamada (último ponto, que pode cobrir uma janela incompleta); janelas sem
+    registro (blocos maiores que every) repetem o ponto anterior.
+    """
+    if curve is None:
+        return
+    if last is not None:
+        curve[..., -1] = last
+    valid = ~np.isnan(curve)
+    index = np.where(valid, np.arange(curve.shape[-1]), 0)
+    np.maximum.accumulate(index, axis=-1, out=index)
+    curves[name] = np.take_along_axis(curve, index, axis=-1)
+
+def take():
+    """Curvas registradas desde a última chamada (e as esquece)."""
+    taken = dict(curves)
+    curves.clear()
+    return taken
+
+def windowed_power(signal):
+    """Média de signal² em cada janela de every amostras (a última pode ser incompleta)."""
+    n = signal.shape[-1]
+    k = -(-n // every)
+    padded = np.zeros(signal.shape[:-1] + (k * every,))
+    padded[..., :n] = signal
+    power = np.sum(padded.reshape(signal.shape[:-1] + (k, every)) ** 2, axis=-1)
+    sizes = np.full(k, every)
+    sizes[-1] = n - (k - 1) * every
+    return power / sizes
+
+def convergence(mse, reference_power, span=8, tolerance_db=3.0, steady_fraction=0.25, fraction=0.9,
+                target_db=None):
+    """
+    (amostra de convergência, NMSE final em dB) de uma curva de MSE.
+
+    O NMSE é a razão entre o MSE e a potência da referência somados em 'span'
+    janelas vizinhas (razão de somas: janelas de silêncio não dominam). O
+    valor final é o NMSE do último quarto do sinal e o inicial, o das 'span'
+    primeiras janelas. O filtro convergiu na primeira janela em que o NMSE
+    suavizado já percorreu 'fraction' do caminho do inicial ao final; se a
+    melhora total fica abaixo de tolerance_db, não há convergência a medir e a
+    amostra é None. Com target_db (um NMSE alvo comum para comparar filtros),
+    a amostra é a da primeira janela com NMSE suavizado até target_db (None se
+    não chega). Com vários canais vale a média das curvas. (None, None) se a
+    curva tem NaN/inf (filtro divergiu).
+    """
+    mse = np.mean(np.atleast_2d(mse), axis=0)
+    reference_power = np.mean(np.atleast_2d(reference_power), axis=0)
+    if not np.all(np.isfinite(mse)) or len(mse) == 0:
+        return None, None
+    kernel = np.ones(min(span, len(mse)))
+    smooth = 10 * np.log10((np.convolve(mse, kernel, "same") + 1e-20)
+                           / (np.convolve(reference_power, kernel, "same") + 1e-20))
+    tail = max(int(len(mse) * steady_fraction), 1)
+    final = 10 * np.log10((np.sum(mse[-tail:]) + 1e-20) / (np.sum(reference_power[-tail:]) + 1e-20))
+    if target_db is None:
+        head = len(kernel)
+        initial = 10 * np.log10((np.sum(mse[:head]) + 1e-20) / (np.sum(reference_power[:head]) + 1e-20))
+        if initial - final < tolerance_db:
+            return None, float(final)
+        target_db = initial - fraction * (initial - final)
+    below = np.flatnonzero(smooth <= target_db)
+    return (int(below[0] * every) if len(below) else None), float(final)
+
+def columns(taken):
+    """Colunas da planilha a partir das curvas de um job."""
+    sample, final = convergence(taken["mse"], taken["potência da referência"])
+    return {"Convergência (amostra)": sample, "NMSE final (dB)": final}
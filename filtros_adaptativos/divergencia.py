@@ -0,0 +1,52 @@
+import numpy as np
+
+# Aborto por divergência. Com um limite definido (configure), os filtros
+# verificam a cada check_every amostras (ou a cada bloco, no FDAF/PBFDAF) se o
+# erro ou os pesos/coeficientes passaram do limite ou viraram NaN/inf:
+#   - filtros de uma configuração (lineares.py, motor_kernel.py,
+#     caracteristicas.py) levantam DivergenceError, sem processar o resto do sinal;
+#   - os lotes de lote.py param só as configurações que divergiram (pesos e
+#     passo zerados) e devolvem NaN na saída delas a partir da amostra da parada.
+# Sem limite (o padrão) nada é verificado.
+
+limit = None
+check_every = 256
+
+class DivergenceError(FloatingPointError):
+    """O erro ou os pesos do filtro passaram do limite na amostra 'sample'."""
+    def __init__(self, sample, value):
+        super().__init__(f"Filtro divergiu na amostra {sample} (|valor| = {value:g})")
+        self.sample = sample
+        self.value = value
+
+def configure(new_limit=1e4, every=256):
+    """Liga (new_limit) ou desliga (new_limit=None) a verificação de divergência."""
+    global limit, check_every
+    limit = new_limit
+    check_every = every
+
+def config():
+    """Argumentos de configure() do processo atual (initargs dos pools de processos)."""
+    return limit, check_every
+
+def interval():
+    """Intervalo entre verificações, ou 0 com a verificação desligada."""
+    return check_every if limit is not None else 0
+
+def check(sample, *arrays):
+    """Levanta DivergenceError se algum valor de arrays passa do limite ou não é finito."""
+    value = max(float(np.max(np.abs(a), initial=0.0)) for a in arrays)
+    if not value <= limit:
+        raise DivergenceError(sample, value)
+
+def diverged_rows(*arrays):
+    """Máscara das linhas (eixo 0) com algum valor acima do limite ou não finito."""
+    value = np.max([np.max(np.abs(a).reshape(len(a), -1), axis=1, initial=0.0) for a in arrays], axis=0)
+    return ~(value <= limit)
+
+def first_divergence(y):
+    """Primeira amostra não finita da saída (None se toda a saída é finita)."""
+    bad = ~np.isfinite(y)
+    if not bad.any():
+        return None
+    return int(np.argmax(bad.reshape(-1, y.shape[-1]).any(axis=0)))
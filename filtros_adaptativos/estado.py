@@ -0,0 +1,138 @@
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from .caracteristicas import FeatureKLMS
+from .kernels import kernels_by_name
+from .lineares import LMS, NLMS
+from .motor_kernel import KLMS, NKLMS
+
+# Estado serializável dos filtros com estado (LMS, NLMS, KLMS, NKLMS e
+# FeatureKLMS). Cada classe lista em config_names os parâmetros do construtor,
+# em state_names tudo o que process() mantém entre as chamadas (pesos ou
+# dicionário e coeficientes, histórico do regressor, contador de amostras,
+# estatísticas) e em learned_names só a parte aprendida.
+#
+# Dois usos:
+#   checkpoint  save_state grava o estado completo em um .npz (de forma
+#               atômica) e load_state o restaura: o filtro continua do ponto
+#               exato em que parou, com o mesmo resultado de uma execução sem
+#               interrupção (tempo_real.process_wav retoma arquivos longos assim)
+#   warm start  warm_start copia para um filtro novo só a parte aprendida de
+#               outro filtro (ou de um .npz): o histórico, o contador e as
+#               estatísticas recomeçam, como em um arquivo novo, mas os pesos
+#               já partem de um filtro convergido para o mesmo ruído/sala
+#
+# No .npz os arrays ficam como arrays (estado_<nome>) e os parâmetros e
+# escalares como JSON; o kernel é guardado pelo nome (kernels.kernels_by_name).
+
+filter_classes = {cls.__name__: cls for cls in (LMS, NLMS, KLMS, NKLMS, FeatureKLMS)}
+
+# Parâmetros que podem mudar entre a origem e o destino de um warm start
+tunable_names = ("mu", "epsilon", "resync_every", "block_size")
+
+def _to_json(value):
+    if callable(value):
+        names = [name for name, func in kernels_by_name.items() if func is value]
+        if not names:
+            raise ValueError(f"Kernel sem nome em kernels.kernels_by_name: {value!r}")
+        return {"kernel": names[0]}
+    if isinstance(value, np.dtype):
+        return {"dtype": value.str}
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    if isinstance(value, dict):
+        return {k: _to_json(v) for k, v in value.items()}
+    return value
+
+def _from_json(value):
+    if isinstance(value, dict):
+        if set(value) == {"kernel"}:
+            return kernels_by_name[value["kernel"]]
+        if set(value) == {"dtype"}:
+            return np.dtype(value["dtype"])
+        return {k: _from_json(v) for k, v in value.items()}
+    return value
+
+def config(filtro):
+    """Parâmetros do construtor do filtro (type(filtro)(**config(filtro)) cria um filtro novo igual)."""
+    return {name: getattr(filtro, name) for name in filtro.config_names}
+
+def get_state(filtro, names=None):
+    """Cópia do estado do filtro (state_names, ou só os nomes pedidos) como dicionário."""
+    names = filtro.state_names if names is None else names
+    values = {name: getattr(filtro, name, None) for name in names}
+    return {name: np.copy(value) if isinstance(value, np.ndarray) else value
+            for name, value in values.items() if value is not None}
+
+def set_state(filtro, state):
+    """Restaura no filtro um estado de get_state. Retorna o filtro."""
+    for name, value in state.items():
+        setattr(filtro, name, np.copy(value) if isinstance(value, np.ndarray) else value)
+    return filtro
+
+def save_state(filtro, path):
+    """
+    Grava classe, parâmetros e estado completo do filtro em path (.npz). A
+    escrita vai para um arquivo temporário renomeado no fim, então uma
+    interrupção no meio nunca deixa um checkpoint pela metade.
+    """
+    path = Path(path)
+    state = get_state(filtro)
+    arrays = {f"estado_{name}": value for name, value in state.items() if isinstance(value, np.ndarray)}
+    values = {name: _to_json(value) for name, value in state.items() if not isinstance(value, np.ndarray)}
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        np.savez(f, classe=type(filtro).__name__, config=json.dumps(_to_json(config(filtro))),
+                 valores=json.dumps(values), **arrays)
+    os.replace(tmp, path)
+    return path
+
+def _read(path):
+    with np.load(str(path), allow_pickle=False) as data:
+        state = {name[len("estado_"):]: data[name] for name in data.files if name.startswith("estado_")}
+        state.update({name: _from_json(value) for name, value in json.loads(str(data["valores"])).items()})
+        return str(data["classe"]), _from_json(json.loads(str(data["config"]))), state
+
+def load_state(path, filtro=None):
+    """
+    Filtro salvo com save_state, pronto para continuar de onde parou. Com
+    filtro, o estado é restaurado nele (mesma classe e parâmetros); sem, um
+    filtro novo é criado com os parâmetros gravados.
+    """
+    name, params, state = _read(path)
+    if filtro is None:
+        filtro = filter_classes[name](**params)
+    elif type(filtro).__name__ != name:
+        raise ValueError(f"Estado de um {name} não serve para um {type(filtro).__name__}")
+    return set_state(filtro, state)
+
+def warm_start(filtro, source):
+    """
+    Inicia filtro (ainda não usado) com a parte aprendida de source, um filtro
+    ou o caminho de um .npz de save_state. Origem e destino precisam ser da
+    mesma classe, com os mesmos parâmetros exceto tunable_names (mu, por
+    exemplo, pode ser menor no destino). Retorna o filtro.
+    """
+    if filtro.n:
+        raise ValueError("Warm start só vale para um filtro ainda não usado")
+    if isinstance(source, (str, Path)):
+        name, params, state = _read(source)
+    else:
+        name, params, state = type(source).__name__, config(source), get_state(source)
+    if type(filtro).__name__ != name:
+        raise ValueError(f"Estado de um {name} não serve para um {type(filtro).__name__}")
+    def same(a, b):
+        return json.dumps(_to_json(a), sort_keys=True) == json.dumps(_to_json(b), sort_keys=True)
+    different = [key for key, value in config(filtro).items()
+                 if key not in tunable_names and not same(value, params[key])]
+    if different:
+        raise ValueError(f"Parâmetros diferentes da origem do warm start: {', '.join(different)}")
+    set_state(filtro, {key: value for key, value in state.items() if key in filtro.learned_names})
+    history = state.get("history")
+    if history is not None and filtro.history is not None:
+        # Origem com várias linhas: o destino também (histórico zerado com a mesma forma)
+        filtro.history = np.zeros_like(history)
+    return filtro
@@ -0,0 +1,307 @@
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from pathlib import Path
+
+import numpy as np
+
+from .metricas import default_metrics, metrics_by_name
+from .varredura import cache_lookup, group_tasks, init_worker, metric_row, row_collector, run_task, worker_config
+
+# Fila de jobs em um banco SQLite, para espalhar uma varredura por várias
+# máquinas que compartilham uma pasta (NFS, SMB), sem servidor de mensagens.
+#
+# O coordenador (run_queue) expande os jobs como run_sweep, separa os que já
+# estão no cache, agrupa o resto em tarefas (varredura.group_tasks) e as
+# grava na fila junto com a configuração da varredura (caminhos, métricas,
+# precisão, limite de divergência, curvas). Os trabalhadores (work, ou
+# "python -m filtros_adaptativos.fila fila.db" em cada máquina) pegam uma
+# tarefa por vez em uma transação BEGIN IMMEDIATE, que garante que duas não
+# pegam a mesma, e calculam filtro, métricas e saída (varredura.run_task). A
+# linha de cada job volta pela fila; o coordenador grava as linhas no banco
+# de métricas e no cache, na ordem dos jobs, como run_sweep.
+#
+# Cada tarefa pega tem um lease: enquanto executa, uma thread do trabalhador
+# o renova (heartbeat). Se o trabalhador morre, o lease expira e a tarefa
+# volta a ficar pendente para o próximo trabalhador; depois de max_attempts
+# tentativas ela falha e seus jobs viram linhas com a coluna "Erro". Um
+# trabalhador que perdeu o lease descarta o resultado.
+#
+# O banco da fila usa o journal padrão do SQLite (não WAL, que exige memória
+# compartilhada e não funciona entre máquinas) e deve ser um arquivo próprio,
+# separado do banco de métricas. Todos os processos rodam na pasta do
+# projeto, então os caminhos relativos (data/...) são os mesmos em todas as
+# máquinas; as saídas vão para data/result_*. O acervo (acervo.py) usa WAL e
+# só serve para trabalhadores de uma mesma máquina.
+
+statuses = ("pendente", "executando", "concluida", "falhou")
+
+def _json_default(value):
+    if isinstance(value, np.ndarray):
+        return {"__array__": value.tolist()}
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+def _json_object(value):
+    if set(value) == {"__array__"}:
+        return np.array(value["__array__"])
+    return value
+
+def _dumps(value):
+    return json.dumps(value, default=_json_default)
+
+def _loads(text):
+    return json.loads(text, object_hook=_json_object)
+
+def _task(text):
+    # Tarefa da fila → lista de (índice, job), com o arquivo de volta como Path
+    return [(index, {**job, "arquivo": Path(job["arquivo"])}) for index, job in _loads(text)]
+
+class JobQueue:
+    """
+    Fila no banco SQLite 'path' (criado se não existe): a tabela 'varreduras'
+    guarda a configuração de cada varredura e 'tarefas' as tarefas, com
+    estado (statuses), trabalhador, fim do lease, tentativas, erro e linhas.
+    """
+    def __init__(self, path, timeout=60):
+        self.conn = sqlite3.connect(str(path), timeout=timeout)
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS varreduras (
+            id INTEGER PRIMARY KEY, params TEXT, created REAL)""")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS tarefas (
+            id INTEGER PRIMARY KEY, sweep INTEGER, jobs TEXT, status TEXT, worker TEXT,
+            lease_until REAL, attempts INTEGER, error TEXT, rows TEXT, collected INTEGER,
+            created REAL, finished REAL)""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS tarefas_status ON tarefas (status, id)")
+        self.conn.commit()
+
+    def submit(self, tasks, params):
+        """Grava uma varredura (params: configuração para os trabalhadores) e suas tarefas. Retorna o id."""
+        now = time.time()
+        with self.conn:
+            sweep = self.conn.execute("INSERT INTO varreduras (params, created) VALUES (?, ?)",
+                                      (_dumps(params), now)).lastrowid
+            self.conn.executemany(
+                "INSERT INTO tarefas (sweep, jobs, status, attempts, collected, created) VALUES (?, ?, ?, 0, 0, ?)",
+                [(sweep, _dumps(task), "pendente", now) for task in tasks])
+        return sweep
+
+    def _expire(self, now, max_attempts):
+        # Tarefas cujo trabalhador parou de renovar o lease voltam para a fila (ou falham)
+        self.conn.execute("""UPDATE tarefas SET
+            status = CASE WHEN attempts >= ? THEN 'falhou' ELSE 'pendente' END,
+            finished = CASE WHEN attempts >= ? THEN ? END,
+            error = 'Lease expirado (trabalhador ' || worker || ')', worker = NULL
+            WHERE status = 'executando' AND lease_until < ?""", (max_attempts, max_attempts, now, now))
+
+    def claim(self, worker, lease=60, max_attempts=3):
+        """
+        Pega a tarefa pendente mais antiga para worker por lease segundos.
+        Retorna (id, tarefa, configuração da varredura) ou None se não há tarefa pendente.
+        """
+        now = time.time()
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self._expire(now, max_attempts)
+            entry = self.conn.execute("""SELECT t.id, t.jobs, v.params FROM tarefas t
+                JOIN varreduras v ON v.id = t.sweep WHERE t.status = 'pendente' ORDER BY t.id LIMIT 1""").fetchone()
+            if entry is None:
+                return None
+            task_id, jobs, params = entry
+            self.conn.execute("""UPDATE tarefas SET status = 'executando', worker = ?, lease_until = ?,
+                attempts = attempts + 1 WHERE id = ?""", (worker, now + lease, task_id))
+        return task_id, _task(jobs), _loads(params)
+
+    def _update(self, sql, args, task_id, worker):
+        # Só o dono atual da tarefa pode renová-la, concluí-la ou devolvê-la
+        with self.conn:
+            cursor = self.conn.execute(f"{sql} WHERE id = ? AND worker = ? AND status = 'executando'",
+                                       (*args, task_id, worker))
+        return cursor.rowcount == 1
+
+    def heartbeat(self, task_id, worker, lease=60):
+        """Renova o lease; False se worker não é mais o dono da tarefa."""
+        return self._update("UPDATE tarefas SET lease_until = ?", (time.time() + lease,), task_id, worker)
+
+    def complete(self, task_id, worker, rows):
+        """Grava as linhas (índice, linha) da tarefa concluída; False se o lease foi perdido."""
+        return self._update("UPDATE tarefas SET status = 'concluida', rows = ?, finished = ?, lease_until = NULL",
+                            (_dumps(rows), time.time()), task_id, worker)
+
+    def fail(self, task_id, worker, error, max_attempts=3):
+        """Registra uma falha: a tarefa volta para a fila, ou falha de vez após max_attempts tentativas."""
+        return self._update("""UPDATE tarefas SET
+            status = CASE WHEN attempts >= ? THEN 'falhou' ELSE 'pendente' END,
+            finished = CASE WHEN attempts >= ? THEN ? END, error = ?, worker = NULL""",
+                            (max_attempts, max_attempts, time.time(), error), task_id, worker)
+
+    def release(self, task_id, worker):
+        """Devolve a tarefa à fila sem contar a tentativa (trabalhador interrompido)."""
+        return self._update("UPDATE tarefas SET status = 'pendente', attempts = attempts - 1, worker = NULL",
+                            (), task_id, worker)
+
+    def finished(self, sweep):
+        """
+        Tarefas da varredura terminadas desde a última chamada: (tarefa, linhas
+        ou None se falhou, erro). Cada tarefa é entregue uma única vez.
+        """
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            entries = self.conn.execute("""SELECT id, jobs, status, rows, error FROM tarefas
+                WHERE sweep = ? AND status IN ('concluida', 'falhou') AND collected = 0 ORDER BY id""",
+                                        (sweep,)).fetchall()
+            self.conn.executemany("UPDATE tarefas SET collected = 1 WHERE id = ?",
+                                  [(task_id,) for task_id, *_ in entries])
+        return [(_task(jobs), _loads(rows) if status == "concluida" else None, error)
+                for _, jobs, status, rows, error in entries]
+
+    def counts(self, sweep=None):
+        """Número de tarefas em cada estado (de uma varredura, ou da fila inteira)."""
+        where, args = ("WHERE sweep = ?", (sweep,)) if sweep is not None else ("", ())
+        found = dict(self.conn.execute(f"SELECT status, COUNT(*) FROM tarefas {where} GROUP BY status", args))
+        return {status: found.get(status, 0) for status in statuses}
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _heartbeat(path, task_id, worker, lease, interval, stop):
+    # Conexão própria: conexões SQLite não são compartilhadas entre threads
+    with JobQueue(path) as queue:
+        while not stop.wait(interval):
+            if not queue.heartbeat(task_id, worker, lease):
+                return
+
+def _execute(task, params):
+    init_worker(*params["config"])
+    return run_task(task, Path(params["clean_path"]), Path(params["corrupted_dir"]), params["columns"],
+                    tuple(params["metrics"]), params["precision"], archive=params["archive"])
+
+def work(path, worker=None, lease=60, heartbeat=None, max_attempts=3, poll=2.0, until_empty=False):
+    """
+    Executa tarefas da fila em path, uma por vez. O lease é renovado a cada
+    heartbeat segundos (padrão: lease/4). Sem tarefas pendentes, espera poll
+    segundos e tenta de novo; com until_empty, termina quando não há mais
+    tarefas pendentes nem em execução. Retorna o número de tarefas concluídas.
+    """
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+    heartbeat = heartbeat or lease / 4
+    done = 0
+    with JobQueue(path) as queue:
+        while True:
+            claimed = queue.claim(worker, lease, max_attempts)
+            if claimed is None:
+                counts = queue.counts()
+                if until_empty and not counts["pendente"] and not counts["executando"]:
+                    return done
+                time.sleep(poll)
+                continue
+            task_id, task, params = claimed
+            stop = threading.Event()
+            beat = threading.Thread(target=_heartbeat, args=(path, task_id, worker, lease, heartbeat, stop),
+                                    daemon=True)
+            beat.start()
+            try:
+                rows = _execute(task, params)
+            except Exception as exc:
+                print(f"⚠️ Tarefa {task_id} falhou em {worker}: {type(exc).__name__}: {exc}")
+                queue.fail(task_id, worker, f"{type(exc).__name__}: {exc}", max_attempts)
+                continue
+            except BaseException:
+                queue.release(task_id, worker)
+                raise
+            finally:
+                stop.set()
+                beat.join()
+            if queue.complete(task_id, worker, rows):
+                done += 1
+
+def _failed_rows(task, metrics, columns, error):
+    rows = []
+    for index, job in task:
+        row = metric_row(job, {metrics_by_name[name][0]: None for name in metrics}, None, columns)
+        row["Erro"] = error
+        rows.append((index, row))
+    return rows
+
+def run_queue(jobs, clean_path, corrupted_dir, path, workers=0, batch_size=16, columns=None, on_rows=None,
+              cache=None, metrics=default_metrics, precision="float64", archive=None, lease=60, max_attempts=3,
+              poll=1.0):
+    """
+    Como varredura.run_sweep, mas as tarefas vão para a fila em path e são
+    executadas por trabalhadores (work), nesta ou em outras máquinas. O
+    coordenador inicia workers trabalhadores locais (0: só os de fora) e
+    espera todas as tarefas terminarem, entregando as linhas a on_rows e ao
+    cache em ordem de job. Retorna uma linha por job, em ordem.
+    """
+    columns = columns or {}
+    metrics = tuple(metrics)
+    keys, cached, todo = cache_lookup(jobs, cache, clean_path, corrupted_dir, metrics, precision, archive=archive)
+    collect, rows = row_collector(jobs, keys, cache, corrupted_dir, archive, on_rows)
+    collect(cached, computed=False)
+    tasks = group_tasks(todo, batch_size)
+    if not tasks:
+        return rows
+
+    params = {"clean_path": str(clean_path), "corrupted_dir": str(corrupted_dir), "columns": columns,
+              "metrics": metrics, "precision": precision, "archive": str(archive) if archive is not None else None,
+              "config": worker_config()}
+    with ExitStack() as stack:
+        queue = stack.enter_context(JobQueue(path))
+        sweep = queue.submit(tasks, params)
+        print(f"Fila {path}: varredura {sweep} com {len(tasks)} tarefas ({len(todo)} jobs)")
+        local = []
+        if workers > 0:
+            pool = stack.enter_context(ProcessPoolExecutor(max_workers=workers))
+            local = [pool.submit(work, path, None, lease, None, max_attempts, until_empty=True)
+                     for _ in range(workers)]
+        left = len(tasks)
+        while left:
+            finished = queue.finished(sweep)
+            for task, results, error in finished:
+                if results is None:
+                    print(f"⚠️ Tarefa com {len(task)} jobs falhou: {error}")
+                    results = _failed_rows(task, metrics, columns, error)
+                collect(results)
+                left -= 1
+            if not finished:
+                for future in local:
+                    if future.done() and future.exception() is not None:
+                        raise future.exception()
+                time.sleep(poll)
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Trabalhador da fila de jobs da varredura (ou estado da fila)")
+    parser.add_argument("fila", help="banco SQLite da fila (ex.: /compartilhado/fila.db)")
+    parser.add_argument("--lease", type=float, default=60, help="segundos sem heartbeat até a tarefa voltar à fila")
+    parser.add_argument("--heartbeat", type=float, help="intervalo de renovação do lease (padrão: lease/4)")
+    parser.add_argument("--tentativas", type=int, default=3, help="tentativas por tarefa antes de falhar")
+    parser.add_argument("--ate-esvaziar", action="store_true",
+                        help="termina quando não há tarefas pendentes nem em execução")
+    parser.add_argument("--estado", action="store_true", help="só mostra quantas tarefas há em cada estado")
+    args = parser.parse_args(argv)
+
+    if args.estado:
+        with JobQueue(args.fila) as queue:
+            print(", ".join(f"{status}: {count}" for status, count in queue.counts().items()))
+        return 0
+    done = work(args.fila, lease=args.lease, heartbeat=args.heartbeat, max_attempts=args.tentativas,
+                until_empty=args.ate_esvaziar)
+    print(f"{done} tarefas concluídas")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows: sem getrusage, o pico de memória não é amostrado
+    resource = None
+
+# Instrumentação da varredura: temporizadores de etapa (leitura, alinhamento,
+# filtro, cada métrica, gravação, banco), contadores dos filtros (avaliações de
+# kernel, atualizações do dicionário) e pico de memória do processo.
+#
+# Desligada por padrão: stage() devolve um contexto vazio compartilhado e
+# count() retorna na primeira linha, então o custo nos laços é o de uma
+# chamada de função. Ligada (configure(True, trace_dir)), cada processo soma os
+# tempos e contadores em 'totals' e guarda os eventos, que flush() acrescenta
+# a trace_dir/trace_<pid>.jsonl; write_trace() junta os arquivos em um JSON no
+# formato Trace Event (chrome://tracing, https://ui.perfetto.dev).
+
+enabled = False
+trace_dir = None
+totals = defaultdict(float)  # tempo (s) por etapa e valor de cada contador, neste processo
+_events = []
+
+# Contadores (os demais nomes em totals são etapas, em segundos)
+counters = ("avaliações de kernel", "atualizações do dicionário")
+
+def configure(on=True, directory=None, clear=False):
+    """
+    Liga ou desliga a instrumentação; com directory, os eventos vão para o
+    trace. clear=True apaga os trace_*.jsonl de uma execução anterior (só o
+    processo principal deve pedir isso, antes de criar os pools).
+    """
+    global enabled, trace_dir
+    enabled = on
+    trace_dir = str(directory) if directory is not None else None
+    if trace_dir is not None:
+        os.makedirs(trace_dir, exist_ok=True)
+        if clear:
+            for part in Path(trace_dir).glob("trace_*.jsonl"):
+                part.unlink()
+
+def config():
+    """Argumentos de configure() do processo atual (initargs dos pools de processos)."""
+    return enabled, trace_dir
+
+class _Stage:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        totals[self.name] += end - self.start
+        if trace_dir is not None:
+            pid = os.getpid()
+            _events.append({"name": self.name, "cat": "etapa", "ph": "X", "pid": pid,
+                            "tid": threading.get_ident(), "ts": self.start * 1e6, "dur": (end - self.start) * 1e6})
+            _events.append({"name": "pico de memória do processo (MB)", "ph": "C", "pid": pid, "ts": end * 1e6,
+                            "args": {"pico": peak_memory_mb()}})
+        return False
+
+class _Off:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_off = _Off()
+
+def stage(name):
+    """Contexto que mede o tempo da etapa 'name' (vazio com a instrumentação desligada)."""
+    return _Stage(name) if enabled else _off
+
+def count(name, n=1):
+    """Soma n ao contador 'name'. Nos filtros é chamado uma vez por bloco, não por amostra."""
+    if enabled:
+        totals[name] += n
+
+def peak_memory_mb():
+    """
+    Pico de memória residente do processo (MB), ou None sem getrusage. É o
+    pico desde o início do processo (ru_maxrss) e nunca diminui: medido depois
+    de um job, inclui a memória dos jobs anteriores do mesmo processo.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10  # bytes no macOS, KiB no Linux
+
+def mark():
+    """Cópia dos totais atuais, para medir um trecho com since()."""
+    return dict(totals)
+
+def since(start):
+    """Tempos e contadores acumulados desde mark() (só os que mudaram)."""
+    return {name: value - start.get(name, 0.0) for name, value in totals.items()
+            if value != start.get(name, 0.0)}
+
+def columns(profile):
+    """
+    Colunas da planilha: "t <etapa> (s)" para as etapas, o nome do contador
+    para os contadores e o pico de memória do processo (principal ou
+    trabalhador do pool) até o fim do job, não o pico do job.
+    """
+    row = {(name if name in counters else f"t {name} (s)"): value for name, value in profile.items()}
+    row["pico de memória do processo (MB)"] = peak_memory_mb()
+    return row
+
+def flush():
+    """Acrescenta os eventos pendentes deste processo a trace_dir/trace_<pid>.jsonl."""
+    if not _events or trace_dir is None:
+        return
+    with open(Path(trace_dir) / f"trace_{os.getpid()}.jsonl", "a") as f:
+        for event in _events:
+            f.write(json.dumps(event) + "\n")
+    _events.clear()
+
+def write_trace(directory, path):
+    """Junta os trace_*.jsonl de directory em um arquivo JSON do formato Trace Event."""
+    flush()
+    events = []
+    for part in sorted(Path(directory).glob("trace_*.jsonl")):
+        with open(part) as f:
+            events.extend(json.loads(line) for line in f if line.strip())
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    return len(events)
@@ -0,0 +1,39 @@
+import numpy as np
+
+# Funções de kernel
+# O segundo argumento pode ser um único vetor (L,) ou uma matriz de centros (M, L);
+# no segundo caso o kernel é avaliado contra todos os centros de uma vez e retorna (M,).
+
+def gaussian_kernel(x, y, sigma=1.4):
+    return np.exp(-np.linalg.norm(x - y, axis=-1) ** 2 / (2 * sigma ** 2))
+
+def laplacian_kernel(x, y, sigma=1.4):
+    return np.exp(-np.linalg.norm(x - y, axis=-1) / sigma)
+
+def polynomial_kernel(x, y, sigma=None, degree=2, const=5):
+    return (np.dot(y, x) + const) ** degree
+
+kernels_by_name = {
+    "gaussian": gaussian_kernel,
+    "laplacian": laplacian_kernel,
+    "polynomial": polynomial_kernel,
+}
+
+# Mesmos kernels escritos em função dos produtos internos: xx = ‖x‖², cc = ‖c‖², xc = x·c.
+# Usados pelo modo de deslocamento do motor_kernel, que mantém esses produtos
+# de forma recursiva em vez de recalcular a distância/produto de comprimento L.
+
+def gaussian_kernel_gram(xx, cc, xc, sigma=1.4):
+    return np.exp(-np.maximum(xx + cc - 2 * xc, 0) / (2 * sigma ** 2))
+
+def laplacian_kernel_gram(xx, cc, xc, sigma=1.4):
+    return np.exp(-np.sqrt(np.maximum(xx + cc - 2 * xc, 0)) / sigma)
+
+def polynomial_kernel_gram(xx, cc, xc, sigma=None, degree=2, const=5):
+    return (xc + const) ** degree
+
+gram_kernels = {
+    gaussian_kernel: gaussian_kernel_gram,
+    laplacian_kernel: laplacian_kernel_gram,
+    polynomial_kernel: polynomial_kernel_gram,
+}
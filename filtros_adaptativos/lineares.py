@@ -0,0 +1,355 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from .multicanal import row_mask
+from .precisao import adopt_precision, signal_dtype
+from . import divergencia
+from . import convergencia
+
+# Os filtros por amostra trabalham sobre uma visão em janela deslizante do
+# sinal (sem cópia): cada janela é x[n-L:n]. Os pesos são guardados na
+# ordem inversa dos taps, o que equivale a inverter a janela uma única vez
+# em vez de fazer x[n-L:n][::-1] a cada amostra.
+
+# Filtros com estado: process() recebe blocos consecutivos de (x, d) e mantém
+# entre as chamadas os pesos, as últimas filter_order amostras de x (histórico
+# do regressor) e o contador de amostras, então processar o sinal em blocos dá
+# o mesmo resultado que processá-lo inteiro. lms_filter/nlms_filter são uma
+# única chamada de process() com o sinal completo.
+#
+# x e d também podem ser (R, N): R canais ou arquivos, cada linha com seu
+# próprio filtro, adaptados juntos em uma única passada vetorizada. Linhas de
+# tamanhos diferentes são completadas com zeros (multicanal.stack_signals) e
+# lengths (R,) marca o trecho válido de cada uma: fora dele o erro é zerado,
+# os pesos não mudam e a saída é 0.
+#
+# O estado e a saída seguem a precisão do sinal (float32 ou float64, ver precisao.py).
+# Com divergencia.configure(limite), erro ou pesos acima do limite interrompem
+# o filtro com divergencia.DivergenceError. Com convergencia.configure(every),
+# cada chamada registra a norma dos pesos a cada every amostras.
+#
+# estado.py salva e carrega o estado dos filtros (checkpoints) e passa os pesos
+# aprendidos em um arquivo para outro (warm start), usando os nomes listados em
+# config_names (parâmetros do construtor), state_names (estado completo) e
+# learned_names (a parte aprendida, sem histórico nem contador de amostras).
+
+class LMS:
+    config_names = ("mu", "filter_order")
+    state_names = ("w", "history", "n", "dtype")
+    learned_names = ("w",)
+
+    def __init__(self, mu, filter_order):
+        self.mu = mu
+        self.filter_order = filter_order
+        self.w = np.zeros(filter_order)  # w[::-1] são os pesos na ordem usual
+        self.history = np.zeros(filter_order)
+        self.n = 0  # amostras já processadas
+        self.dtype = np.dtype(np.float64)
+
+    def _windows(self, x):
+        # buf[..., 0] é x[n0 - L], com n0 = self.n; windows[..., i, :] == x[..., n0+i-L : n0+i]
+        buf = np.concatenate([self.history, x], axis=-1)
+        self.history = buf[..., buf.shape[-1] - self.filter_order:].copy()
+        return buf, sliding_window_view(buf, self.filter_order, axis=-1)
+
+    def _start_rows(self, R):
+        # Na primeira chamada com (R, N) o estado passa a ter uma linha por sinal,
+        # todas partindo dos mesmos pesos (zeros, ou os de um warm start)
+        if self.w.ndim == 2:
+            return
+        if self.n:
+            raise ValueError("Filtro já iniciado com um sinal de uma linha")
+        self.w = np.tile(self.w.astype(self.dtype), (R, 1))
+        self.history = np.zeros((R, self.filter_order), dtype=self.dtype)
+
+    def process(self, x, d, lengths=None):
+        x, d = adopt_precision(self, x, d)
+        if x.ndim == 2:
+            return self._process_rows(x, d, lengths)
+        L = self.filter_order
+        y = np.zeros(len(x), dtype=self.dtype)
+        buf, windows = self._windows(x)
+        w = self.w
+        mu = self.mu
+        every = divergencia.interval()
+        rec = convergencia.interval()
+        norms = convergencia.allocate((), len(x))
+        for i in range(max(L - self.n, 0), len(x)):
+            x_n = windows[i]
+            y[i] = np.dot(w, x_n)
+            e = d[i] - y[i]
+            w += (mu * e) * x_n
+            if every and i % every == 0:
+                divergencia.check(self.n + i, e, w)
+            if rec and i % rec == rec - 1:
+                norms[i // rec] = np.linalg.norm(w)
+        convergencia.store("norma dos pesos", norms, np.linalg.norm(w))
+        self.n += len(x)
+        return y
+
+    def _process_rows(self, x, d, lengths):
+        R, N = x.shape
+        L = self.filter_order
+        self._start_rows(R)
+        y = np.zeros((R, N), dtype=self.dtype)
+        mask = row_mask(lengths, x.shape)
+        buf, windows = self._windows(x)
+        w = self.w
+        mu = np.asarray(self.mu, dtype=self.dtype)
+        every = divergencia.interval()
+        rec = convergencia.interval()
+        norms = convergencia.allocate((R,), N)
+        for i in range(max(L - self.n, 0), N):
+            x_n = windows[:, i]
+            y[:, i] = np.einsum("rl,rl->r", w, x_n)
+            e = d[:, i] - y[:, i]
+            if mask is not None:
+                e *= mask[:, i]
+            w += (mu * e)[:, None] * x_n
+            if every and i % every == 0:
+                divergencia.check(self.n + i, e, w)
+            if rec and i % rec == rec - 1:
+                norms[:, i // rec] = np.linalg.norm(w, axis=1)
+        convergencia.store("norma dos pesos", norms, np.linalg.norm(w, axis=1))
+        self.n += N
+        return y if mask is None else y * mask
+
+class NLMS(LMS):
+    """
+    NLMS com energia da janela atualizada em O(1) por amostra:
+    ‖x_{n+1}‖² = ‖x_n‖² + x[n]² - x[n-L]². A soma é recalculada diretamente a cada
+    resync_every amostras (padrão: filter_order) para não acumular erro de arredondamento.
+    """
+    config_names = LMS.config_names + ("epsilon", "resync_every")
+    state_names = LMS.state_names + ("energy",)
+
+    def __init__(self, mu=0.05, filter_order=512, epsilon=1e-8, resync_every=None):
+        super().__init__(mu, filter_order)
+        self.epsilon = epsilon
+        self.resync_every = resync_every or filter_order
+        self.energy = 0.0
+
+    def _start_rows(self, R):
+        if self.w.ndim == 1:
+            super()._start_rows(R)
+            self.energy = np.zeros(R, dtype=self.dtype)
+
+    def process(self, x, d, lengths=None):
+        x, d = adopt_precision(self, x, d)
+        if x.ndim == 2:
+            return self._process_rows(x, d, lengths)
+        L = self.filter_order
+        y = np.zeros(len(x), dtype=self.dtype)
+        buf, windows = self._windows(x)
+        w = self.w
+        mu = self.mu
+        energy = self.energy
+        every = divergencia.interval()
+        rec = convergencia.interval()
+        norms = convergencia.allocate((), len(x))
+        for i in range(max(L - self.n, 0), len(x)):
+            x_n = windows[i]
+            if (self.n + i - L) % self.resync_every == 0:
+                energy = np.dot(x_n, x_n)
+            norm = energy + self.epsilon
+            y[i] = np.dot(w, x_n)
+            e = d[i] - y[i]
+            w += (2 * mu / norm * e) * x_n
+            energy = max(energy + buf[i + L] * buf[i + L] - buf[i] * buf[i], 0.0)
+            if every and i % every == 0:
+                divergencia.check(self.n + i, e, w)
+            if rec and i % rec == rec - 1:
+                norms[i // rec] = np.linalg.norm(w)
+        convergencia.store("norma dos pesos", norms, np.linalg.norm(w))
+        self.energy = energy
+        self.n += len(x)
+        return y
+
+    def _process_rows(self, x, d, lengths):
+        R, N = x.shape
+        L = self.filter_order
+        self._start_rows(R)
+        y = np.zeros((R, N), dtype=self.dtype)
+        mask = row_mask(lengths, x.shape)
+        buf, windows = self._windows(x)
+        w = self.w
+        mu = np.asarray(self.mu, dtype=self.dtype)
+        energy = self.energy
+        every = divergencia.interval()
+        rec = convergencia.interval()
+        norms = convergencia.allocate((R,), N)
+        for i in range(max(L - self.n, 0), N):
+            x_n = windows[:, i]
+            if (self.n + i - L) % self.resync_every == 0:
+                energy = np.einsum("rl,rl->r", x_n, x_n)
+            y[:, i] = np.einsum("rl,rl->r", w, x_n)
+            e = d[:, i] - y[:, i]
+            if mask is not None:
+                e *= mask[:, i]
+            w += (2 * mu / (energy + self.epsilon) * e)[:, None] * x_n
+            energy = np.maximum(energy + buf[:, i + L] * buf[:, i + L] - buf[:, i] * buf[:, i], 0.0)
+            if every and i % every == 0:
+                divergencia.check(self.n + i, e, w)
+            if rec and i % rec == rec - 1:
+                norms[:, i // rec] = np.linalg.norm(w, axis=1)
+        convergencia.store("norma dos pesos", norms, np.linalg.norm(w, axis=1))
+        self.energy = energy
+        self.n += N
+        return y if mask is None else y * mask
+
+# Funções LMS
+def lms_filter(x, d, mu, filter_order, lengths=None):
+    return LMS(mu, filter_order).process(x, d, lengths)
+
+# Função NLMS
+def nlms_filter(x, d, mu=0.05, filter_order=512, epsilon=1e-8, resync_every=None, lengths=None):
+    return NLMS(mu, filter_order, epsilon, resync_every).process(x, d, lengths)
+
+# Os filtros em bloco usam o mesmo alinhamento do lms_filter: a saída em n
+# depende de x[n-1], ..., x[n-L]. Para isso o sinal de entrada é atrasado
+# de uma amostra antes do processamento. Todas as operações são sobre o último
+# eixo, então x e d podem ser (N,) ou (R, N), com lengths como nos filtros acima.
+def _delayed_blocks(x, d, block_size):
+    N = x.shape[-1]
+    n_blocks = -(-N // block_size)
+    u = np.zeros(x.shape[:-1] + (n_blocks * block_size + 1,))
+    u[..., 1:N + 1] = x
+    dp = np.zeros(x.shape[:-1] + (n_blocks * block_size,))
+    dp[..., :N] = d
+    return u[..., :n_blocks * block_size], dp, n_blocks
+
+def _weight_norm(W, K, partitioned=False):
+    """‖w‖ dos pesos no tempo a partir do espectro W = rfft(w, K) (Parseval), somando as partições."""
+    power = 2 * np.sum(np.abs(W) ** 2, axis=-1) - np.abs(W[..., 0]) ** 2
+    if K % 2 == 0:
+        power -= np.abs(W[..., -1]) ** 2
+    if partitioned:
+        power = np.sum(power, axis=-1)
+    return np.sqrt(power / K)
+
+def _update_power(power, spectrum, beta):
+    """Estimativa suavizada da potência por bin usada na normalização do passo."""
+    inst = np.abs(spectrum) ** 2
+    if power is None:
+        return inst
+    return beta * power + (1 - beta) * inst
+
+# Filtro FDAF (overlap-save, com restrição de gradiente)
+def fdaf_filter(x, d, mu=0.5, filter_order=1024, block_size=None, normalized=True,
+                beta=0.9, epsilon=1e-8, lengths=None):
+    """
+    LMS em bloco no domínio da frequência (overlap-save).
+
+    A cada bloco de block_size amostras (padrão: filter_order) a filtragem e a
+    correlação do gradiente são feitas com FFTs de tamanho filter_order + block_size,
+    o que dá custo O(log L) por amostra. Com normalized=True o passo de cada bin é
+    dividido pela potência suavizada da entrada naquele bin (beta controla a suavização);
+    com normalized=False o resultado é o LMS em bloco clássico com passo mu.
+    """
+    dtype = signal_dtype(x)
+    x = np.asarray(x, dtype=float)
+    L = filter_order
+    B = block_size or filter_order
+    K = L + B
+    N = x.shape[-1]
+    lead = x.shape[:-1]
+    u, dp, n_blocks = _delayed_blocks(x, d, B)
+    mask = row_mask(lengths, dp.shape)
+
+    W = np.zeros(lead + (K // 2 + 1,), dtype=complex)
+    y = np.zeros(lead + (n_blocks * B,))
+    buffer = np.zeros(lead + (K,))
+    power = None
+    check = divergencia.interval() > 0
+    rec = convergencia.interval()
+    norms = convergencia.allocate(lead, N)
+
+    for k in range(n_blocks):
+        block = slice(k * B, (k + 1) * B)
+        buffer = np.concatenate([buffer[..., B:], u[..., block]], axis=-1)
+        U = np.fft.rfft(buffer)
+
+        y[..., block] = np.fft.irfft(W * U, K)[..., L:]
+        e = dp[..., block] - y[..., block]
+        if mask is not None:
+            e *= mask[..., block]
+
+        E = np.fft.rfft(np.concatenate([np.zeros(lead + (L,)), e], axis=-1))
+        G = np.conj(U) * E
+        if normalized:
+            power = _update_power(power, U, beta)
+            # Cada amostra entra em L/B atualizações consecutivas; a escala B/L
+            # mantém o mesmo significado de mu para qualquer block_size
+            G *= (B / L) / (power + epsilon)
+        # Restrição do gradiente: mantém apenas os L primeiros coeficientes
+        g = np.fft.irfft(G, K)[..., :L]
+        W += mu * np.fft.rfft(g, K)
+        if check:
+            divergencia.check(k * B, e, W)
+        if rec:
+            norms[..., (min((k + 1) * B, N) - 1) // rec] = _weight_norm(W, K)
+
+    convergencia.store("norma dos pesos", norms)
+    y = y[..., :N]
+    if mask is not None:
+        y = y * mask[..., :N]
+    return y.astype(dtype, copy=False)
+
+# Filtro FDAF particionado (PBFDAF / MDF) para baixa latência
+def pbfdaf_filter(x, d, mu=0.5, filter_order=1024, block_size=128, normalized=True,
+                  beta=0.9, epsilon=1e-8, lengths=None):
+    """
+    FDAF particionado: o filtro de filter_order coeficientes é dividido em
+    partições de block_size coeficientes, cada uma com seu espectro (FFT de
+    tamanho 2·block_size), e a entrada passa por uma linha de atraso no domínio
+    da frequência. A latência é de block_size amostras em vez de filter_order.
+    filter_order precisa ser múltiplo de block_size.
+    """
+    if filter_order % block_size:
+        raise ValueError(f"filter_order ({filter_order}) precisa ser múltiplo de block_size ({block_size})")
+    dtype = signal_dtype(x)
+    x = np.asarray(x, dtype=float)
+    B = block_size
+    n_parts = filter_order // B
+    K = 2 * B
+    N = x.shape[-1]
+    lead = x.shape[:-1]
+    u, dp, n_blocks = _delayed_blocks(x, d, B)
+    mask = row_mask(lengths, dp.shape)
+
+    W = np.zeros(lead + (n_parts, K // 2 + 1), dtype=complex)
+    X = np.zeros(lead + (n_parts, K // 2 + 1), dtype=complex)  # linha de atraso: X[..., 0, :] é o bloco mais recente
+    y = np.zeros(lead + (n_blocks * B,))
+    buffer = np.zeros(lead + (K,))
+    power = None
+    check = divergencia.interval() > 0
+    rec = convergencia.interval()
+    norms = convergencia.allocate(lead, N)
+
+    for k in range(n_blocks):
+        block = slice(k * B, (k + 1) * B)
+        buffer = np.concatenate([buffer[..., B:], u[..., block]], axis=-1)
+        X = np.roll(X, 1, axis=-2)
+        X[..., 0, :] = np.fft.rfft(buffer)
+
+        y[..., block] = np.fft.irfft(np.sum(W * X, axis=-2), K)[..., B:]
+        e = dp[..., block] - y[..., block]
+        if mask is not None:
+            e *= mask[..., block]
+
+        E = np.fft.rfft(np.concatenate([np.zeros(lead + (B,)), e], axis=-1))
+        G = np.conj(X) * E[..., None, :]
+        if normalized:
+            power = _update_power(power, X[..., 0, :], beta)
+            G /= n_parts * power[..., None, :] + epsilon
+        g = np.fft.irfft(G, K, axis=-1)[..., :B]
+        W += mu * np.fft.rfft(g, K, axis=-1)
+        if check:
+            divergencia.check(k * B, e, W)
+        if rec:
+            norms[..., (min((k + 1) * B, N) - 1) // rec] = _weight_norm(W, K, partitioned=True)
+
+    convergencia.store("norma dos pesos", norms)
+    y = y[..., :N]
+    if mask is not None:
+        y = y * mask[..., :N]
+    return y.astype(dtype, copy=False)
@@ -0,0 +1,184 @@
+import itertools
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from .kernels import gram_kernels
+from .precisao import signal_dtype
+from . import instrumentacao
+from . import divergencia
+from . import convergencia
+
+# Execução em lote de uma grade de parâmetros: P configurações são adaptadas
+# em uma única passada pelo sinal, com pesos/coeficientes em matrizes
+# (P, taps). O trabalho por amostra vira uma operação matricial em vez de P
+# laços em Python. Todas as funções retornam a saída em um array (P, N), na
+# precisão de x (float32 ou float64, ver precisao.py). Com
+# divergencia.configure(limite), uma configuração que diverge para de adaptar
+# (passo e estado zerados) e sua saída é NaN a partir da amostra da parada; as
+# demais seguem normalmente. Com convergencia.configure(every), as curvas
+# (norma dos pesos ou energia dos coeficientes) têm uma linha por configuração.
+
+def param_grid(**values):
+    """
+    Produto cartesiano das listas de parâmetros, na mesma ordem dos laços
+    aninhados dos scripts. Ex.: param_grid(mu=[0.1, 0.2], sigma=[1, 5])
+    retorna {"mu": array([0.1, 0.1, 0.2, 0.2]), "sigma": array([1, 5, 1, 5])}.
+    """
+    names = list(values)
+    combos = list(itertools.product(*(values[name] for name in names)))
+    return {name: np.array([c[i] for c in combos]) for i, name in enumerate(names)}
+
+def _padded_windows(x, filter_order):
+    """Janelas x[n-L:n] para n = 0..N-1, com zeros antes do início do sinal."""
+    xp = np.concatenate([np.zeros(filter_order, dtype=x.dtype), x])
+    return sliding_window_view(xp, filter_order)
+
+def _order_mask(orders, max_order):
+    # Os pesos ficam na ordem inversa dos taps (como em lineares.py), então a
+    # configuração de ordem L usa as últimas L posições da janela de max_order
+    return (np.arange(max_order)[None, :] >= (max_order - orders)[:, None]).astype(float)
+
+def _stop_diverged(n, stopped, mus, *arrays):
+    # Para as configurações que passaram do limite: passo e arrays zerados na linha
+    bad = divergencia.diverged_rows(*arrays) & (stopped < 0)
+    if bad.any():
+        stopped[bad] = n
+        mus[bad] = 0
+        for array in arrays:
+            array[bad] = 0
+
+def _mark_stopped(y, stopped):
+    for p in np.flatnonzero(stopped >= 0):
+        y[p, stopped[p]:] = np.nan
+    return y
+
+def lms_filter_batch(x, d, mus, filter_orders):
+    dtype = signal_dtype(x)
+    x = np.asarray(x, dtype=dtype)
+    mus, orders = np.broadcast_arrays(np.asarray(mus, dtype=dtype), np.asarray(filter_orders, dtype=int))
+    P = len(mus)
+    L = int(orders.max())
+    N = len(x)
+    mask = _order_mask(orders, L).astype(dtype)
+    W = np.zeros((P, L), dtype=dtype)
+    y = np.zeros((P, N), dtype=dtype)
+    windows = _padded_windows(x, L)
+    mus = mus.copy()
+    stopped = np.full(P, -1)
+    every = divergencia.interval()
+    rec = convergencia.interval()
+    norms = convergencia.allocate((P,), N)
+    for n in range(int(orders.min()), N):
+        x_n = windows[n]
+        active = n >= orders
+        y[:, n] = np.where(active, W @ x_n, 0.0)
+        e = d[n] - y[:, n]
+        W += np.outer(mus * e * active, x_n) * mask
+        if every and n % every == 0:
+            _stop_diverged(n, stopped, mus, W, e)
+        if rec and n % rec == rec - 1:
+            norms[:, n // rec] = np.linalg.norm(W, axis=1)
+    convergencia.store("norma dos pesos", norms, np.linalg.norm(W, axis=1))
+    return _mark_stopped(y, stopped)
+
+def nlms_filter_batch(x, d, mus, filter_orders, epsilon=1e-8):
+    dtype = signal_dtype(x)
+    x = np.asarray(x, dtype=dtype)
+    mus, orders = np.broadcast_arrays(np.asarray(mus, dtype=dtype), np.asarray(filter_orders, dtype=int))
+    P = len(mus)
+    L = int(orders.max())
+    N = len(x)
+    mask = _order_mask(orders, L).astype(dtype)
+    W = np.zeros((P, L), dtype=dtype)
+    y = np.zeros((P, N), dtype=dtype)
+    windows = _padded_windows(x, L)
+    mus = mus.copy()
+    stopped = np.full(P, -1)
+    every = divergencia.interval()
+    rec = convergencia.interval()
+    norms = convergencia.allocate((P,), N)
+    for n in range(int(orders.min()), N):
+        x_n = windows[n]
+        active = n >= orders
+        norm = mask @ (x_n * x_n) + epsilon  # energia da janela de cada ordem
+        y[:, n] = np.where(active, W @ x_n, 0.0)
+        e = d[n] - y[:, n]
+        W += np.outer(2 * mus / norm * e * active, x_n) * mask
+        if every and n % every == 0:
+            _stop_diverged(n, stopped, mus, W, e)
+        if rec and n % rec == rec - 1:
+            norms[:, n // rec] = np.linalg.norm(W, axis=1)
+    convergencia.store("norma dos pesos", norms, np.linalg.norm(W, axis=1))
+    return _mark_stopped(y, stopped)
+
+def kernel_filter_batch(x, d, mus, kernel_func, kernel_params, max_dict_size=16,
+                        filter_order=None, normalized=False, epsilon=1e-8):
+    """
+    KLMS/NKLMS em lote. Todas as configurações compartilham o dicionário FIFO
+    (os centros são as janelas de entrada, que não dependem dos parâmetros),
+    então ‖x‖², ‖c‖² e x·c são calculados uma vez por amostra e só o kernel e
+    os coeficientes são avaliados para cada configuração.
+
+    mus e os valores de kernel_params podem ser escalares ou vetores de
+    tamanho P; max_dict_size (e filter_order) é único por lote.
+    """
+    if kernel_func not in gram_kernels:
+        raise ValueError(f"Kernel {kernel_func.__name__} não suporta execução em lote")
+    gram_func = gram_kernels[kernel_func]
+    if filter_order is None:
+        filter_order = max_dict_size
+
+    dtype = signal_dtype(x)
+    x = np.asarray(x, dtype=dtype)
+    names = list(kernel_params)
+    arrays = np.broadcast_arrays(np.asarray(mus, dtype=dtype),
+                                 *(np.asarray(kernel_params[k], dtype=dtype) for k in names))
+    mus = np.atleast_1d(arrays[0]).copy()
+    params = {k: np.atleast_1d(a)[:, None] for k, a in zip(names, arrays[1:])}  # (P, 1) para broadcast com (M,)
+    P = len(mus)
+    N = len(x)
+
+    y = np.zeros((P, N), dtype=dtype)
+    centers = np.zeros((max_dict_size, filter_order), dtype=dtype)
+    energies = np.zeros(max_dict_size, dtype=dtype)
+    alpha = np.zeros((P, max_dict_size), dtype=dtype)
+    count = 0
+    head = 0
+    evaluations = 0
+    stopped = np.full(P, -1)
+    every = divergencia.interval()
+    rec = convergencia.interval()
+    coefficient_energy = convergencia.allocate((P,), N)
+    if N < filter_order:
+        convergencia.store("energia dos coeficientes", coefficient_energy, 0.0)
+        return y
+
+    windows = sliding_window_view(x, filter_order)
+    for n in range(filter_order, N):
+        x_n = windows[n - filter_order]
+        xx = np.dot(x_n, x_n)
+        if count:
+            k = gram_func(xx, energies[:count], centers[:count] @ x_n, **params)
+            y[:, n] = np.sum(alpha[:, :count] * k, axis=1)
+            evaluations += count
+
+        e = d[n] - y[:, n]
+        if every and n % every == 0:
+            _stop_diverged(n, stopped, mus, alpha, e)
+        if rec and n % rec == rec - 1:
+            coefficient_energy[:, n // rec] = np.einsum("pm,pm->p", alpha, alpha)
+        if normalized:
+            self_k = np.broadcast_to(gram_func(xx, xx, xx, **params), (P, 1))[:, 0]
+            alpha[:, head] = mus * e / (epsilon + self_k)
+        else:
+            alpha[:, head] = mus * e
+        centers[head] = x_n
+        energies[head] = xx
+
+        head = (head + 1) % max_dict_size
+        count = min(count + 1, max_dict_size)
+
+    convergencia.store("energia dos coeficientes", coefficient_energy, np.einsum("pm,pm->p", alpha, alpha))
+    # Um dicionário para as P configurações, mas um kernel por configuração
+    instrumentacao.count("avaliações de kernel", P * evaluations)
+    instrumentacao.count("atualizações do dicionário", N - filter_order)
+    return _mark_stopped(y, stopped)
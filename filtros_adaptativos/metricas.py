@@ -0,0 +1,218 @@
+import json
+import numpy as np
+import sqlite3
+from pathlib import Path
+from .instrumentacao import stage
+from .convergencia import row_key as curves_key
+
+# mir_eval, pesq, scipy e pandas são importados dentro das funções que os usam:
+# os processos que só filtram (e tempo_real.py) não pagam a importação deles.
+
+def snr(reference, signal, type):
+    if np.isnan(signal).any() or np.isinf(signal).any():
+                print(f"⚠️ {type} - Valores inválidos detectados — pulando este resultado.")
+
+    noise = reference - signal
+    return 10 * np.log10((np.sum(reference**2) + 1e-10) / (np.sum(noise**2) + 1e-10))
+
+def segmental_snr(reference, signal, frame_len=512, floor=-10.0, ceil=35.0):
+    """
+    SNR segmental: média da SNR de cada quadro de frame_len amostras, limitada a
+    [floor, ceil] dB para que quadros de silêncio não dominem a média. Custa uma
+    passada sobre o sinal; serve de triagem barata em varreduras grandes.
+    """
+    n_frames = len(reference) // frame_len
+    if n_frames == 0:
+        return snr(reference, signal, "")
+    ref = reference[:n_frames * frame_len].reshape(n_frames, frame_len)
+    noise = ref - signal[:n_frames * frame_len].reshape(n_frames, frame_len)
+    seg = 10 * np.log10((np.sum(ref**2, axis=1) + 1e-10) / (np.sum(noise**2, axis=1) + 1e-10))
+    return np.mean(np.clip(seg, floor, ceil))
+
+def fast_sdr(reference, signal, flen=512):
+    """
+    SDR de uma fonte como em mir_eval.separation.bss_eval_sources: razão entre a
+    energia da projeção de signal nas versões atrasadas (0..flen-1) da
+    referência e a energia do resíduo.
+
+    O sistema de Toeplitz da projeção é resolvido por Levinson (solve_toeplitz,
+    O(flen²)) em vez de um solve denso O(flen³), e as energias saem direto dos
+    coeficientes (|P|² = c·D, |e|² = |signal|² - c·D), sem filtrar o sinal.
+    Tolerância em relação ao mir_eval: 1e-6 dB (nas saídas em data/result_* a
+    diferença medida é menor que 1e-10 dB); a concordância só piora com uma
+    referência quase nula, em que o sistema fica mal condicionado.
+    """
+    n = len(reference)
+    n_fft = int(2**np.ceil(np.log2(n + flen - 1)))
+    ref_f = np.fft.rfft(reference, n_fft)
+    # Autocorrelação da referência e correlação cruzada com signal nos atrasos 0..flen-1
+    r = np.fft.irfft(ref_f * np.conj(ref_f), n_fft)[:flen]
+    cross = np.fft.irfft(np.conj(ref_f) * np.fft.rfft(signal, n_fft), n_fft)[:flen]
+    from scipy.linalg import solve_toeplitz
+    c = solve_toeplitz(r, cross)
+    target = c @ cross
+    residual = np.sum(signal**2) - target
+    if residual <= 0:
+        return np.inf
+    return 10 * np.log10(target / residual)
+
+def _snr(reference, signal, sr, type):
+    return snr(reference, signal, type)
+
+def _segmental_snr(reference, signal, sr, type):
+    return segmental_snr(reference, signal)
+
+def _sdr(reference, signal, sr, type):
+    from mir_eval.separation import bss_eval_sources
+    return bss_eval_sources(np.expand_dims(reference,0), np.expand_dims(signal,0))[0][0]
+
+def _fast_sdr(reference, signal, sr, type):
+    return fast_sdr(reference, signal)
+
+def _pesq(reference, signal, sr, type):
+    from pesq import pesq
+    return pesq(sr, reference, signal, 'wb')
+
+# Métricas disponíveis: nome → (coluna na planilha, função)
+metrics_by_name = {
+    "snr": ("snr (dB)", _snr),
+    "segsnr": ("segsnr (dB)", _segmental_snr),
+    "sdr": ("sdr (dB_)", _sdr),
+    "sdr_fast": ("sdr rapido (dB)", _fast_sdr),
+    "pesq": ("pesq", _pesq),
+}
+
+default_metrics = ("snr", "sdr", "pesq")
+
+def evaluate(reference, signal, sr, type, metrics=default_metrics):
+    """Calcula as métricas escolhidas (nomes de metrics_by_name) do sinal filtrado em relação à referência limpa."""
+    unknown = [name for name in metrics if name not in metrics_by_name]
+    if unknown:
+        raise ValueError(f"Métricas desconhecidas: {unknown}")
+    row = {}
+    for name in metrics:
+        column, func = metrics_by_name[name]
+        with stage(f"métrica {name}"):
+            row[column] = func(reference, signal, sr, type)
+    return row
+
+# As linhas de métricas são gravadas em um banco SQLite append-only: cada
+# flush é uma única transação (o banco nunca fica com uma linha pela metade)
+# e o modo WAL com busy timeout permite vários processos gravando ao mesmo
+# tempo. A planilha .xlsx é gerada a partir do banco, uma vez, por export_excel.
+# As curvas de aprendizado (convergencia.py) de uma linha vão para a tabela
+# "<tabela>_curvas", ligadas à linha pelo id, com float32 em BLOB: a planilha
+# só recebe as colunas de convergência.
+class MetricsStore:
+    """
+    Armazena linhas de métricas (dicts) na tabela 'table' do banco SQLite 'path'.
+
+    As linhas ficam em memória e são gravadas a cada flush_every linhas, no
+    close() ou ao sair do bloco with. Colunas novas são adicionadas à tabela
+    conforme aparecem, na ordem em que aparecem. Com key_column, linhas cuja
+    chave já está na tabela são ignoradas (varredura retomada após uma falha).
+    Linhas com curvas de aprendizado (chave convergencia.row_key) gravam as
+    curvas na tabela "<table>_curvas" (ver curves()).
+    """
+    def __init__(self, path, table="metricas", flush_every=50, timeout=60, key_column=None):
+        self.path = str(path)
+        self.table = table
+        self.flush_every = flush_every
+        self.buffer = []
+        self.conn = sqlite3.connect(self.path, timeout=timeout)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(f'CREATE TABLE IF NOT EXISTS "{table}" (id INTEGER PRIMARY KEY AUTOINCREMENT)')
+        self.conn.execute(f'CREATE TABLE IF NOT EXISTS "{table}_curvas" '
+                          f'(linha INTEGER, nome TEXT, passo INTEGER, forma TEXT, valores BLOB)')
+        self.insert = "INSERT"
+        if key_column is not None:
+            if key_column not in self._columns():
+                self.conn.execute(f'ALTER TABLE "{table}" ADD COLUMN "{key_column}"')
+            self.conn.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS "{table}_{key_column}" '
+                              f'ON "{table}" ("{key_column}")')
+            self.insert = "INSERT OR IGNORE"
+
+    def _columns(self):
+        return [row[1] for row in self.conn.execute(f'PRAGMA table_info("{self.table}")')]
+
+    def append(self, rows):
+        self.buffer.extend(rows)
+        if len(self.buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        with stage("banco"), self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            columns = self._columns()
+            for row in self.buffer:
+                curves = row.get(curves_key)
+                row = {name: value for name, value in row.items() if name != curves_key}
+                for name in row:
+                    if name not in columns:
+                        self.conn.execute(f'ALTER TABLE "{self.table}" ADD COLUMN "{name}"')
+                        columns.append(name)
+                names = ", ".join(f'"{name}"' for name in row)
+                marks = ", ".join("?" for _ in row)
+                cursor = self.conn.execute(f'{self.insert} INTO "{self.table}" ({names}) VALUES ({marks})',
+                                           [_sql_value(v) for v in row.values()])
+                if curves is not None and cursor.rowcount == 1:
+                    step, named = curves
+                    self.conn.executemany(
+                        f'INSERT INTO "{self.table}_curvas" VALUES (?, ?, ?, ?, ?)',
+                        [(cursor.lastrowid, name, step, json.dumps(np.shape(curve)),
+                          np.asarray(curve, dtype="<f4").tobytes()) for name, curve in named.items()])
+        self.buffer.clear()
+
+    def read(self, ids=False):
+        """Retorna todas as linhas gravadas como DataFrame (sem a coluna id, a menos que ids=True)."""
+        import pandas as pd
+        self.flush()
+        df = pd.read_sql_query(f'SELECT * FROM "{self.table}" ORDER BY id', self.conn)
+        return df if ids else df.drop(columns="id")
+
+    def curves(self, row_id):
+        """Curvas de aprendizado da linha row_id (coluna id): (amostras por ponto, {nome: curva})."""
+        self.flush()
+        step = None
+        named = {}
+        for name, step, shape, values in self.conn.execute(
+                f'SELECT nome, passo, forma, valores FROM "{self.table}_curvas" WHERE linha = ?', (row_id,)):
+            named[name] = np.frombuffer(values, dtype="<f4").reshape(json.loads(shape))
+        return step, named
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _sql_value(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, Path):
+        return str(value)
+    return value
+
+def export_excel(db_path, arquivo_excel, table="metricas", nome_planilha="Métricas", drop_columns=("Chave",)):
+    """
+    Gera (sobrescrevendo) a planilha com todas as linhas do banco de métricas.
+    As colunas drop_columns (por padrão a chave de deduplicação da varredura,
+    que só serve no banco) ficam fora da planilha.
+    """
+    import pandas as pd
+    with MetricsStore(db_path, table) as store:
+        df = store.read()
+    df = df.drop(columns=[name for name in drop_columns if name in df.columns])
+    with stage("excel"), pd.ExcelWriter(arquivo_excel, engine="openpyxl", mode="w") as writer:
+        df.to_excel(writer, sheet_name=nome_planilha, index=False, header=True)
+
+if __name__ == "__main__":
+    # Exportação sob demanda: python -m filtros_adaptativos.metricas resultados_final.db resultados_final.xlsx
+    import sys
+    export_excel(sys.argv[1], sys.argv[2])
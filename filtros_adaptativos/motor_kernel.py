@@ -0,0 +1,586 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from .kernels import gaussian_kernel, polynomial_kernel, gram_kernels
+from .caracteristicas import FeatureKLMS
+from .multicanal import row_mask
+from .precisao import adopt_precision, signal_dtype
+from . import instrumentacao
+from . import divergencia
+from . import convergencia
+
+# Motor comum do KLMS/NKLMS: o dicionário e os coeficientes ficam em buffers
+# circulares pré-alocados (max_dict_size, filter_order) e o kernel é avaliado
+# contra todos os centros em uma única chamada vetorizada por amostra.
+# O estado (dicionário, coeficientes, histórico do regressor e energia da
+# janela) fica no objeto, e process() pode ser chamado bloco a bloco.
+#
+# Política de admissão no dicionário (admission):
+#   "fifo"       toda janela entra no dicionário (comportamento original)
+#   "novelty"    critério de novidade: entra se a distância ao centro mais
+#                próximo passa de admission_params["distance"] e |e| passa de
+#                admission_params["error"]; senão a amostra é descartada
+#   "coherence"  entra se a coerência (kernel normalizado) com todos os centros
+#                fica abaixo de admission_params["coherence"]; senão é descartada
+#   "quantized"  QKLMS: se o centro mais próximo está a até
+#                admission_params["radius"], o passo é somado ao coeficiente
+#                dele em vez de criar um centro novo
+# Com o dicionário cheio, o centro admitido há mais tempo é substituído. Como
+# só entram amostras novas, o dicionário cobre um trecho bem mais longo do sinal
+# com o mesmo custo por amostra.
+#
+# Modo KAPA (projection=K > 1, só com o dicionário FIFO): a cada amostra o
+# passo usa os erros a posteriori das K entradas mais recentes, e não só o da
+# atual (projeção afim no espaço do kernel). Sem normalização é o KAPA-1, com
+# a = μ·e; normalizado (NKLMS) é o KAPA-2, com a = μ·(1 + λ)·(G + λ·k̄·I)⁻¹·e,
+# G o Gram K×K das entradas, k̄ a média de k(x, x) nelas e λ =
+# projection_regularization. O centro novo recebe a_0 e os K-1 centros
+# anteriores (que são as K-1 entradas anteriores) recebem +a_j/K: cada erro
+# volta em K-1 passos, e a divisão por K limita a soma das correções a um
+# passo do KLMS, então o limite de estabilidade em μ não cai com K. O δ =
+# λ·k̄ acompanha a escala do kernel, e em sinais de voz as janelas recentes
+# são quase iguais (G ≈ k̄·11ᵀ): sem ele, as diferenças entre os erros
+# recentes (ruído) seriam divididas por um autovalor quase nulo. Com uma
+# entrada só (K = 1) os dois passos são os do KLMS/NKLMS de sempre.
+#
+# Com convergencia.configure(every), cada chamada registra a energia dos
+# coeficientes do dicionário (Σα²) a cada every amostras. Os nomes usados por
+# estado.py (checkpoints e warm start) seguem os de lineares.LMS.
+admission_defaults = {
+    "fifo": {},
+    "novelty": {"distance": 0.1, "error": 0.01},
+    "coherence": {"coherence": 0.9},
+    "quantized": {"radius": 0.1},
+}
+
+class KLMS:
+    config_names = ("mu", "kernel_func", "kernel_params", "max_dict_size", "filter_order", "normalized",
+                    "epsilon", "resync_every", "admission", "admission_params", "projection",
+                    "projection_regularization")
+    state_names = ("centers", "alpha", "center_energy", "count", "head", "history", "energy", "n", "dtype",
+                   "admitted", "merged", "discarded", "replaced", "full_at", "evaluations",
+                   "projection_gram", "recent_d", "recent")
+    learned_names = ("centers", "alpha", "center_energy", "count", "head")
+
+    def __init__(self, mu=0.10, kernel_func=gaussian_kernel, kernel_params=None, max_dict_size=16,
+                 filter_order=None, normalized=False, epsilon=1e-8, resync_every=1024,
+                 admission="fifo", admission_params=None, projection=1, projection_regularization=10.0):
+        if admission not in admission_defaults:
+            raise ValueError(f"Política de admissão desconhecida: {admission}")
+        if admission == "coherence" and kernel_func not in gram_kernels:
+            raise ValueError(f"Kernel {kernel_func.__name__} não suporta o critério de coerência")
+        if projection > 1 and admission != "fifo":
+            raise ValueError("O modo KAPA exige o dicionário FIFO (admission='fifo')")
+        if not 1 <= projection <= max_dict_size:
+            raise ValueError("A ordem de projeção deve estar entre 1 e max_dict_size")
+        self.mu = mu
+        self.kernel_func = kernel_func
+        self.kernel_params = kernel_params if kernel_params is not None else {}
+        self.max_dict_size = max_dict_size
+        self.filter_order = filter_order or max_dict_size
+        self.normalized = normalized
+        self.epsilon = epsilon
+        self.resync_every = resync_every
+        self.admission = admission
+        self.admission_params = {**admission_defaults[admission], **(admission_params or {})}
+        self.centers = np.zeros((max_dict_size, self.filter_order))
+        self.alpha = np.zeros(max_dict_size)
+        self.center_energy = np.zeros(max_dict_size)  # ‖c‖² de cada centro (critério de coerência)
+        self.count = 0  # centros válidos no buffer
+        self.head = 0   # próxima posição a ser sobrescrita (a mais antiga quando cheio)
+        self.history = np.zeros(self.filter_order)
+        self.energy = 0.0
+        self.n = 0      # amostras já processadas
+        self.dtype = np.dtype(np.float64)
+        # Estatísticas do dicionário
+        self.admitted = 0    # centros criados
+        self.merged = 0      # amostras somadas a um centro existente (quantized)
+        self.discarded = 0   # amostras descartadas (novelty, coherence)
+        self.replaced = 0    # centros substituídos com o dicionário cheio
+        self.full_at = None  # amostra em que o dicionário encheu
+        self.evaluations = 0  # avaliações kernel(x_n, c)
+        # Modo KAPA: kernel das K entradas mais recentes contra os centros (linha 0 = a
+        # mais nova), referências dessas entradas e quantas delas já existem
+        self.projection = projection
+        self.projection_regularization = projection_regularization
+        self.projection_gram = np.zeros((projection, max_dict_size))
+        self.recent_d = np.zeros(projection)
+        self.recent = 0
+
+    def stats(self):
+        """Crescimento do dicionário e contagem de admissões."""
+        updates = self.admitted + self.merged + self.discarded
+        return {
+            "tamanho": self.count,
+            "admitidos": self.admitted,
+            "fundidos": self.merged,
+            "descartados": self.discarded,
+            "substituidos": self.replaced,
+            "cheio_em": self.full_at,
+            "avaliacoes_kernel": self.evaluations,
+            "taxa_admissao": self.admitted / updates if updates else 0.0,
+        }
+
+    def _nearest(self, x_n, count):
+        dist2 = np.sum((self.centers[:count] - x_n) ** 2, axis=1)
+        j = np.argmin(dist2)
+        return j, dist2[j]
+
+    def _admit(self, x_n, e, k, count):
+        """Posição do centro a atualizar: -1 cria um centro, None descarta a amostra."""
+        if count == 0 or self.admission == "fifo":
+            return -1
+        params = self.admission_params
+        if self.admission == "novelty":
+            _, dist2 = self._nearest(x_n, count)
+            if dist2 > params["distance"] ** 2 and abs(e) > params["error"]:
+                return -1
+            return None
+        if self.admission == "coherence":
+            gram_func = gram_kernels[self.kernel_func]
+            xx = np.dot(x_n, x_n)
+            cc = self.center_energy[:count]
+            self_k = gram_func(xx, xx, xx, **self.kernel_params) * gram_func(cc, cc, cc, **self.kernel_params)
+            coherence = np.max(np.abs(k) / np.sqrt(self_k + self.epsilon))
+            return -1 if coherence <= params["coherence"] else None
+        j, dist2 = self._nearest(x_n, count)
+        return -1 if dist2 > params["radius"] ** 2 else j
+
+    def process(self, x, d, lengths=None):
+        x, d = adopt_precision(self, x, d)
+        if x.ndim == 2:
+            if self.projection > 1:
+                raise ValueError("O modo KAPA processa um sinal por vez")
+            return self._process_rows(x, d, lengths)
+        if self.projection > 1:
+            return self._process_projection(x, d)
+        L = self.filter_order
+        M = self.max_dict_size
+        kernel_func = self.kernel_func
+        kernel_params = self.kernel_params
+        centers = self.centers
+        alpha = self.alpha
+        count = self.count
+        head = self.head
+        energy = self.energy
+        fifo = self.admission == "fifo"
+        admitted, merged, discarded, replaced = self.admitted, self.merged, self.discarded, self.replaced
+        evaluations = 0
+        every = divergencia.interval()
+        rec = convergencia.interval()
+        energies = convergencia.allocate((), len(x))
+        y = np.zeros(len(x), dtype=self.dtype)
+        k = None
+
+        # Janelas sem cópia e sem inversão: os kernels só dependem de distâncias e
+        # produtos internos, que não mudam se consulta e centros têm a mesma ordem.
+        buf = np.concatenate([self.history, x])
+        windows = sliding_window_view(buf, L)
+        # Para o NKLMS, kernel(x_n, x_n) vem da energia da janela mantida em O(1)
+        gram_func = gram_kernels.get(kernel_func) if self.normalized else None
+
+        for i in range(max(L - self.n, 0), len(x)):
+            x_n = windows[i]
+            if count:
+                k = kernel_func(x_n, centers[:count], **kernel_params)
+                y[i] = np.dot(alpha[:count], k)
+                evaluations += count
+
+            e = d[i] - y[i]
+            if every and i % every == 0:
+                divergencia.check(self.n + i, e, alpha)
+            if rec and i % rec == rec - 1:
+                energies[i // rec] = np.dot(alpha, alpha)
+            if gram_func is not None:
+                if (self.n + i - L) % self.resync_every == 0:
+                    energy = np.dot(x_n, x_n)
+                step = self.mu * e / (self.epsilon + gram_func(energy, energy, energy, **kernel_params))
+                energy = max(energy + buf[i + L] * buf[i + L] - buf[i] * buf[i], 0.0)
+            elif self.normalized:
+                step = self.mu * e / (self.epsilon + kernel_func(x_n, x_n, **kernel_params))
+            else:
+                step = self.mu * e
+
+            slot = -1 if fifo else self._admit(x_n, e, k, count)
+            if slot is None:
+                discarded += 1
+                continue
+            if slot >= 0:
+                alpha[slot] += step
+                merged += 1
+                continue
+
+            alpha[head] = step
+            centers[head] = x_n
+            if not fifo:
+                self.center_energy[head] = np.dot(x_n, x_n)
+            admitted += 1
+            if count == M:
+                replaced += 1
+            elif count + 1 == M:
+                self.full_at = self.n + i
+
+            head = (head + 1) % M
+            count = min(count + 1, M)
+
+        convergencia.store("energia dos coeficientes", energies, np.dot(alpha, alpha))
+        self.count = count
+        self.head = head
+        self.energy = energy
+        instrumentacao.count("avaliações de kernel", evaluations)
+        instrumentacao.count("atualizações do dicionário", admitted + merged - self.admitted - self.merged)
+        self.evaluations += evaluations
+        self.admitted, self.merged, self.discarded, self.replaced = admitted, merged, discarded, replaced
+        self.history = buf[len(buf) - L:].copy()
+        self.n += len(x)
+        return y
+
+    def _process_projection(self, x, d):
+        # KAPA. As K-1 entradas anteriores são os K-1 centros mais novos do FIFO, e
+        # projection_gram guarda o kernel delas contra o dicionário: a cada amostra
+        # só a linha da entrada nova (M avaliações, como no KLMS) e a coluna do
+        # centro novo (que sai da mesma linha, pela simetria do kernel) são novas.
+        L = self.filter_order
+        M = self.max_dict_size
+        K = self.projection
+        kernel_func = self.kernel_func
+        kernel_params = self.kernel_params
+        centers = self.centers
+        alpha = self.alpha
+        gram = self.projection_gram
+        recent_d = self.recent_d
+        count = self.count
+        head = self.head
+        recent = self.recent
+        mu = self.mu
+        regularization = self.projection_regularization
+        identity = np.eye(K, dtype=self.dtype)
+        admitted = self.admitted
+        evaluations = 0
+        every = divergencia.interval()
+        rec = convergencia.interval()
+        energies = convergencia.allocate((), len(x))
+        y = np.zeros(len(x), dtype=self.dtype)
+
+        buf = np.concatenate([self.history, x])
+        windows = sliding_window_view(buf, L)
+        lags = np.arange(1, K)
+
+        for i in range(max(L - self.n, 0), len(x)):
+            x_n = windows[i]
+            p = min(recent, K - 1)
+            previous = (head - lags[:p]) % M  # centros das entradas n-1, ..., n-p
+            gram[1:] = gram[:-1]
+            if count:
+                gram[0, :count] = kernel_func(x_n, centers[:count], **kernel_params)
+            recent_d[1:] = recent_d[:-1]
+            recent_d[0] = d[i]
+            G = gram[:p + 1, :count]
+            outputs = G @ alpha[:count]
+            y[i] = outputs[0]
+            evaluations += count + 1
+
+            e = recent_d[:p + 1] - outputs
+            if every and i % every == 0:
+                divergencia.check(self.n + i, e[0], alpha)
+            if rec and i % rec == rec - 1:
+                energies[i // rec] = np.dot(alpha, alpha)
+            centers[head] = x_n
+            column = np.empty(p + 1, dtype=self.dtype)  # kernel(entradas, x_n)
+            column[0] = kernel_func(x_n, centers[head:head + 1], **kernel_params)[0]
+            column[1:] = gram[0, previous]
+            if self.normalized:
+                projected = np.column_stack([column, G[:, previous]])  # Gram (p+1)×(p+1) das entradas
+                delta = regularization * (self.epsilon + np.trace(projected) / (p + 1))
+                step = mu * (1 + regularization) * np.linalg.solve(projected + delta * identity[:p + 1, :p + 1], e)
+            else:
+                step = mu * e
+
+            # O centro novo recebe o passo inteiro; as correções dos anteriores, 1/K dele
+            alpha[previous] += step[1:] / (p + 1)
+            alpha[head] = step[0]
+            gram[:p + 1, head] = column
+            self.admitted += 1
+            if count == M:
+                self.replaced += 1
+            elif count + 1 == M:
+                self.full_at = self.n + i
+            head = (head + 1) % M
+            count = min(count + 1, M)
+            recent = min(recent + 1, K)
+
+        convergencia.store("energia dos coeficientes", energies, np.dot(alpha, alpha))
+        self.count = count
+        self.head = head
+        self.recent = recent
+        self.evaluations += evaluations
+        instrumentacao.count("avaliações de kernel", evaluations)
+        instrumentacao.count("atualizações do dicionário", self.admitted - admitted)
+        self.history = buf[len(buf) - L:].copy()
+        self.n += len(x)
+        return y
+
+    def _start_rows(self, R):
+        # Na primeira chamada com (R, N) o estado passa a ter uma linha por sinal,
+        # todas partindo do mesmo dicionário (vazio, ou o de um warm start)
+        if self.centers.ndim == 3:
+            return
+        if self.n:
+            raise ValueError("Filtro já iniciado com um sinal de uma linha")
+        if self.admission != "fifo" or self.kernel_func not in gram_kernels:
+            raise ValueError("Várias linhas exigem o dicionário FIFO e um kernel de kernels.gram_kernels")
+        M, L = self.centers.shape
+        centers = self.centers.astype(self.dtype)
+        self.centers = np.tile(centers, (R, 1, 1))
+        self.alpha = np.tile(self.alpha.astype(self.dtype), (R, 1))
+        # O FIFO de uma linha não mantém ‖c‖²: recalculada a partir dos centros
+        self.center_energy = np.tile(np.einsum("ml,ml->m", centers, centers), (R, 1))
+        self.history = np.zeros((R, L), dtype=self.dtype)
+
+    def _process_rows(self, x, d, lengths):
+        # R dicionários FIFO avançam juntos (mesmos head e count); o kernel sai
+        # da forma de Gram, com os produtos internos de todas as linhas de uma vez
+        R, N = x.shape
+        L = self.filter_order
+        M = self.max_dict_size
+        self._start_rows(R)
+        gram_func = gram_kernels[self.kernel_func]
+        kernel_params = self.kernel_params
+        centers = self.centers
+        alpha = self.alpha
+        center_energy = self.center_energy
+        count = self.count
+        head = self.head
+        mu = np.asarray(self.mu, dtype=self.dtype)
+        mask = row_mask(lengths, x.shape)
+        y = np.zeros((R, N), dtype=self.dtype)
+        evaluations = 0
+        admitted = self.admitted
+        every = divergencia.interval()
+        rec = convergencia.interval()
+        energies = convergencia.allocate((R,), N)
+
+        buf = np.concatenate([self.history, x], axis=1)
+        windows = sliding_window_view(buf, L, axis=1)
+
+        for i in range(max(L - self.n, 0), N):
+            x_n = windows[:, i]
+            xx = np.einsum("rl,rl->r", x_n, x_n)
+            if count:
+                xc = np.einsum("rml,rl->rm", centers[:, :count], x_n)
+                k = gram_func(xx[:, None], center_energy[:, :count], xc, **kernel_params)
+                y[:, i] = np.einsum("rm,rm->r", alpha[:, :count], k)
+                evaluations += count
+
+            e = d[:, i] - y[:, i]
+            if mask is not None:
+                e *= mask[:, i]
+            if every and i % every == 0:
+                divergencia.check(self.n + i, e, alpha)
+            if rec and i % rec == rec - 1:
+                energies[:, i // rec] = np.einsum("rm,rm->r", alpha, alpha)
+            if self.normalized:
+                alpha[:, head] = mu * e / (self.epsilon + gram_func(xx, xx, xx, **kernel_params))
+            else:
+                alpha[:, head] = mu * e
+            centers[:, head] = x_n
+            center_energy[:, head] = xx
+
+            if count == M:
+                self.replaced += 1
+            elif count + 1 == M:
+                self.full_at = self.n + i
+            self.admitted += 1
+            head = (head + 1) % M
+            count = min(count + 1, M)
+
+        convergencia.store("energia dos coeficientes", energies, np.einsum("rm,rm->r", alpha, alpha))
+        self.count = count
+        self.head = head
+        self.evaluations += R * evaluations
+        instrumentacao.count("avaliações de kernel", R * evaluations)
+        instrumentacao.count("atualizações do dicionário", R * (self.admitted - admitted))
+        self.history = buf[:, buf.shape[1] - L:].copy()
+        self.n += N
+        return y if mask is None else y * mask
+
+class NKLMS(KLMS):
+    config_names = tuple(name for name in KLMS.config_names if name != "normalized")
+
+    def __init__(self, mu=0.6, kernel_func=gaussian_kernel, kernel_params=None, max_dict_size=16,
+                 filter_order=None, epsilon=1e-8, resync_every=1024, admission="fifo", admission_params=None,
+                 projection=1, projection_regularization=10.0):
+        super().__init__(mu, kernel_func, kernel_params, max_dict_size, filter_order,
+                         True, epsilon, resync_every, admission, admission_params,
+                         projection, projection_regularization)
+
+def kernel_filter(x, d, mu, kernel_func, kernel_params, max_dict_size=16,
+                  filter_order=None, normalized=False, epsilon=1e-8,
+                  shift_structured=False, resync_every=1024, admission="fifo", admission_params=None,
+                  features=None, n_features=256, seed=0, lengths=None, projection=1,
+                  projection_regularization=10.0):
+    """
+    Filtro adaptativo com kernel e dicionário de tamanho fixo.
+
+    Os centros são as janelas x[n-filter_order:n][::-1] das últimas
+    max_dict_size amostras (por padrão filter_order = max_dict_size).
+    Com normalized=True o passo é dividido por kernel(x_n, x_n) (NKLMS).
+    Com shift_structured=True os produtos internos são atualizados de forma
+    recursiva (ver _kernel_filter_shift), custando O(M) por amostra em vez de O(M·L).
+    resync_every controla a cada quantas amostras as somas recursivas (tabela de
+    produtos e energia da janela) são recalculadas diretamente.
+    admission escolhe a política de admissão no dicionário (ver KLMS); o modo
+    de deslocamento só existe para o dicionário FIFO.
+    Com features="rff" ou "nystrom" não há dicionário: o filtro roda no espaço
+    de n_features características aleatórias (ver caracteristicas.py), com
+    janelas de filter_order amostras e gerador semeado por seed.
+    x e d podem ser (R, N) (canais ou arquivos, um filtro por linha), com
+    lengths (R,) marcando o trecho válido de cada linha.
+    Com projection=K > 1 o passo usa as K entradas mais recentes (KAPA, ver
+    KLMS), com um sinal por vez; projection_regularization é o λ do KAPA-2
+    (δ = λ·k(x, x) médio).
+    """
+    if filter_order is None:
+        filter_order = max_dict_size
+    if projection > 1 and (features is not None or shift_structured):
+        raise ValueError("O modo KAPA não se combina com o modo de características nem o de deslocamento")
+    if features is not None:
+        return FeatureKLMS(mu, kernel_func, kernel_params, filter_order, n_features, features,
+                           normalized, epsilon, seed).process(x, d, lengths)
+    if shift_structured:
+        if np.ndim(x) == 2:
+            raise ValueError("O modo de deslocamento processa um sinal por vez")
+        if admission != "fifo":
+            raise ValueError("O modo de deslocamento exige o dicionário FIFO (admission='fifo')")
+        return _kernel_filter_shift(x, d, mu, kernel_func, kernel_params, max_dict_size,
+                                    filter_order, normalized, epsilon, resync_every)
+    return KLMS(mu, kernel_func, kernel_params, max_dict_size, filter_order, normalized, epsilon, resync_every,
+                admission, admission_params, projection, projection_regularization).process(x, d, lengths)
+
+def _lag_products(xp, offset, n, filter_order, lags):
+    """Produtos internos diretos q_n · q_{n-τ} para cada τ em lags (q_t = x[t-L:t][::-1])."""
+    taps = np.arange(1, filter_order + 1)
+    windows = xp[offset + n - lags[:, None] - taps[None, :]]
+    return windows @ windows[0]
+
+# No dicionário FIFO todo centro é uma janela passada do mesmo sinal, então
+# P[τ] = q_n · q_{n-τ} segue a recursão
+#   P_{n+1}[τ] = P_n[τ] + x[n]·x[n-τ] - x[n-L]·x[n-L-τ]
+# e cada entrada do kernel custa O(1). A tabela é recalculada diretamente a
+# cada resync_every amostras para limitar o acúmulo de erro numérico.
+def _kernel_filter_shift(x, d, mu, kernel_func, kernel_params, max_dict_size,
+                         filter_order, normalized, epsilon, resync_every):
+    if kernel_func not in gram_kernels:
+        raise ValueError(f"Kernel {kernel_func.__name__} não suporta o modo de deslocamento")
+    gram_func = gram_kernels[kernel_func]
+
+    N = len(x)
+    y = np.zeros(N)
+    alpha = np.zeros(max_dict_size)
+    energies = np.zeros(max_dict_size)  # ‖c‖² de cada centro, na mesma posição de alpha
+    count = 0
+    head = 0
+    evaluations = 0
+    every = divergencia.interval()
+    rec = convergencia.interval()
+    coefficient_energy = convergencia.allocate((), N)
+
+    # Sinal com zeros à esquerda para que x[n-L-τ] seja válido desde o início
+    offset = filter_order + max_dict_size
+    xp = np.concatenate([np.zeros(offset), np.asarray(x, dtype=float)])
+    lags = np.arange(max_dict_size + 1)
+    if N > filter_order:
+        P = _lag_products(xp, offset, filter_order, filter_order, lags)
+
+    for n in range(filter_order, N):
+        if count:
+            slots = (head - lags[1:count + 1]) % max_dict_size
+            k = gram_func(P[0], energies[slots], P[1:count + 1], **kernel_params)
+            y[n] = np.dot(alpha[slots], k)
+            evaluations += count
+
+        e = d[n] - y[n]
+        if every and n % every == 0:
+            divergencia.check(n, e, alpha)
+        if rec and n % rec == rec - 1:
+            coefficient_energy[n // rec] = np.dot(alpha, alpha)
+        if normalized:
+            alpha[head] = mu * e / (epsilon + gram_func(P[0], P[0], P[0], **kernel_params))
+        else:
+            alpha[head] = mu * e
+        energies[head] = P[0]
+
+        head = (head + 1) % max_dict_size
+        count = min(count + 1, max_dict_size)
+
+        if (n + 1 - filter_order) % resync_every == 0:
+            P = _lag_products(xp, offset, n + 1, filter_order, lags)
+        else:
+            P += xp[offset + n] * xp[offset + n - lags] \
+                - xp[offset + n - filter_order] * xp[offset + n - filter_order - lags]
+
+    convergencia.store("energia dos coeficientes", coefficient_energy, np.dot(alpha, alpha))
+    instrumentacao.count("avaliações de kernel", evaluations)
+    instrumentacao.count("atualizações do dicionário", max(N - filter_order, 0))
+    # A recursão acumula erro de arredondamento: é feita sempre em float64
+    return y.astype(signal_dtype(x), copy=False)
+
+# Filtro KLMS com limitação de dicionário
+def klms_filter(x, d, mu=0.10, kernel_func=gaussian_kernel, sigma=1.4, max_dict_size=16,
+                shift_structured=False, admission="fifo", admission_params=None,
+                features=None, n_features=256, seed=0, projection=1):
+    if kernel_func == polynomial_kernel:
+        mu = 0.01  # Ajuste específico para kernel polinomial
+
+    return kernel_filter(x, d, mu, kernel_func, {"sigma": sigma}, max_dict_size,
+                         shift_structured=shift_structured, admission=admission,
+                         admission_params=admission_params, features=features,
+                         n_features=n_features, seed=seed, projection=projection)
+
+# Filtro NKLMS com limitação de dicionário
+def nklms_filter(x, d, mu=0.6, kernel_func=gaussian_kernel, sigma=20, epsilon=1e-8, max_dict_size=16,
+                 shift_structured=False, admission="fifo", admission_params=None,
+                 features=None, n_features=256, seed=0, projection=1):
+    if kernel_func == polynomial_kernel:
+        mu = 0.6  # Ajuste específico para kernel polinomial
+
+    return kernel_filter(x, d, mu, kernel_func, {"sigma": sigma}, max_dict_size,
+                         normalized=True, epsilon=epsilon, shift_structured=shift_structured,
+                         admission=admission, admission_params=admission_params,
+                         features=features, n_features=n_features, seed=seed, projection=projection)
+
+def approximation_report(x, d, mu, kernel_func, kernel_params, filter_order=16, n_features=256,
+                         features="rff", normalized=False, epsilon=1e-8, seed=0, n_samples=4000, warmup=None):
+    """
+    Erro do modo de características em relação ao filtro de kernel exato, nas
+    primeiras n_samples amostras. O filtro exato usa um dicionário com todas as
+    janelas (sem descarte), que é o que o mapa de características aproxima.
+
+    Retorna o erro relativo de Frobenius da matriz de Gram aproximada (Z·Zᵀ
+    contra K) sobre as janelas do trecho, o erro relativo entre as saídas e a
+    SNR (dB) de cada filtro em relação a d. A base de Nyström sai das primeiras
+    warmup janelas (padrão: metade do trecho).
+    """
+    x = np.asarray(x, dtype=float)[:n_samples]
+    d = np.asarray(d, dtype=float)[:n_samples]
+    filtro = FeatureKLMS(mu, kernel_func, kernel_params, filter_order, n_features, features,
+                         normalized, epsilon, seed, warmup or max(len(x) // 2, 1))
+    approx = filtro.process(x, d)
+    exact = kernel_filter(x, d, mu, kernel_func, kernel_params, max_dict_size=len(x),
+                          filter_order=filter_order, normalized=normalized, epsilon=epsilon)
+
+    # Até 500 janelas espaçadas ao longo do trecho
+    windows = sliding_window_view(x, filter_order)
+    windows = windows[np.linspace(0, len(windows) - 1, min(500, len(windows))).astype(int)]
+    energy = np.sum(windows * windows, axis=1)
+    gram = gram_kernels[kernel_func](energy[:, None], energy[None, :], windows @ windows.T, **kernel_params)
+    Z = filtro.transform(windows)
+
+    def snr_db(y):
+        return 10 * np.log10((np.sum(d**2) + 1e-10) / (np.sum((d - y)**2) + 1e-10))
+
+    return {
+        "erro_kernel": np.linalg.norm(Z @ Z.T - gram) / np.linalg.norm(gram),
+        "erro_saida": np.sum((approx - exact)**2) / (np.sum(exact**2) + 1e-10),
+        "snr_exato (dB)": snr_db(exact),
+        "snr_aproximado (dB)": snr_db(approx),
+    }
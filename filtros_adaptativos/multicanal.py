@@ -0,0 +1,34 @@
+import numpy as np
+
+# Sinais com várias linhas (R, N): canais de um mesmo arquivo ou arquivos
+# diferentes, cada um com seu próprio filtro. Os filtros com estado e as funções
+# de lineares.py, motor_kernel.py e caracteristicas.py aceitam (R, N) e adaptam
+# as R linhas em uma única passada; linhas de tamanhos diferentes são
+# completadas com zeros e o trecho válido vai em lengths.
+
+def row_mask(lengths, shape):
+    """Máscara (R, N) das amostras válidas de cada linha, ou None se todas valem."""
+    if lengths is None:
+        return None
+    return (np.arange(shape[1])[None, :] < np.asarray(lengths)[:, None]).astype(float)
+
+def stack_signals(signals):
+    """Empilha sinais 1-D de tamanhos diferentes em (R, N_max) com zeros. Retorna (matriz, lengths)."""
+    lengths = np.array([len(s) for s in signals])
+    stacked = np.zeros((len(signals), lengths.max()))
+    for row, signal in zip(stacked, signals):
+        row[:len(signal)] = signal
+    return stacked, lengths
+
+def unstack_signals(stacked, lengths):
+    """Inverso de stack_signals: lista com o trecho válido de cada linha."""
+    return [row[:n] for row, n in zip(stacked, lengths)]
+
+def match_channels(signal, n_channels):
+    """
+    Sinal (C, N) com exatamente n_channels linhas: canais a mais são
+    descartados e, se faltam canais, os existentes são repetidos em ciclo
+    (ex.: referência mono para uma gravação com vários microfones).
+    """
+    signal = np.atleast_2d(signal)
+    return signal[np.arange(n_channels) % signal.shape[0]]
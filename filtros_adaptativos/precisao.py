@@ -0,0 +1,80 @@
+import numpy as np
+import soundfile as sf
+
+# Precisão numérica e leitura dos WAVs.
+#
+# Os filtros seguem a precisão do sinal de entrada: com x em float32, o estado
+# (pesos, dicionário, coeficientes, energia) e a saída também são float32, o
+# que reduz a memória pela metade; qualquer outro tipo é tratado como float64.
+# O ganho de tempo só aparece quando os produtos internos dominam (filtros
+# longos, lotes de lote.py): nos laços amostra a amostra o custo é do Python e
+# os escalares float32 do numpy chegam a ser um pouco mais lentos. Os filtros
+# no domínio da frequência (FDAF/PBFDAF) calculam as FFTs em float64
+# (numpy.fft) e devolvem a saída na precisão da entrada.
+
+precisions = {"float32": np.float32, "float64": np.float64}
+
+def signal_dtype(x):
+    """float32 para sinais float32; float64 para todo o resto (inclusive inteiros)."""
+    return np.dtype(np.float32) if np.asarray(x).dtype == np.float32 else np.dtype(np.float64)
+
+def adopt_precision(filtro, x, d):
+    """
+    Converte x e d para a precisão de um filtro com estado. Na primeira chamada
+    (filtro.n == 0) os arrays de estado do filtro passam para a precisão de x.
+    """
+    x = np.asarray(x)
+    if filtro.n == 0:
+        dtype = signal_dtype(x)
+        for name, value in list(vars(filtro).items()):
+            if isinstance(value, np.ndarray) and value.dtype.kind == "f":
+                setattr(filtro, name, value.astype(dtype))
+        filtro.dtype = dtype
+    return x.astype(filtro.dtype, copy=False), np.asarray(d).astype(filtro.dtype, copy=False)
+
+def read_signal(path, precision="float64"):
+    """
+    Sinal (C, N) do WAV na precisão pedida e a taxa de amostragem.
+
+    WAVs de ponto flutuante com a mesma precisão (FLOAT para float32, DOUBLE
+    para float64) são mapeados em memória, sem cópia: as páginas são lidas do
+    disco sob demanda. Os demais (ex.: PCM_16) são decodificados direto na
+    precisão pedida, sem passar por float64.
+    """
+    dtype = np.dtype(precisions[precision])
+    info = sf.info(str(path))
+    if info.format == "WAV" and (info.subtype, dtype) in (("FLOAT", np.float32), ("DOUBLE", np.float64)):
+        offset = _wav_data_offset(path)
+        if offset is not None:
+            data = np.memmap(path, dtype=dtype.newbyteorder("<"), mode="r", offset=offset,
+                             shape=(info.frames, info.channels))
+            return data.T, info.samplerate
+    signal, sr = sf.read(str(path), dtype=precision, always_2d=True)
+    return signal.T, sr
+
+def _wav_data_offset(path):
+    # Posição do bloco "data" em um arquivo RIFF/WAVE (None se não for o caso)
+    with open(path, "rb") as f:
+        header = f.read(12)
+        if header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+            return None
+        while True:
+            chunk = f.read(8)
+            if len(chunk) < 8:
+                return None
+            size = int.from_bytes(chunk[4:], "little")
+            if chunk[:4] == b"data":
+                return f.tell()
+            f.seek(size + (size & 1), 1)
+
+def memory_estimate(n_samples, channels=1, precision="float64", batch=1, filter_order=1024, max_dict_size=16):
+    """
+    Estimativa (em bytes) da memória de uma tarefa da varredura: entrada e
+    referência (C·N cada), saídas do lote (P·C·N) e estado dos filtros
+    (P·C·(L + M·L)). Janelas deslizantes não copiam o sinal.
+    """
+    size = np.dtype(precisions[precision]).itemsize
+    signals = 2 * channels * n_samples * size
+    outputs = batch * channels * n_samples * size
+    state = batch * channels * (filter_order + max_dict_size * filter_order) * size
+    return {"sinais": signals, "saidas": outputs, "estado": state, "total": signals + outputs + state}
@@ -0,0 +1,235 @@
+import os
+import json
+import zlib
+import hashlib
+import itertools
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+import numpy as np
+import soundfile as sf
+from .multicanal import match_channels
+
+
+# Caminhos
+clean_path = "data/audio_limpo.wav"
+noise_dir = "data/ruidos"
+output_dir = "data/corrupted_dataset"
+cache_dir = "data/cache_ruidos"  # respostas ao impulso das salas e áudios reamostrados
+
+# Lista de SNRs que queremos gerar
+snr_list = [0, 5, 10]
+
+# Taxa de amostragem de saída, semente das salas e ordem do método das imagens
+fs = 16000
+seed = 0
+max_order = 15
+
+# Cada arquivo de ruído ganha uma sala sorteada por um gerador semeado com
+# (seed, nome do arquivo): a mesma execução gera sempre as mesmas salas e
+# todas as SNRs de um ruído usam a mesma sala. As respostas ao impulso (RIR)
+# de cada geometria são calculadas uma vez pelo Pyroomacoustics e guardadas em
+# cache_dir; a reverberação é a convolução (FFT) de cada fonte com sua RIR, e
+# cada SNR é só um reescalonamento do ruído reverberado antes da soma.
+#
+# generate() entrega as versões corrompidas sob demanda, como tuplas
+# (corrompido, limpo, metadados), sem passar pelo disco: in_memory_source()
+# as transforma em fonte para varredura.run_sweep e materialize() grava os
+# WAVs em output_dir (é o que o script faz).
+
+# Função para normalizar RMS
+def noise_gain(clean, noise, snr_db):
+    """Ganho que leva o ruído à SNR desejada em relação ao áudio limpo (0 para ruído nulo)"""
+    rms_clean = np.sqrt(np.mean(clean**2))
+    rms_noise = np.sqrt(np.mean(noise**2))
+    if rms_noise == 0:
+        return 0.0
+    desired_rms_noise = rms_clean / (10**(snr_db / 20))
+    return desired_rms_noise / rms_noise
+
+def adjust_noise_snr(clean, noise, snr_db):
+    """Ajusta o ruído para que tenha a SNR desejada em relação ao áudio limpo"""
+    return noise * noise_gain(clean, noise, snr_db)
+
+@lru_cache(maxsize=None)
+def load_audio(path, sr=fs):
+    """
+    Áudio (canais, amostras) reamostrado para sr. Cada arquivo é lido uma vez
+    por execução; a versão reamostrada fica em cache_dir para as próximas.
+    """
+    info = sf.info(path)
+    if info.samplerate == sr:
+        audio, _ = sf.read(path, always_2d=True)
+        return audio.T
+    stat = os.stat(path)
+    spec = f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}|{sr}"
+    cached = os.path.join(cache_dir, f"audio_{hashlib.sha1(spec.encode()).hexdigest()}.npy")
+    if os.path.exists(cached):
+        return np.load(cached)
+    import resampy  # só para reamostrar: importa o numba
+    audio, sr_file = sf.read(path, always_2d=True)
+    audio = resampy.resample(audio.T, sr_file, sr, axis=-1)
+    _save(cached, audio)
+    return audio
+
+def _save(path, array):
+    # Grava em um arquivo temporário e renomeia: outro processo nunca lê um .npy pela metade
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp, path)
+
+def fit_noise(noise, n_channels, n_samples):
+    """Ruído com n_channels canais, repetido ou cortado para n_samples amostras."""
+    noise = match_channels(noise, n_channels)
+    if noise.shape[1] < n_samples:
+        factor = (n_samples // noise.shape[1]) + 1
+        noise = np.tile(noise, (1, factor))
+    return noise[:, :n_samples]
+
+def room_rng(rel_path, seed=seed):
+    """Gerador da sala de um arquivo de ruído (crc32 do nome: estável entre execuções)."""
+    return np.random.default_rng([seed, zlib.crc32(rel_path.encode())])
+
+def random_room(rng):
+    """Dimensões, absorção e posições do locutor e do ruído sorteadas com rng."""
+    width, depth, height = int(rng.integers(5, 16)), int(rng.integers(5, 16)), int(rng.integers(2, 6))
+
+    def position():
+        return [float(rng.uniform(1, width - 1)), float(rng.uniform(1, depth - 1)),
+                float(rng.uniform(1, height - 1))]
+
+    return {"room_dim": [width, depth, height], "absorption": float(rng.uniform(0.1, 0.6)),
+            "speaker_pos": position(), "noise_pos": position()}
+
+def mic_positions(room, n_channels):
+    """Um microfone por canal, em linha no centro da sala (5 cm entre eles): (3, canais)."""
+    width, depth, height = room["room_dim"]
+    offsets = 0.05 * (np.arange(n_channels) - (n_channels - 1) / 2)
+    return np.array([width/2 + offsets, np.full(n_channels, depth/2), np.full(n_channels, height/2)])
+
+def room_impulse_responses(room, n_channels, sr=fs):
+    """
+    RIRs (2, canais, L) do locutor (0) e do ruído (1) até cada microfone,
+    completadas com zeros até o mesmo tamanho. Calculadas uma vez por geometria
+    e guardadas em cache_dir.
+    """
+    spec = dict(room, n_channels=n_channels, fs=sr, max_order=max_order)
+    digest = hashlib.sha1(json.dumps(spec, sort_keys=True).encode()).hexdigest()
+    cached = os.path.join(cache_dir, f"rir_{digest}.npy")
+    if os.path.exists(cached):
+        return np.load(cached)
+
+    # Importado só aqui: com todas as RIRs em cache o Pyroomacoustics não é necessário
+    import pyroomacoustics as pra
+    shoebox = pra.ShoeBox(room["room_dim"], fs=sr, absorption=room["absorption"], max_order=max_order)
+    shoebox.add_source(room["speaker_pos"])
+    shoebox.add_source(room["noise_pos"])
+    shoebox.add_microphone_array(pra.MicrophoneArray(mic_positions(room, n_channels), sr))
+    shoebox.compute_rir()
+
+    length = max(len(h) for mic in shoebox.rir for h in mic)
+    rir = np.zeros((2, n_channels, length))
+    for m, mic in enumerate(shoebox.rir):
+        for s, h in enumerate(mic):
+            rir[s, m, :len(h)] = h
+    _save(cached, rir)
+    return rir
+
+def reverberate(signal, rir):
+    """Fonte mono (N,) convolvida com as RIRs (canais, L) de cada microfone: (canais, N + L - 1)."""
+    from scipy.signal import fftconvolve
+    return fftconvolve(signal[None, :], rir, axes=-1)
+
+def corrupted_versions(noise_path, clean, seed=seed, snrs=snr_list):
+    """
+    Versões corrompidas de clean (canais, amostras) com o ruído de noise_path:
+    gera (sinal, metadados) para a soma seca e a reverberada em cada SNR.
+    """
+    rel_path = os.path.relpath(noise_path, noise_dir)
+    n_channels, n_samples = clean.shape
+    noise = fit_noise(load_audio(noise_path), n_channels, n_samples)
+
+    # As fontes da sala são mono: cada uma emite a média dos seus canais
+    room = random_room(room_rng(rel_path, seed))
+    rir = room_impulse_responses(room, n_channels)
+    clean_reverb = reverberate(clean.mean(axis=0), rir[0])
+    noise_reverb = reverberate(noise.mean(axis=0), rir[1])
+
+    for snr_db in snrs:
+        gain = noise_gain(clean, noise, snr_db)
+        meta = {"ruido": rel_path, "snr": snr_db, "seed": seed, "fs": fs}
+        # ---------- (1) Mix seco ----------
+        yield clean + gain * noise, dict(meta, arquivo=f"Soma_SNR_{snr_db}dB_{rel_path}", sala=None)
+        # ---------- (2) Mix reverberado ----------
+        yield clean_reverb + gain * noise_reverb, dict(meta, arquivo=f"Reverberacao_SNR_{snr_db}dB_{rel_path}",
+                                                       sala=room)
+
+def find_noise_files():
+    """Arquivos .wav de noise_dir, em ordem (a ordem das versões geradas)."""
+    return sorted(os.path.join(dp, f) for dp, _, fn in os.walk(noise_dir) for f in fn if f.endswith('.wav'))
+
+def _noise_file_versions(noise_path, seed, snrs):
+    # Tarefa de um processo do pool: todas as versões de um arquivo de ruído
+    return list(corrupted_versions(noise_path, load_audio(clean_path), seed, snrs))
+
+def generate(noise_files=None, seed=seed, snrs=snr_list, workers=1, prefetch=2):
+    """
+    Gera (corrompido, limpo, metadados) para cada arquivo de ruído × SNR ×
+    (seco, reverberado), sob demanda e sempre na mesma ordem. O resultado só
+    depende de seed. Com workers > 1 os arquivos de ruído são processados em
+    paralelo, no máximo prefetch·workers arquivos à frente do consumo.
+    Os metadados trazem o nome do arquivo ("arquivo", relativo a output_dir),
+    o ruído, a SNR, a sala (None no mix seco), a semente e a taxa de amostragem.
+    """
+    noise_files = find_noise_files() if noise_files is None else list(noise_files)
+    clean = load_audio(clean_path)
+    if workers <= 1:
+        for noise_path in noise_files:
+            for corrupted, meta in corrupted_versions(noise_path, clean, seed, snrs):
+                yield corrupted, clean, meta
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        remaining = iter(noise_files)
+        ahead = deque(pool.submit(_noise_file_versions, path, seed, snrs)
+                      for path in itertools.islice(remaining, prefetch * workers))
+        while ahead:
+            versions = ahead.popleft().result()
+            ahead.extend(pool.submit(_noise_file_versions, path, seed, snrs)
+                         for path in itertools.islice(remaining, 1))
+            for corrupted, meta in versions:
+                yield corrupted, clean, meta
+
+def materialize(versions, output_dir=output_dir):
+    """Grava cada versão em output_dir/metadados["arquivo"] e a repassa adiante."""
+    for corrupted, clean, meta in versions:
+        out = os.path.join(output_dir, meta["arquivo"])
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+        sf.write(out, corrupted.T, samplerate=meta["fs"])
+        print(f"Arquivo salvo: {out}")
+        yield corrupted, clean, meta
+
+def in_memory_source(versions, clean_path=clean_path, corrupted_dir=output_dir):
+    """
+    Fonte em memória para varredura.run_sweep: (arquivos, signals). Os arquivos
+    são os caminhos que materialize usaria em corrupted_dir; signals mapeia
+    cada caminho (e clean_path) para (sinal, taxa de amostragem).
+    """
+    files = []
+    signals = {}
+    for corrupted, clean, meta in versions:
+        path = Path(corrupted_dir) / meta["arquivo"]
+        files.append(path)
+        signals[str(path)] = (corrupted, meta["fs"])
+        signals[str(Path(clean_path))] = (clean, meta["fs"])
+    return files, signals
+
+def main():
+    for _ in materialize(generate(workers=os.cpu_count())):
+        pass
+
+if __name__ == "__main__":
+    main()
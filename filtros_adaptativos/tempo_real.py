@@ -0,0 +1,83 @@
+import time
+from pathlib import Path
+
+import soundfile as sf
+
+from . import estado
+from .multicanal import match_channels
+
+# Processamento em fluxo: os WAVs são lidos bloco a bloco com soundfile.blocks e
+# cada bloco passa por um filtro com estado (LMS/NLMS em lineares.py, KLMS/NKLMS
+# em motor_kernel.py). A memória usada não depende da duração do arquivo.
+#
+# Arquivos longos podem ser retomados: com checkpoint, process_wav grava o
+# estado do filtro (estado.save_state) a cada checkpoint_every blocos, logo
+# depois de descarregar a saída no disco. Se o processo cair, a próxima
+# chamada com o mesmo checkpoint restaura o filtro e continua a leitura e a
+# escrita na amostra filter.n, com a mesma saída de uma execução sem
+# interrupção. Ao terminar, o checkpoint guarda o estado final do filtro, que
+# serve de warm start (estado.warm_start) para o próximo arquivo.
+
+def wav_blocks(noisy_path, clean_path, blocksize=1024, precision="float64", start=0):
+    """
+    Gera pares (x, d) de blocos do áudio corrompido e da referência limpa.
+    Em arquivos mono os blocos são 1-D; com C canais são (C, n), um filtro por
+    canal, com a referência repetida se tiver menos canais. Termina no fim do
+    arquivo mais curto, como o corte em min_len da varredura. Os blocos são
+    decodificados direto em precision ("float32" ou "float64"), a partir da
+    amostra start.
+    """
+    channels = sf.info(str(noisy_path)).channels
+    for x, d in zip(sf.blocks(str(noisy_path), blocksize=blocksize, dtype=precision, always_2d=True, start=start),
+                    sf.blocks(str(clean_path), blocksize=blocksize, dtype=precision, always_2d=True, start=start)):
+        n = min(len(x), len(d))
+        if channels == 1:
+            yield x[:n, 0], d[:n, 0]
+        else:
+            yield x[:n].T, match_channels(d[:n].T, channels)
+
+def stream_filter(filtro, blocks, latencies=None):
+    """
+    Aplica filtro.process a cada par (x, d) de blocks e gera os blocos de saída.
+
+    Se latencies for dado (ex.: collections.deque(maxlen=1000), para manter a
+    memória limitada), o tempo de processamento de cada bloco, em segundos, é
+    acrescentado a ele.
+    """
+    for x, d in blocks:
+        start = time.perf_counter()
+        y = filtro.process(x, d)
+        if latencies is not None:
+            latencies.append(time.perf_counter() - start)
+        yield y
+
+def process_wav(filtro, noisy_path, clean_path, out_path, blocksize=1024, latencies=None,
+                precision="float64", checkpoint=None, checkpoint_every=64):
+    """
+    Filtra noisy_path em blocos e grava a saída em out_path. Retorna o número de amostras.
+
+    Com checkpoint (caminho de um .npz), o estado do filtro é gravado a cada
+    checkpoint_every blocos e ao final; se o checkpoint e out_path já existem,
+    o processamento é retomado de onde parou em vez de recomeçar.
+    """
+    info = sf.info(str(noisy_path))
+    resume = checkpoint is not None and Path(checkpoint).exists() and Path(out_path).exists()
+    if resume:
+        estado.load_state(checkpoint, filtro)
+        out = sf.SoundFile(str(out_path), "r+")
+        out.seek(filtro.n)
+    else:
+        out = sf.SoundFile(str(out_path), "w", samplerate=info.samplerate, channels=info.channels)
+    total = filtro.n if resume else 0
+    with out:
+        blocks = wav_blocks(noisy_path, clean_path, blocksize, precision, start=total)
+        for i, y in enumerate(stream_filter(filtro, blocks, latencies), 1):
+            out.write(y.T)
+            total += y.shape[-1]
+            if checkpoint is not None and i % checkpoint_every == 0:
+                out.flush()
+                estado.save_state(filtro, checkpoint)
+        if checkpoint is not None:
+            out.flush()
+            estado.save_state(filtro, checkpoint)
+    return total
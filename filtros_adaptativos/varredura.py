@@ -0,0 +1,615 @@
+import itertools
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from contextlib import ExitStack
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+
+from .kernels import kernels_by_name, polynomial_kernel
+from .lineares import lms_filter, nlms_filter, fdaf_filter, pbfdaf_filter
+from .lote import lms_filter_batch, nlms_filter_batch, kernel_filter_batch
+from .motor_kernel import admission_defaults, kernel_filter
+from .metricas import default_metrics, evaluate, metrics_by_name
+from .cache import array_hash
+from .acervo import open_archive, reference
+from . import instrumentacao
+from .instrumentacao import stage
+from .multicanal import match_channels
+from . import divergencia
+from .divergencia import DivergenceError, first_divergence
+from . import convergencia
+from .precisao import precisions, read_signal
+
+# Execução paralela da varredura: cada combinação (arquivo × filtro × kernel ×
+# parâmetros) vira um job independente. Jobs compatíveis são agrupados em
+# tarefas executadas em lote (lote.py) e as tarefas são distribuídas em um
+# pool de processos. As métricas são calculadas em um segundo pool, ao mesmo
+# tempo que os próximos filtros. As linhas de métricas são entregues na ordem
+# dos jobs. Os sinais vêm dos WAVs ou, com signals, da memória (ex.:
+# ruidos.in_memory_source), caso em que cada tarefa recebe só os seus sinais.
+# Com a instrumentação ligada (instrumentacao.configure), cada linha ganha o
+# tempo de cada etapa, os contadores dos filtros e o pico de memória do processo.
+# Jobs cuja saída tem NaN/inf (divergiram, ou foram interrompidos pela
+# verificação de divergencia.py) viram linhas com as métricas vazias e a
+# amostra da divergência, sem arquivo de saída; falhas no cálculo das métricas
+# viram linhas com a coluna "Erro". Toda linha com falha fica fora do cache.
+# Com as curvas de aprendizado ligadas (convergencia.configure), cada linha
+# ganha a amostra de convergência e o NMSE final, e as curvas seguem junto
+# (chave convergencia.row_key) para a tabela de curvas do MetricsStore.
+# Com archive, as saídas vão para um acervo (acervo.py) em vez de um WAV por
+# job, com o caminho que o WAV teria como chave.
+
+output_dirs = {
+    "lms": Path("data/result_lms/"),
+    "nlms": Path("data/result_nlms/"),
+    "fdaf": Path("data/result_fdaf/"),
+    "pbfdaf": Path("data/result_pbfdaf/"),
+    "klms": Path("data/result_klms/"),
+    "nklms": Path("data/result_nklms/"),
+}
+
+kernel_filters = ("klms", "nklms")
+
+# Parâmetros das políticas de admissão no dicionário (motor_kernel.KLMS), do
+# modo de características (caracteristicas.py) e do modo KAPA, que não são
+# parâmetros do kernel. No modo de características, max_dict_size continua
+# sendo o comprimento da janela.
+admission_keys = ("admission",) + tuple(sorted(set().union(*admission_defaults.values())))
+feature_keys = ("features", "n_features", "seed")
+projection_keys = ("projection", "projection_regularization")
+
+def _unbatched_kernel(p):
+    # Dicionário esparso (depende do erro de cada job), mapa de características ou KAPA
+    return (p.get("admission", "fifo") != "fifo" or p.get("features") is not None
+            or p.get("projection", 1) > 1)
+
+def expand_jobs(files, specs):
+    """
+    Expande (arquivo × spec × grade) em uma lista de jobs sem repetições.
+
+    Cada spec é uma tupla (filtro, kernel, grade), em que grade mapeia o nome
+    do parâmetro do filtro para a lista de valores, ex.:
+    ("klms", "gaussian", {"mu": [0.6], "sigma": [5], "max_dict_size": [8]}).
+    """
+    jobs = []
+    seen = set()
+    for file in files:
+        for filtro, kernel, grid in specs:
+            names = list(grid)
+            for values in itertools.product(*(grid[name] for name in names)):
+                params = dict(zip(names, values))
+                key = (str(file), filtro, kernel, tuple(sorted(params.items())))
+                if key in seen:
+                    continue
+                seen.add(key)
+                jobs.append({"filtro": filtro, "kernel": kernel, "arquivo": Path(file), "params": params})
+    return jobs
+
+def output_subdir(job):
+    """Pasta de saída do job, no mesmo formato usado pelos scripts."""
+    p = job["params"]
+    filtro = job["filtro"]
+    if filtro in ("lms", "nlms"):
+        return output_dirs[filtro] / f"mu{p['mu']}_ord{p['filter_order']}"
+    if filtro in ("fdaf", "pbfdaf"):
+        return output_dirs[filtro] / f"mu{p['mu']}_ord{p['filter_order']}_bloco{p['block_size']}"
+    if "sigma" in p:
+        name = f"mu{p['mu']}_sig{p['sigma']}_dict{p['max_dict_size']}"
+    else:
+        name = f"mu{p['mu']}_degree{p['degree']}_dict{p['max_dict_size']}_const{p['const']}"
+    if p.get("admission", "fifo") != "fifo":
+        name += "".join(f"_{k}{p[k]}" if k != "admission" else f"_{p[k]}" for k in admission_keys if k in p)
+    if p.get("features") is not None:
+        name += f"_{p['features']}" + "".join(f"_{label}{p[k]}" for k, label in
+                                             (("n_features", "D"), ("seed", "seed")) if k in p)
+    if p.get("projection", 1) > 1:
+        name += f"_K{p['projection']}" + (f"_delta{p['projection_regularization']}"
+                                          if "projection_regularization" in p else "")
+    return output_dirs[filtro] / job["kernel"] / name
+
+def output_path(job, corrupted_dir):
+    return output_subdir(job) / job["arquivo"].relative_to(corrupted_dir)
+
+def output_location(job, corrupted_dir, archive=None):
+    """Onde fica a saída do job: o WAV, ou a referência dele no acervo (archive)."""
+    out = output_path(job, corrupted_dir)
+    return out if archive is None else reference(archive, out.as_posix())
+
+def _task_key(job):
+    # Jobs com a mesma chave podem ser executados em um único lote
+    p = job["params"]
+    if job["filtro"] in ("lms", "nlms"):
+        return (str(job["arquivo"]), job["filtro"])
+    if job["filtro"] in kernel_filters and not _unbatched_kernel(p):
+        return (str(job["arquivo"]), job["filtro"], job["kernel"], p["max_dict_size"], tuple(sorted(p)))
+    return None
+
+def group_tasks(indexed_jobs, batch_size):
+    """Agrupa os pares (índice, job) em tarefas de até batch_size jobs executáveis em um único lote."""
+    tasks = []
+    open_tasks = {}
+    for index, job in indexed_jobs:
+        key = _task_key(job)
+        if key is None or batch_size <= 1:
+            tasks.append([(index, job)])
+            continue
+        task = open_tasks.get(key)
+        if task is None or len(task) >= batch_size:
+            task = []
+            open_tasks[key] = task
+            tasks.append(task)
+        task.append((index, job))
+    return tasks
+
+@lru_cache(maxsize=4)
+def _read_channels(path, precision="float64"):
+    """Sinal (C, N) com todos os canais do arquivo, na precisão pedida, e a taxa de amostragem."""
+    return read_signal(path, precision)
+
+def _load(path, precision="float64", signals=None):
+    # Sinal (C, N) e taxa de amostragem: da memória, se o caminho está em signals, ou do WAV
+    if signals is not None and path in signals:
+        signal, sr = signals[path]
+        return np.atleast_2d(signal).astype(precisions[precision], copy=False), sr
+    return _read_channels(path, precision)
+
+def _task_signals(signals, *paths):
+    # Subconjunto de signals enviado a um processo (só os sinais da tarefa)
+    if signals is None:
+        return None
+    return {str(path): signals[str(path)] for path in paths if str(path) in signals}
+
+def _signals(clean, corrupted, max_samples=None):
+    # Arquivo mono: sinais 1-D, como sempre. Vários canais: (C, N), um filtro por
+    # canal, com a referência limpa repetida se tiver menos canais que a gravação.
+    min_len = min(clean.shape[1], corrupted.shape[1], max_samples or clean.shape[1])
+    if corrupted.shape[0] == 1:
+        return corrupted[0, :min_len], clean[0, :min_len]
+    return corrupted[:, :min_len], match_channels(clean, corrupted.shape[0])[:, :min_len]
+
+def _kernel_mus(filtro, kernel_func, mus, params):
+    # Mesmo ajuste de klms_filter/nklms_filter para o kernel polinomial
+    # parametrizado só por sigma (grade do filtros.py)
+    if kernel_func == polynomial_kernel and "degree" not in params:
+        return np.full(len(mus), 0.01 if filtro == "klms" else 0.6)
+    return mus
+
+def _kernel_filter_job(filtro, kernel_func, mu, p, x, d):
+    names = [k for k in p if k not in ("mu", "max_dict_size") + admission_keys + feature_keys
+             + projection_keys]
+    return kernel_filter(x, d, mu, kernel_func, {k: p[k] for k in names},
+                         p["max_dict_size"], normalized=(filtro == "nklms"),
+                         admission=p.get("admission", "fifo"),
+                         admission_params={k: p[k] for k in admission_keys[1:] if k in p},
+                         **{k: p[k] for k in feature_keys + projection_keys if k in p})
+
+def _filter_rows(job, x, d):
+    """Um job sobre um sinal (C, N): os C canais são adaptados juntos."""
+    filtro = job["filtro"]
+    p = job["params"]
+    if filtro == "lms":
+        return lms_filter(x, d, p["mu"], p["filter_order"])
+    if filtro == "nlms":
+        return nlms_filter(x, d, p["mu"], p["filter_order"])
+    if filtro == "fdaf":
+        return fdaf_filter(x, d, **p)
+    if filtro == "pbfdaf":
+        return pbfdaf_filter(x, d, **p)
+    kernel_func = kernels_by_name[job["kernel"]]
+    mu = _kernel_mus(filtro, kernel_func, np.array([p["mu"]], dtype=float), p)[0]
+    return _kernel_filter_job(filtro, kernel_func, mu, p, x, d)
+
+def _guarded(x, func, *args, **kwargs):
+    # Job interrompido por DivergenceError: saída NaN a partir da amostra da parada
+    try:
+        return func(*args, **kwargs)
+    except DivergenceError as exc:
+        y = np.zeros(x.shape, dtype=x.dtype)
+        y[..., exc.sample:] = np.nan
+        return y
+
+def _single(x, func, *args, **kwargs):
+    # Saída de um job e as curvas que ele registrou (nenhuma se divergiu)
+    y = _guarded(x, func, *args, **kwargs)
+    return y, convergencia.take()
+
+def _singles(results):
+    return np.array([y for y, _ in results]), [curves for _, curves in results]
+
+def _batched(y):
+    # Curvas (P, K) de um lote divididas entre os P jobs
+    taken = convergencia.take()
+    return y, [{name: curve[p] for name, curve in taken.items()} for p in range(len(y))]
+
+def _filter_task(jobs, x, d):
+    """
+    Executa os jobs de uma tarefa e retorna as saídas (P, N), ou (P, C, N) com
+    vários canais, e as curvas de aprendizado de cada job (dicts vazios com o
+    registro desligado).
+    """
+    convergencia.take()  # descarta curvas de uma chamada anterior interrompida
+    if x.ndim == 2:
+        return _singles([_single(x, _filter_rows, job, x, d) for job in jobs])
+    filtro = jobs[0]["filtro"]
+    params = [job["params"] for job in jobs]
+    if filtro == "lms":
+        return _batched(lms_filter_batch(x, d, [p["mu"] for p in params], [p["filter_order"] for p in params]))
+    if filtro == "nlms":
+        return _batched(nlms_filter_batch(x, d, [p["mu"] for p in params], [p["filter_order"] for p in params]))
+    if filtro == "fdaf":
+        return _singles([_single(x, fdaf_filter, x, d, **p) for p in params])
+    if filtro == "pbfdaf":
+        return _singles([_single(x, pbfdaf_filter, x, d, **p) for p in params])
+
+    kernel_func = kernels_by_name[jobs[0]["kernel"]]
+    names = [k for k in params[0] if k not in ("mu", "max_dict_size") + admission_keys + feature_keys
+             + projection_keys]
+    mus = _kernel_mus(filtro, kernel_func, np.array([p["mu"] for p in params], dtype=float), params[0])
+    if _unbatched_kernel(params[0]):
+        return _singles([_single(x, _kernel_filter_job, filtro, kernel_func, mus[0], params[0], x, d)])
+    return _batched(kernel_filter_batch(x, d, mus, kernel_func,
+                                        {k: np.array([p[k] for p in params]) for k in names},
+                                        max_dict_size=params[0]["max_dict_size"],
+                                        normalized=(filtro == "nklms")))
+
+def metric_row(job, metrics, tempo, columns, curves=None):
+    """
+    Linha da planilha; columns mapeia colunas extras para nomes de parâmetros.
+    Com curves (curvas de aprendizado do job), a linha ganha as colunas de
+    convergência e leva as curvas em convergencia.row_key.
+    """
+    p = job["params"]
+    row = {
+        "Filtro": job["filtro"],
+        "Tipo": job["kernel"],
+        "Arquivo": job["arquivo"],
+        "Taxa de adaptacao": p["mu"],
+        "Ordem do filtro": p.get("filter_order", p.get("max_dict_size")),
+    }
+    for column, name in columns.items():
+        row[column] = p.get(name, "")
+    row.update(metrics)
+    row["Tempo (s)"] = tempo
+    if curves:
+        row.update(convergencia.columns(curves))
+        row[convergencia.row_key] = (convergencia.every, curves)
+    return row
+
+def _filter_stage(task, clean_path, precision="float64", signals=None, max_samples=None):
+    """
+    Filtra os jobs da tarefa. Retorna (índice, job, saída, sr, sr_corrompido,
+    tempo, perfil, curvas) por job; perfil (None sem instrumentação) tem os
+    tempos de etapa e contadores da tarefa divididos entre os jobs, e curvas
+    (None sem convergencia.configure) as curvas de aprendizado do job. Com
+    max_samples só o início de cada sinal é filtrado.
+    """
+    indices = [index for index, _ in task]
+    jobs = [job for _, job in task]
+    start_profile = instrumentacao.mark() if instrumentacao.enabled else None
+
+    with stage("leitura"):
+        clean, sr = _load(str(clean_path), precision, signals)
+        corrupted, sr_corrupted = _load(str(jobs[0]["arquivo"]), precision, signals)
+    with stage("alinhamento"):
+        corrupted_proc, clean_proc = _signals(clean, corrupted, max_samples)
+
+    start = time.time()
+    with stage("filtro"):
+        y_batch, curves = _filter_task(jobs, corrupted_proc, clean_proc)
+    tempo = (time.time() - start) / len(jobs)
+    if convergencia.every:
+        reference_power = convergencia.windowed_power(clean_proc)
+        for y, job_curves in zip(y_batch, curves):
+            job_curves["mse"] = convergencia.windowed_power(clean_proc - y)
+            job_curves["potência da referência"] = reference_power
+    else:
+        curves = [None] * len(jobs)
+
+    profile = None
+    if start_profile is not None:
+        profile = {name: value / len(jobs) for name, value in instrumentacao.since(start_profile).items()}
+        instrumentacao.flush()
+    return [(index, job, y, sr, sr_corrupted, tempo, profile, job_curves)
+            for index, job, y, job_curves in zip(indices, jobs, y_batch, curves)]
+
+def _evaluate(reference, y, sr, label, metrics):
+    # Com vários canais, cada métrica é a média das métricas por canal
+    if y.ndim == 1:
+        return evaluate(reference, y, sr, label, metrics)
+    per_channel = [evaluate(r, c, sr, label, metrics) for r, c in zip(reference, y)]
+    return {name: np.mean([values[name] for values in per_channel]) for name in per_channel[0]}
+
+def _metric_stage(index, job, y, sr, sr_corrupted, tempo, profile, curves, clean_path, corrupted_dir, columns,
+                  metrics, signals=None, save=True, archive=None):
+    """
+    Calcula as métricas de uma saída e (com save) a grava em data/result_* ou
+    no acervo da pasta archive. Retorna (índice, linha ou None).
+    """
+    label = job["filtro"].upper() + (f"-{job['kernel']}" if job["kernel"] else "")
+    sample = first_divergence(y)
+    if sample is not None:
+        print(f"⚠️ {label} - {job['arquivo']}: divergiu na amostra {sample} — métricas não calculadas.")
+        row = metric_row(job, {metrics_by_name[name][0]: None for name in metrics}, tempo, columns, curves)
+        row["Divergência (amostra)"] = sample
+        return index, row
+
+    start_profile = instrumentacao.mark() if profile is not None else None
+    clean, _ = _load(str(clean_path), y.dtype.name, signals)
+    n = y.shape[-1]
+    clean_proc = clean[0, :n] if y.ndim == 1 else match_channels(clean, y.shape[0])[:, :n]
+    try:
+        values = _evaluate(clean_proc, y, sr_corrupted, label, metrics)
+    except Exception as exc:
+        print(f"⚠️ {label} - {job['arquivo']}: falha no cálculo das métricas ({exc}).")
+        row = metric_row(job, {metrics_by_name[name][0]: None for name in metrics}, tempo, columns, curves)
+        row["Erro"] = f"{type(exc).__name__}: {exc}"
+        return index, row
+
+    if save:
+        out = output_path(job, corrupted_dir)
+        with stage("gravação"):
+            if archive is None:
+                out.parent.mkdir(parents=True, exist_ok=True)
+                sf.write(str(out), y.T, sr)
+            else:
+                open_archive(archive).append(out.as_posix(), y, sr, job)
+    row = metric_row(job, values, tempo, columns, curves)
+    if start_profile is not None:
+        profile = dict(profile)  # compartilhado pelos jobs da tarefa
+        for name, value in instrumentacao.since(start_profile).items():
+            profile[name] = profile.get(name, 0.0) + value
+        row.update(instrumentacao.columns(profile))
+        instrumentacao.flush()
+    return index, row
+
+def run_task(task, clean_path, corrupted_dir, columns, metrics, precision, signals=None, max_samples=None,
+             archive=None):
+    """
+    Filtro e métricas de uma tarefa (lista de (índice, job), ver group_tasks)
+    em sequência, no processo atual (metric_workers=0 e trabalhadores da
+    fila.py). Retorna (índice, linha) por job.
+    """
+    return [_metric_stage(*output, clean_path, corrupted_dir, columns, metrics, signals, max_samples is None,
+                          archive)
+            for output in _filter_stage(task, clean_path, precision, signals, max_samples)]
+
+def failed(row):
+    """Linha de um job que divergiu ou cujas métricas falharam."""
+    return "Divergência (amostra)" in row or "Erro" in row
+
+def worker_config():
+    """Argumentos de init_worker com a configuração do processo atual."""
+    return instrumentacao.config(), divergencia.config(), convergencia.config()
+
+def init_worker(instrumentation, divergence, convergence):
+    # Os processos dos pools herdam a instrumentação, o limite de divergência e as curvas
+    instrumentacao.configure(*instrumentation)
+    divergencia.configure(*divergence)
+    convergencia.configure(*convergence)
+
+def cache_lookup(jobs, cache, clean_path, corrupted_dir, metrics, precision, signals=None, archive=None):
+    """
+    Chaves dos jobs no cache (None sem cache), linhas já no cache (índice,
+    linha) e jobs a executar (índice, job).
+    """
+    keys = None
+    if cache is not None:
+        hashes = {path: array_hash(signal) for path, (signal, _) in (signals or {}).items()}
+        keys = [cache.key(job, clean_path, corrupted_dir, metrics, precision,
+                          input_hash=hashes.get(str(job["arquivo"])), clean_hash=hashes.get(str(clean_path)),
+                          archive=archive, curves=convergencia.every)
+                for job in jobs]
+    cached = []
+    todo = []
+    for index, job in enumerate(jobs):
+        row = cache.get(keys[index]) if cache is not None else None
+        if row is not None:
+            cached.append((index, row))
+        else:
+            todo.append((index, job))
+    return keys, cached, todo
+
+def row_collector(jobs, keys, cache, corrupted_dir, archive=None, on_rows=None):
+    """
+    (collect, linhas): collect(resultados, computed=True) recebe pares
+    (índice, linha) em qualquer ordem, guarda no cache as linhas calculadas
+    sem falha e acrescenta às linhas (e entrega a on_rows) o prefixo contíguo
+    de jobs já concluídos, em ordem de job. Linhas None são puladas.
+    """
+    rows = []
+    pending = {}
+    next_index = 0
+
+    def collect(results, computed=True):
+        nonlocal next_index
+        for index, row in results:
+            if computed and row is not None and cache is not None and not failed(row):
+                row["Chave"] = keys[index]
+                cache.put(keys[index], output_location(jobs[index], corrupted_dir, archive),
+                          {k: v for k, v in row.items() if k != convergencia.row_key})
+            pending[index] = row
+        ready = []
+        while next_index in pending:
+            row = pending.pop(next_index)
+            if row is not None:
+                ready.append(row)
+            next_index += 1
+        if ready:
+            rows.extend(ready)
+            if on_rows is not None:
+                on_rows(ready)
+
+    return collect, rows
+
+def run_sweep(jobs, clean_path, corrupted_dir, workers=None, batch_size=16, columns=None, on_rows=None,
+              cache=None, metrics=default_metrics, metric_workers=1, precision="float64", signals=None,
+              max_samples=None, archive=None):
+    """
+    Executa os jobs em um pool de processos (workers=1 filtra no processo atual).
+
+    As métricas (nomes de metricas.metrics_by_name) são calculadas em um pool
+    separado de metric_workers processos, em paralelo com os próximos filtros;
+    metric_workers=0 calcula as métricas logo após cada filtro, no mesmo
+    processo. Com metrics=("segsnr",) a varredura serve de triagem rápida
+    antes da passada completa com SDR e PESQ.
+
+    precision ("float32" ou "float64") vale para a leitura dos WAVs, o estado
+    dos filtros e as saídas (ver precisao.py).
+
+    signals mapeia caminhos (str) para (sinal, taxa de amostragem) já em
+    memória: arquivos corrompidos e a referência limpa presentes em signals não
+    são lidos do disco, e no cache entram pelo hash do conteúdo do sinal. As
+    saídas filtradas continuam sendo gravadas em data/result_*.
+
+    Com archive (pasta), as saídas são acrescentadas ao acervo dessa pasta
+    (acervo.OutputArchive) em vez de gravadas como WAVs em data/result_*.
+
+    Com max_samples só as primeiras max_samples amostras de cada sinal são
+    filtradas e avaliadas (triagem, ver busca.py): nada é gravado em
+    data/result_* nem no cache.
+
+    on_rows é chamado com as linhas já prontas, sempre em ordem de job, à medida
+    que o prefixo contíguo de jobs é concluído. Retorna uma linha por job, em ordem.
+
+    Com um ResultCache (cache.py), jobs com saída e métricas válidas no cache não
+    são executados: a linha guardada é entregue no lugar. Cada linha recebe a
+    coluna "Chave" com a chave do job, para a deduplicação no MetricsStore.
+    """
+    columns = columns or {}
+    workers = workers or os.cpu_count()
+    metrics = tuple(metrics)
+
+    if max_samples is not None:
+        cache = None
+    keys, cached, todo = cache_lookup(jobs, cache, clean_path, corrupted_dir, metrics, precision, signals, archive)
+    tasks = group_tasks(todo, batch_size)
+    collect, rows = row_collector(jobs, keys, cache, corrupted_dir, archive, on_rows)
+    collect(cached, computed=False)
+    with ExitStack() as stack:
+        pool_args = {"initializer": init_worker, "initargs": worker_config()}
+        filter_pool = stack.enter_context(ProcessPoolExecutor(max_workers=workers, **pool_args)) \
+            if workers > 1 else None
+        metric_pool = stack.enter_context(ProcessPoolExecutor(max_workers=metric_workers, **pool_args)) \
+            if metric_workers > 0 else None
+        metric_futures = set()
+        # Limita as métricas pendentes (cada uma guarda uma saída até terminar); os
+        # filtros em andamento são limitados à parte, em filter_window
+        max_pending = 2 * max(metric_workers, 1) * batch_size
+        filter_window = 2 * workers
+
+        def drain(max_left):
+            nonlocal metric_futures
+            done, metric_futures = wait(metric_futures, timeout=0)
+            while len(metric_futures) > max_left:
+                more, metric_futures = wait(metric_futures, return_when=FIRST_COMPLETED)
+                done |= more
+            collect(future.result() for future in done)
+
+        clean_signals = _task_signals(signals, clean_path)
+
+        def submit_metrics(outputs):
+            for output in outputs:
+                metric_futures.add(metric_pool.submit(_metric_stage, *output, clean_path, corrupted_dir,
+                                                      columns, metrics, clean_signals, max_samples is None,
+                                                      archive))
+            drain(max_pending)
+
+        def task_signals(task):
+            return _task_signals(signals, clean_path, task[0][1]["arquivo"])
+
+        if metric_pool is None and filter_pool is None:
+            for task in tasks:
+                collect(run_task(task, clean_path, corrupted_dir, columns, metrics, precision, signals, max_samples,
+                                 archive))
+        elif metric_pool is None:
+            futures = [filter_pool.submit(run_task, task, clean_path, corrupted_dir, columns, metrics, precision,
+                                          task_signals(task), max_samples, archive)
+                       for task in tasks]
+            for future in as_completed(futures):
+                collect(future.result())
+        elif filter_pool is None:
+            for task in tasks:
+                submit_metrics(_filter_stage(task, clean_path, precision, signals, max_samples))
+        else:
+            # No máximo filter_window tarefas no pool de filtros: a próxima só é
+            # enviada quando uma termina, e o future concluído é solto antes das
+            # métricas, então as saídas em memória não crescem com a grade
+            remaining = iter(tasks)
+            running = set()
+
+            def submit_filters(count):
+                for task in itertools.islice(remaining, count):
+                    running.add(filter_pool.submit(_filter_stage, task, clean_path, precision, task_signals(task),
+                                                   max_samples))
+
+            submit_filters(filter_window)
+            while running:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                submit_filters(len(done))
+                while done:
+                    outputs = done.pop().result()
+                    submit_metrics(outputs)
+                    del outputs
+        drain(0)
+    return rows
+
+def run_settings(settings):
+    """
+    Executa a varredura descrita pelas configurações de um script (o módulo
+    filtros.py ou filtro_poly.py, ou qualquer objeto com os mesmos atributos):
+    grade 'specs', caminhos, cache, métricas, precisão, geração dos
+    corrompidos em memória, perfil, limite de divergência, busca adaptativa
+    e fila de jobs.
+    """
+    from itertools import groupby
+    from .cache import ResultCache
+    from .metricas import MetricsStore, export_excel
+
+    s = settings
+    if s.perfil:
+        instrumentacao.configure(True, s.perfil_dir, clear=True)
+    divergencia.configure(s.limite_divergencia)
+    convergencia.configure(s.curvas)
+    cache = ResultCache(s.output_db) if s.usar_cache else None
+    if cache is not None:
+        cache.evict()
+    with MetricsStore(s.output_db, key_column="Chave") as store:
+        def sweep(files, signals=None):
+            jobs = expand_jobs(files, s.specs)
+            if s.fila is not None:
+                if s.busca is not None or signals is not None:
+                    raise ValueError("A fila (fila.py) só executa a grade inteira sobre os WAVs em disco")
+                from .fila import run_queue
+                run_queue(jobs, s.clean_path, s.corrupted_dir, s.fila, workers=s.workers, columns=s.colunas,
+                          on_rows=store.append, cache=cache, metrics=s.metricas, precision=s.precisao,
+                          archive=s.acervo)
+                return
+            args = dict(workers=s.workers, cache=cache, metrics=s.metricas, metric_workers=s.metric_workers,
+                        precision=s.precisao, columns=s.colunas, on_rows=store.append, signals=signals,
+                        archive=s.acervo)
+            if s.busca is None:
+                run_sweep(jobs, s.clean_path, s.corrupted_dir, **args)
+                return
+            from .busca import successive_halving, hyperband
+            search = {"halving": successive_halving, "hyperband": hyperband}[s.busca]
+            search(jobs, s.clean_path, s.corrupted_dir, min_samples=s.amostras_triagem, **args)
+
+        if s.gerar_corrompidos:
+            from .ruidos import generate, in_memory_source, materialize
+            # Um arquivo de ruído por vez: só as versões dele ficam em memória
+            versions = generate(seed=s.semente_corrompidos, workers=s.workers)
+            if s.salvar_corrompidos:
+                versions = materialize(versions, s.corrupted_dir)
+            for _, group in groupby(versions, key=lambda version: version[2]["ruido"]):
+                sweep(*in_memory_source(group, s.clean_path, s.corrupted_dir))
+        else:
+            # === Percorrer todos os corrompidos (já existentes) ===
+            sweep(sorted(Path(s.corrupted_dir).rglob("*.wav")))
+    if s.exportar_excel:
+        export_excel(s.output_db, s.output_result)
+    if s.perfil:
+        instrumentacao.write_trace(s.perfil_dir, Path(s.perfil_dir) / "trace.json")
@@ -0,0 +1,9 @@
+from filtros_adaptativos.cache import code_modules
+
+def test_code_version_covers_modules_used_by_the_sweep():
+    # Inclusive os importados só dentro de funções (ruidos) ou indiretamente (divergencia, via lineares)
+    modules = code_modules()
+    for name in ("varredura.py", "lineares.py", "motor_kernel.py", "metricas.py", "divergencia.py",
+                 "convergencia.py", "ruidos.py", "tempo_real.py", "estado.py"):
+        assert name in modules
+    assert "__main__.py" not in modules and "benchmark.py" not in modules
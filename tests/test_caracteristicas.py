@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from filtros_adaptativos.caracteristicas import FeatureKLMS
+from filtros_adaptativos.kernels import gaussian_kernel, polynomial_kernel
+
+def _signals(n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.standard_normal(n) * 0.5
+    d = np.zeros(n)
+    d[2:] = np.tanh(x[1:-1] + 0.5 * x[:-2])
+    return x, d
+
+def _chunked(filtro, x, d, sizes):
+    outputs = []
+    start = 0
+    for size in sizes:
+        outputs.append(filtro.process(x[start:start + size], d[start:start + size]))
+        start += size
+    outputs.append(filtro.process(x[start:], d[start:]))
+    return np.concatenate(outputs)
+
+@pytest.mark.parametrize("kernel_func, kernel_params", [(gaussian_kernel, {"sigma": 2.0}),
+                                                        (polynomial_kernel, {"degree": 2, "const": 1.0})])
+@pytest.mark.parametrize("normalized", [False, True])
+def test_nystrom_chunked_matches_single_call(kernel_func, kernel_params, normalized):
+    x, d = _signals()
+    params = dict(mu=0.05, kernel_func=kernel_func, kernel_params=kernel_params, filter_order=8,
+                  n_features=64, features="nystrom", normalized=normalized, warmup=300)
+    whole = FeatureKLMS(**params).process(x, d)
+    # Primeiro bloco menor que filter_order, blocos que cruzam o fim do warmup
+    chunked = _chunked(FeatureKLMS(**params), x, d, [5, 3, 1, 150, 200, 7, 64])
+    np.testing.assert_allclose(chunked, whole, rtol=0, atol=1e-10)
+
+def test_nystrom_rows_chunked_matches_single_call():
+    x0, d0 = _signals(seed=0)
+    x1, d1 = _signals(seed=1)
+    X, D = np.stack([x0, x1]), np.stack([d0, d1])
+    params = dict(mu=0.2, kernel_func=gaussian_kernel, kernel_params={"sigma": 2.0}, filter_order=8,
+                  n_features=64, features="nystrom", normalized=True, warmup=200)
+    whole = FeatureKLMS(**params).process(X, D)
+    filtro = FeatureKLMS(**params)
+    chunked = np.concatenate([filtro.process(X[:, a:b], D[:, a:b])
+                              for a, b in ((0, 4), (4, 190), (190, 700), (700, X.shape[1]))], axis=1)
+    np.testing.assert_allclose(chunked, whole, rtol=0, atol=1e-10)
+
+def test_nystrom_learns_after_warmup():
+    x, d = _signals()
+    y = FeatureKLMS(0.2, gaussian_kernel, {"sigma": 2.0}, 8, 128, "nystrom", normalized=True,
+                    warmup=500).process(x, d)
+    tail = slice(2000, None)
+    assert np.sum((d[tail] - y[tail]) ** 2) < 0.5 * np.sum(d[tail] ** 2)
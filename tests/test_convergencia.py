@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from filtros_adaptativos import convergencia
+from filtros_adaptativos.lineares import nlms_filter
+
+@pytest.fixture
+def every():
+    def configure(value):
+        convergencia.configure(value)
+        return value
+    yield configure
+    convergencia.configure(None)
+
+def test_ramp_on_nonstationary_reference(every):
+    # NMSE cai linearmente em dB de 0 a -30 dB nas 100 primeiras janelas, sobre uma
+    # referência com pausas: 90% do caminho é a janela 90
+    step = every(64)
+    rng = np.random.default_rng(0)
+    reference = rng.uniform(0.5, 2, 300)
+    reference[rng.random(300) < 0.2] = 1e-4
+    gain = 10 ** (-0.03 * np.minimum(np.arange(300), 100))
+    sample, final = convergencia.convergence(reference * gain, reference)
+    assert final == pytest.approx(-30, abs=0.1)
+    assert 88 * step <= sample <= 94 * step
+
+def test_converged_filter_with_pauses_has_no_convergence_sample(every):
+    # Filtro já convergido desde o início; pausas no fim (piso de ruído) não viram convergência
+    every(256)
+    rng = np.random.default_rng(1)
+    reference = rng.uniform(0.5, 2, 300)
+    reference[150:160] = reference[250:260] = 1e-5
+    sample, final = convergencia.convergence(0.1 * reference + 1e-6, reference)
+    assert sample is None
+    assert final == pytest.approx(-10, abs=0.1)
+
+@pytest.mark.parametrize("mu", [0.005, 0.01, 0.02])
+def test_nlms_matches_theoretical_convergence(every, mu):
+    # NLMS identificando um FIR com entrada branca: o MSE em excesso decai com
+    # constante de tempo L / (μ'(2 - μ')), μ' = 2μ (passo do lineares.NLMS)
+    step = every(256)
+    rng = np.random.default_rng(0)
+    N, L, noise = 40000, 16, 1e-2
+    x = rng.standard_normal(N)
+    h = rng.standard_normal(L) * np.exp(-np.arange(L) / 4)
+    d = np.zeros(N)
+    d[1:] = np.convolve(x, h)[:N - 1]
+    d += noise * rng.standard_normal(N)
+
+    y = nlms_filter(x, d, mu, L)
+    sample, final = convergencia.convergence(convergencia.windowed_power(d - y), convergencia.windowed_power(d))
+
+    tau = L / (2 * mu * (2 - 2 * mu))
+    theory = np.sum(h**2) * np.exp(-np.arange(N) / tau) + noise**2
+    expected, expected_final = convergencia.convergence(convergencia.windowed_power(np.sqrt(theory)),
+                                                        np.full(-(-N // step), np.sum(h**2) + noise**2))
+    assert final == pytest.approx(expected_final, abs=1)
+    assert abs(sample - expected) <= step
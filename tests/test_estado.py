@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from filtros_adaptativos.estado import get_state, load_state, save_state, warm_start
+from filtros_adaptativos.kernels import laplacian_kernel
+from filtros_adaptativos.lineares import LMS, NLMS
+from filtros_adaptativos.motor_kernel import KLMS, NKLMS
+
+def _signals(n=1200, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.standard_normal(n) * 0.5
+    d = np.zeros(n)
+    d[1:] = np.tanh(np.convolve(x, [1.0, 0.5, -0.2])[:n - 1]) + 0.01 * rng.standard_normal(n - 1)
+    return x, d
+
+filters = {
+    "lms": lambda mu=0.01: LMS(mu, 16),
+    "nlms": lambda mu=0.2: NLMS(mu, 16, resync_every=50),
+    "klms": lambda mu=0.3: KLMS(mu, kernel_params={"sigma": 2.0}, max_dict_size=8, filter_order=16),
+    "nklms": lambda mu=0.3: NKLMS(mu, laplacian_kernel, {"sigma": 2.0}, max_dict_size=8, filter_order=16,
+                                  resync_every=50),
+}
+
+def _assert_same_state(a, b):
+    assert a.keys() == b.keys()
+    for name in a:
+        np.testing.assert_array_equal(a[name], b[name], err_msg=name)
+
+@pytest.mark.parametrize("name", list(filters))
+def test_save_load_round_trip_continues_run(name, tmp_path):
+    x, d = _signals()
+    filtro = filters[name]()
+    filtro.process(x[:500], d[:500])
+    path = save_state(filtro, tmp_path / "estado.npz")
+
+    # Restaurado em um filtro igual e criado a partir do .npz
+    restored = load_state(path, filters[name]())
+    created = load_state(path)
+    assert type(created) is type(filtro)
+    _assert_same_state(get_state(restored), get_state(filtro))
+    _assert_same_state(get_state(created), get_state(filtro))
+
+    y = filtro.process(x[500:], d[500:])
+    np.testing.assert_array_equal(restored.process(x[500:], d[500:]), y)
+    np.testing.assert_array_equal(created.process(x[500:], d[500:]), y)
+
+def test_load_state_rejects_other_class(tmp_path):
+    path = save_state(filters["lms"](), tmp_path / "estado.npz")
+    with pytest.raises(ValueError):
+        load_state(path, filters["nlms"]())
+
+@pytest.mark.parametrize("name", list(filters))
+@pytest.mark.parametrize("from_file", [False, True])
+def test_warm_start_copies_only_learned_state(name, from_file, tmp_path):
+    x, d = _signals()
+    source = filters[name]()
+    source.process(x, d)
+    origin = save_state(source, tmp_path / "estado.npz") if from_file else source
+
+    # mu está em tunable_names: o destino pode adaptar mais devagar
+    filtro = warm_start(filters[name](mu=0.5 * source.mu), origin)
+    _assert_same_state(get_state(filtro, filtro.learned_names), get_state(source, source.learned_names))
+    assert filtro.n == 0
+    np.testing.assert_array_equal(filtro.history, np.zeros_like(source.history))
+
+    # A primeira saída depois da janela já usa o que foi aprendido (num filtro novo é zero)
+    x2, d2 = _signals(seed=1)
+    L = filtro.filter_order
+    assert filtro.process(x2, d2)[L] != 0
+    assert filters[name]().process(x2, d2)[L] == 0
+
+def test_warm_start_rejects_used_filter_or_other_params():
+    x, d = _signals()
+    source = filters["lms"]()
+    source.process(x, d)
+    used = filters["lms"]()
+    used.process(x[:100], d[:100])
+    with pytest.raises(ValueError):
+        warm_start(used, source)
+    with pytest.raises(ValueError):
+        warm_start(LMS(0.01, 32), source)
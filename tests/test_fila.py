@@ -0,0 +1,61 @@
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from filtros_adaptativos.fila import JobQueue, _heartbeat
+
+lease = 0.2
+
+@pytest.fixture
+def queue_path(tmp_path):
+    # Uma tarefa com dois jobs
+    path = tmp_path / "fila.db"
+    task = [(index, {"arquivo": "data/a.wav", "params": {"mu": mu}}) for index, mu in enumerate([0.1, 0.2])]
+    with JobQueue(path) as queue:
+        queue.submit([task], {"metrics": ["snr"]})
+    return path
+
+def test_expired_lease_is_claimed_by_another_worker(queue_path):
+    with JobQueue(queue_path) as a, JobQueue(queue_path) as b:
+        task_id, task, params = a.claim("a", lease)
+        assert task[0][1]["arquivo"] == Path("data/a.wav") and params == {"metrics": ["snr"]}
+        assert b.claim("b", lease) is None
+
+        # "a" parou sem renovar o lease: a tarefa volta para a fila e "b" a pega
+        time.sleep(2 * lease)
+        claimed = b.claim("b", lease)
+        assert claimed is not None and claimed[0] == task_id
+
+        # "a" perdeu a tarefa e descarta o resultado; só o de "b" é entregue
+        assert not a.heartbeat(task_id, "a", lease)
+        assert not a.complete(task_id, "a", [(0, {"origem": "a"})])
+        assert b.complete(task_id, "b", [(0, {"origem": "b"})])
+        [(_, rows, _)] = b.finished(1)
+        assert rows == [[0, {"origem": "b"}]]
+
+def test_heartbeat_keeps_the_lease(queue_path):
+    with JobQueue(queue_path) as a, JobQueue(queue_path) as b:
+        task_id, _, _ = a.claim("a", lease)
+        stop = threading.Event()
+        beat = threading.Thread(target=_heartbeat, args=(queue_path, task_id, "a", lease, lease / 4, stop))
+        beat.start()
+        try:
+            for _ in range(4):
+                time.sleep(lease)
+                assert b.claim("b", lease) is None
+        finally:
+            stop.set()
+            beat.join()
+        assert a.counts()["executando"] == 1
+        assert a.complete(task_id, "a", [])
+
+def test_task_fails_after_max_attempts(queue_path):
+    with JobQueue(queue_path) as queue:
+        for attempt in range(2):
+            assert queue.claim(f"w{attempt}", lease, max_attempts=2) is not None
+            time.sleep(2 * lease)
+        assert queue.claim("w2", lease, max_attempts=2) is None
+        [(_, rows, error)] = queue.finished(1)
+        assert rows is None and "Lease expirado (trabalhador w1)" in error
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from filtros_adaptativos.lineares import NLMS, lms_filter, nlms_filter
+
+# Laços da versão original (janela invertida e ‖x_n‖² recalculados a cada amostra), para comparação
+def _baseline_lms(x, d, mu, filter_order):
+    N = len(x)
+    w = np.zeros(filter_order)
+    y = np.zeros(N)
+    for n in range(filter_order, N):
+        x_n = x[n - filter_order:n][::-1]
+        y[n] = np.dot(w, x_n)
+        w += mu * (d[n] - y[n]) * x_n
+    return y
+
+def _baseline_nlms(x, d, mu, filter_order, epsilon=1e-8):
+    N = len(x)
+    w = np.zeros(filter_order)
+    y = np.zeros(N)
+    for n in range(filter_order, N):
+        x_n = x[n - filter_order:n][::-1]
+        norm = np.dot(x_n, x_n) + epsilon
+        y[n] = np.dot(w, x_n)
+        w += 2 * (mu / norm) * (d[n] - y[n]) * x_n
+    return y
+
+def _fir_signals(n, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.standard_normal(n)
+    h = rng.standard_normal(32) * np.exp(-np.arange(32) / 8)
+    d = np.zeros(n)
+    d[1:] = np.convolve(x, h)[:n - 1]
+    return x, d + 0.01 * rng.standard_normal(n)
+
+@pytest.mark.parametrize("n", [3000, 40, 64, 65])
+@pytest.mark.parametrize("filter_order", [16, 64])
+def test_lms_matches_baseline_loop(n, filter_order):
+    x, d = _fir_signals(n)
+    np.testing.assert_allclose(lms_filter(x, d, 0.002, filter_order), _baseline_lms(x, d, 0.002, filter_order),
+                               rtol=1e-10, atol=1e-12)
+
+@pytest.mark.parametrize("n", [3000, 40, 64, 65])
+@pytest.mark.parametrize("filter_order", [16, 64])
+@pytest.mark.parametrize("resync_every", [None, 5000])
+def test_nlms_running_energy_matches_baseline_loop(n, filter_order, resync_every):
+    # resync_every=5000: a energia vem só da recursão O(1) durante o sinal inteiro
+    x, d = _fir_signals(n)
+    y = NLMS(0.2, filter_order, resync_every=resync_every).process(x, d)
+    np.testing.assert_allclose(y, _baseline_nlms(x, d, 0.2, filter_order), rtol=1e-9, atol=1e-12)
+    if resync_every is None:
+        np.testing.assert_allclose(nlms_filter(x, d, 0.2, filter_order), y, rtol=0, atol=0)
+
+def test_signal_shorter_than_order_gives_zero_output():
+    x, d = _fir_signals(10)
+    np.testing.assert_array_equal(nlms_filter(x, d, 0.2, 64), np.zeros(10))
+    np.testing.assert_array_equal(lms_filter(x, d, 0.002, 64), np.zeros(10))
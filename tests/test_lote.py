@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from filtros_adaptativos.kernels import gaussian_kernel, laplacian_kernel, polynomial_kernel
+from filtros_adaptativos.lineares import lms_filter, nlms_filter
+from filtros_adaptativos.lote import kernel_filter_batch, lms_filter_batch, nlms_filter_batch, param_grid
+from filtros_adaptativos.motor_kernel import kernel_filter
+
+def _signals(n=1500, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.standard_normal(n) * 0.5
+    d = np.zeros(n)
+    d[1:] = np.tanh(np.convolve(x, [1.0, 0.5, -0.2])[:n - 1]) + 0.01 * rng.standard_normal(n - 1)
+    return x, d
+
+@pytest.mark.parametrize("batch, single, mus", [(lms_filter_batch, lms_filter, [0.001, 0.01]),
+                                                (nlms_filter_batch, nlms_filter, [0.05, 0.3])])
+def test_linear_batch_rows_match_single_runs(batch, single, mus):
+    # Ordens diferentes no mesmo lote: cada linha usa as últimas L posições da janela
+    x, d = _signals()
+    grid = param_grid(mu=mus, filter_order=[4, 16, 33])
+    Y = batch(x, d, grid["mu"], grid["filter_order"])
+    for p, (mu, order) in enumerate(zip(grid["mu"], grid["filter_order"])):
+        np.testing.assert_allclose(Y[p], single(x, d, mu, int(order)), rtol=1e-10, atol=1e-12)
+
+@pytest.mark.parametrize("kernel_func, grid", [
+    (gaussian_kernel, dict(mu=[0.1, 0.5], sigma=[0.5, 2.0])),
+    (laplacian_kernel, dict(mu=[0.1, 0.5], sigma=[0.5, 2.0])),
+    (polynomial_kernel, dict(mu=[0.005, 0.02], degree=[2, 3], const=[1.0])),
+])
+@pytest.mark.parametrize("normalized", [False, True])
+def test_kernel_batch_rows_match_single_runs(kernel_func, grid, normalized):
+    x, d = _signals()
+    grid = param_grid(**grid)
+    names = [name for name in grid if name != "mu"]
+    Y = kernel_filter_batch(x, d, grid["mu"], kernel_func, {name: grid[name] for name in names},
+                            max_dict_size=8, filter_order=6, normalized=normalized)
+    for p, mu in enumerate(grid["mu"]):
+        kernel_params = {name: grid[name][p].item() for name in names}
+        y = kernel_filter(x, d, mu, kernel_func, kernel_params, max_dict_size=8, filter_order=6,
+                          normalized=normalized)
+        np.testing.assert_allclose(Y[p], y, rtol=1e-9, atol=1e-12)
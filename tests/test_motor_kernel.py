@@ -0,0 +1,117 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from filtros_adaptativos import convergencia
+from filtros_adaptativos.kernels import gaussian_kernel, kernels_by_name, polynomial_kernel
+from filtros_adaptativos.motor_kernel import kernel_filter, klms_filter, nklms_filter
+
+data = Path(__file__).parent.parent / "data"
+
+# Configurações de klms e nklms em filtros.py (dicionário de 8)
+repo_settings = {"klms": dict(mu=0.6, kernel_params={"sigma": 5}, normalized=False),
+                 "nklms": dict(mu=0.4, kernel_params={"sigma": 20}, normalized=True)}
+
+# Laço da versão original (listas, um kernel escalar por centro), para comparação
+baseline_kernels = {
+    "gaussian": lambda x, y, sigma: np.exp(-np.linalg.norm(x - y) ** 2 / (2 * sigma ** 2)),
+    "laplacian": lambda x, y, sigma: np.exp(-np.linalg.norm(x - y) / sigma),
+    "polynomial": lambda x, y, sigma: (np.dot(x, y) + 5) ** 2,
+}
+
+def _baseline_kernel_filter(x, d, mu, kernel, sigma, max_dict_size, normalized, epsilon=1e-8):
+    N = len(x)
+    y = np.zeros(N)
+    alpha = []
+    dictionary = []
+    for n in range(max_dict_size, N):
+        x_n = x[n - max_dict_size:n][::-1]
+        if dictionary:
+            y[n] = sum(a * kernel(x_n, c, sigma) for a, c in zip(alpha, dictionary))
+        e = d[n] - y[n]
+        alpha.append(mu * e / (epsilon + kernel(x_n, x_n, sigma)) if normalized else mu * e)
+        dictionary.append(x_n)
+        if len(dictionary) > max_dict_size:
+            dictionary.pop(0)
+            alpha.pop(0)
+    return y
+
+def _nonlinear_signals(n, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.standard_normal(n) * 0.5
+    d = np.zeros(n)
+    d[1:] = np.tanh(x[:-1] + 0.4 * x[1:] ** 2) + 0.01 * rng.standard_normal(n - 1)
+    return x, d
+
+@pytest.mark.parametrize("kernel_name", ["gaussian", "laplacian", "polynomial"])
+def test_ring_buffer_matches_baseline_loop(kernel_name):
+    # Dicionário de 8 para 400 amostras: o buffer circular dá muitas voltas
+    x, d = _nonlinear_signals(400)
+    kernel_func = kernels_by_name[kernel_name]
+    baseline = baseline_kernels[kernel_name]
+    klms_mu = 0.01 if kernel_func == polynomial_kernel else 0.6
+    nklms_mu = 0.6 if kernel_func == polynomial_kernel else 0.4
+    np.testing.assert_allclose(klms_filter(x, d, 0.6, kernel_func, sigma=5, max_dict_size=8),
+                               _baseline_kernel_filter(x, d, klms_mu, baseline, 5, 8, False),
+                               rtol=1e-10, atol=1e-12)
+    np.testing.assert_allclose(nklms_filter(x, d, 0.4, kernel_func, sigma=20, max_dict_size=8),
+                               _baseline_kernel_filter(x, d, nklms_mu, baseline, 20, 8, True),
+                               rtol=1e-10, atol=1e-12)
+
+@pytest.mark.parametrize("kernel_func, kernel_params", [(gaussian_kernel, {"sigma": 2.0}),
+                                                        (polynomial_kernel, {"degree": 2, "const": 1.0})])
+@pytest.mark.parametrize("normalized", [False, True])
+@pytest.mark.parametrize("filter_order, max_dict_size", [(8, 8), (16, 5), (4, 12)])
+def test_shift_structured_matches_direct(kernel_func, kernel_params, normalized, filter_order, max_dict_size):
+    # 2500 amostras com resync_every=1000: a recursão atravessa dois recálculos da tabela
+    x, d = _nonlinear_signals(2500)
+    mu = 0.05 if kernel_func == polynomial_kernel and not normalized else 0.3
+    params = dict(mu=mu, kernel_func=kernel_func, kernel_params=kernel_params, max_dict_size=max_dict_size,
+                  filter_order=filter_order, normalized=normalized, resync_every=1000)
+    np.testing.assert_allclose(kernel_filter(x, d, shift_structured=True, **params), kernel_filter(x, d, **params),
+                               rtol=1e-8, atol=1e-10)
+
+def _snr(d, y):
+    return 10 * np.log10(np.sum(d**2) / np.sum((d - y)**2))
+
+@pytest.fixture(scope="module")
+def speech():
+    clean, _ = sf.read(data / "audio_limpo.wav")
+    x, _ = sf.read(data / "corrupted_dataset" / "Soma_SNR_0dB_ruidoBranco.wav")
+    n = min(len(x), len(clean))
+    return x[:n], clean[:n]
+
+@pytest.mark.parametrize("filtro", ["klms", "nklms"])
+def test_kapa_does_not_collapse_on_speech(speech, filtro):
+    # Antes do passo/K e do δ na escala do kernel: −16 a −43 dB com K ≥ 2 (e NaN sem normalização)
+    x, d = speech
+    params = dict(kernel_func=gaussian_kernel, max_dict_size=8, **repo_settings[filtro])
+    single = _snr(d, kernel_filter(x, d, **params))
+    for K in (2, 4, 8):
+        y = kernel_filter(x, d, projection=K, **params)
+        assert np.all(np.isfinite(y))
+        assert _snr(d, y) >= single - 1.5
+
+@pytest.mark.parametrize("normalized", [False, True])
+def test_kapa_converges_faster_with_long_dictionary(normalized):
+    rng = np.random.default_rng(0)
+    n = 4000
+    x = rng.uniform(-1, 1, n)
+    d = np.zeros(n)
+    d[2:] = np.sin(2 * x[1:-1]) * np.cos(x[:-2]) + 0.3 * x[1:-1] ** 2 + 0.01 * rng.standard_normal(n - 2)
+    convergencia.configure(256)
+    try:
+        reference_power = convergencia.windowed_power(d)
+        params = dict(mu=0.1, kernel_func=gaussian_kernel, kernel_params={"sigma": 1.0}, max_dict_size=512,
+                      filter_order=2, normalized=normalized)
+        mse = {K: convergencia.windowed_power(d - kernel_filter(x, d, projection=K, **params)) for K in (1, 4)}
+        _, single = convergencia.convergence(mse[1], reference_power)
+        # Amostras até 1 dB do NMSE final do K = 1
+        target = {K: convergencia.convergence(mse[K], reference_power, target_db=single + 1)[0] for K in mse}
+        _, final = convergencia.convergence(mse[4], reference_power)
+    finally:
+        convergencia.configure(None)
+    assert target[4] < target[1]
+    assert final < single
@@ -0,0 +1,55 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+
+from filtros_adaptativos import varredura
+from filtros_adaptativos.varredura import expand_jobs, run_sweep
+
+class CountingExecutor(ProcessPoolExecutor):
+    # Registra o maior número de tarefas enviadas e ainda não concluídas
+    in_flight = []
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.submitted = []
+        self.peak = 0
+        CountingExecutor.in_flight.append(self)
+
+    def submit(self, *args, **kwargs):
+        future = super().submit(*args, **kwargs)
+        self.submitted.append(future)
+        self.peak = max(self.peak, sum(not f.done() for f in self.submitted))
+        return future
+
+@pytest.fixture
+def sweep_inputs(tmp_path, monkeypatch):
+    # Sinais em memória; as saídas vão para data/result_* dentro de tmp_path
+    monkeypatch.chdir(tmp_path)
+    rng = np.random.default_rng(0)
+    clean = rng.standard_normal(4000)
+    noisy = clean + 0.3 * rng.standard_normal(4000)
+    corrupted_dir = tmp_path / "corrompidos"
+    clean_path = tmp_path / "limpo.wav"
+    arquivo = corrupted_dir / "ruido.wav"
+    signals = {str(clean_path): (clean, 16000), str(arquivo): (noisy, 16000)}
+    specs = [("nlms", None, {"mu": [0.05 * (i + 1) for i in range(12)], "filter_order": [16]})]
+    return expand_jobs([arquivo], specs), clean_path, corrupted_dir, signals
+
+def test_two_pool_sweep_bounds_filters_in_flight(sweep_inputs, monkeypatch):
+    jobs, clean_path, corrupted_dir, signals = sweep_inputs
+    serial = run_sweep(jobs, clean_path, corrupted_dir, workers=1, metric_workers=0, batch_size=1,
+                       metrics=("snr",), signals=signals)
+
+    CountingExecutor.in_flight.clear()
+    monkeypatch.setattr(varredura, "ProcessPoolExecutor", CountingExecutor)
+    workers = 2
+    rows = run_sweep(jobs, clean_path, corrupted_dir, workers=workers, metric_workers=1, batch_size=1,
+                     metrics=("snr",), signals=signals)
+
+    # 12 tarefas, janela de 2·workers
+    filter_pool, metric_pool = CountingExecutor.in_flight
+    assert len(filter_pool.submitted) == len(jobs) > 2 * workers
+    assert filter_pool.peak <= 2 * workers
+    assert [row["Taxa de adaptacao"] for row in rows] == [job["params"]["mu"] for job in jobs]
+    np.testing.assert_allclose([row["snr (dB)"] for row in rows], [row["snr (dB)"] for row in serial])